@@ -0,0 +1,202 @@
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from blauberg.blauberg_schema import CO2_FIELDS, HUMIDITY_FIELDS, PM2_5_FIELDS, TEMPERATURE_FIELDS, VOC_FIELDS
+from blauberg.blauberg_temperature import SENSOR_SHORT
+from modbus.modbus_arrays import RegisterArray
+from modbus.modbus_schema import RegisterField, RegisterType
+from sensor.current_temperature_strategy import NO_SENSOR_DETECTED, SENSOR_SHORT_CIRCUIT_DETECTED
+from utils.constants import DEFAULT_SUCCESS_MESSAGE
+from utils.response import Response
+from utils.status import Status
+from utils.temperaturecelsius import MAX_CELSIUS, MIN_CELSIUS, TEMPERATURE_IN_CELSIUS
+
+
+class ChannelStatus(IntEnum):
+    OK = 0
+    READ_FAILED = 1  # The input register read failed
+    INVALID_SELECTION = 2  # The register is not one of the channel's registers
+    OUT_OF_BOUNDS = 3
+    NOT_READ = 4  # A partial read left the register out
+    INVALID_VALUE = 5
+    NO_SENSOR = 6
+    SHORT_CIRCUIT = 7
+    TOO_LOW = 8
+    TOO_HIGH = 9
+
+
+@dataclass(frozen=True)
+class ChannelSpec:
+    """How the raw input registers of one kind of Blauberg sensor reading are decoded, see channel_spec."""
+    name: str
+    scale: float = 1.0
+    signed: bool = False
+    no_sensor: Optional[int] = None
+    short_circuit: Optional[int] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+    registers: Optional[FrozenSet[int]] = None
+    success_details: str = DEFAULT_SUCCESS_MESSAGE
+
+
+def channel_spec(name: str, fields: Sequence[RegisterField], low: Optional[float] = None,
+                 high: Optional[float] = None, success_details: str = DEFAULT_SUCCESS_MESSAGE) -> ChannelSpec:
+    """
+    The ChannelSpec of a group of BLAUBERG_INPUT_REGISTERS fields, which share one type, scale and sentinels.
+    The unit reports a short circuit as SENSOR_SHORT, any other sentinel means there is no sensor.
+    """
+    first = fields[0]
+    assert all((f.type, f.scale, f.sentinels) == (first.type, first.scale, first.sentinels) for f in fields), \
+        f"The {name} fields must share one type, scale and sentinels"
+    no_sensor = first.sentinels - {SENSOR_SHORT}
+    assert len(no_sensor) <= 1, f"The {name} fields have more than one no sensor value"
+    return ChannelSpec(name=name, scale=first.scale, signed=first.type == RegisterType.INT16,
+                       no_sensor=next(iter(no_sensor), None),
+                       short_circuit=SENSOR_SHORT if SENSOR_SHORT in first.sentinels else None,
+                       low=low, high=high, registers=frozenset(f.address for f in fields),
+                       success_details=success_details)
+
+
+def _addresses(fields: Sequence[RegisterField]) -> Tuple[int, ...]:
+    return tuple(f.address for f in fields)
+
+
+TEMPERATURE = channel_spec("temperature", TEMPERATURE_FIELDS, low=MIN_CELSIUS, high=MAX_CELSIUS,
+                           success_details=TEMPERATURE_IN_CELSIUS)
+HUMIDITY = channel_spec("humidity", HUMIDITY_FIELDS, low=0, high=100)
+CO2 = channel_spec("CO2", CO2_FIELDS)
+PM2_5 = channel_spec("PM2.5", PM2_5_FIELDS)
+VOC = channel_spec("VOC", VOC_FIELDS)
+
+TEMPERATURE_REGISTERS = _addresses(TEMPERATURE_FIELDS)
+HUMIDITY_REGISTERS = _addresses(HUMIDITY_FIELDS)
+CO2_REGISTERS = _addresses(CO2_FIELDS)
+PM2_5_REGISTERS = _addresses(PM2_5_FIELDS)
+VOC_REGISTERS = _addresses(VOC_FIELDS)
+
+
+class DecodedChannels(Sequence[Optional[float]]):
+    """
+    The readings of several input registers decoded in one pass, in the order they were selected.
+
+    Indexing gives the reading, None where it failed, and status() its ChannelStatus. The details text
+    and a Response for a reading are only built when asked for. For temperatures they carry the same
+    status, details and value as a BlaubergTemperature of the register would.
+    """
+    __slots__ = ('registers', 'spec', '_values', '_statuses', '_raw', '_failure')
+
+    def __init__(self, registers: Sequence[int], spec: ChannelSpec, values: List[Optional[float]],
+                 statuses: bytearray, raw: List[Optional[int]], failure: str = None):
+        self.registers = tuple(registers)
+        self.spec = spec
+        self._values = values
+        self._statuses = bytes(statuses)
+        self._raw = raw
+        self._failure = failure
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    @property
+    def all_ok(self) -> bool:
+        return not any(self._statuses)
+
+    def status(self, index: int) -> ChannelStatus:
+        return ChannelStatus(self._statuses[index])
+
+    def details(self, index: int) -> str:
+        status = self._statuses[index]
+        spec = self.spec
+        if status == ChannelStatus.OK:
+            return spec.success_details
+        if status == ChannelStatus.READ_FAILED:
+            return self._failure
+        if status == ChannelStatus.INVALID_SELECTION:
+            return f"Invalid {spec.name} selection"
+        if status == ChannelStatus.OUT_OF_BOUNDS:
+            return "Register selection out of bounds of input register"
+        if status == ChannelStatus.NOT_READ:
+            return "Register was not read"
+        if status == ChannelStatus.INVALID_VALUE:
+            return "Invalid value type"
+        if status == ChannelStatus.NO_SENSOR:
+            return NO_SENSOR_DETECTED
+        if status == ChannelStatus.SHORT_CIRCUIT:
+            return SENSOR_SHORT_CIRCUIT_DETECTED
+        value = self._raw[index] / spec.scale
+        if status == ChannelStatus.TOO_LOW:
+            return f"Value must be greater than or equal to {spec.low}, got {value}"
+        return f"Value must be less than or equal to {spec.high}, got {value}"
+
+    def response(self, index: int) -> Response[Optional[float]]:
+        status = Status.OK if self._statuses[index] == ChannelStatus.OK else Status.EXCEPTION
+        return Response(status=status, details=self.details(index), value=self._values[index])
+
+    def by_register(self) -> Dict[int, Optional[float]]:
+        return dict(zip(self.registers, self._values))
+
+
+def decode_channels(input_register: Response, registers: Sequence[int], spec: ChannelSpec) -> DecodedChannels:
+    """
+    Decode the selected input registers as one kind of reading: check the selection, pick the register,
+    reject the sensor sentinels, scale it and check its range, for every register in one loop.
+
+    :param input_register: The input register read, a RegisterArray or a list of register values.
+    :param registers: The addresses of the registers to decode.
+    """
+    count = len(registers)
+    if input_register.status != Status.OK:
+        return DecodedChannels(registers, spec, [None] * count, bytearray([ChannelStatus.READ_FAILED]) * count,
+                               [None] * count, failure=input_register.details)
+
+    data = input_register.value
+    valid = None
+    if isinstance(data, RegisterArray):
+        valid = data.valid
+        data = data.int16_view() if spec.signed else data.words
+    size = len(data)
+    selectable, scale, no_sensor, short_circuit = spec.registers, spec.scale, spec.no_sensor, spec.short_circuit
+    low, high, signed = spec.low, spec.high, spec.signed
+
+    values: List[Optional[float]] = [None] * count
+    raws: List[Optional[int]] = [None] * count
+    statuses = bytearray(count)
+    for index, address in enumerate(registers):
+        if selectable is not None and address not in selectable:
+            statuses[index] = ChannelStatus.INVALID_SELECTION
+            continue
+        if not 0 <= address < size:
+            statuses[index] = ChannelStatus.OUT_OF_BOUNDS
+            continue
+        raw = data[address] if valid is None or valid[address] else None
+        if raw is None:
+            statuses[index] = ChannelStatus.NOT_READ
+            continue
+        if not isinstance(raw, int):
+            statuses[index] = ChannelStatus.INVALID_VALUE
+            continue
+        if signed and raw > 0x7FFF:
+            raw -= 0x10000
+        raws[index] = raw
+        if raw == no_sensor:
+            statuses[index] = ChannelStatus.NO_SENSOR
+        elif raw == short_circuit:
+            statuses[index] = ChannelStatus.SHORT_CIRCUIT
+        else:
+            value = raw / scale
+            if low is not None and value < low:
+                statuses[index] = ChannelStatus.TOO_LOW
+            elif high is not None and value > high:
+                statuses[index] = ChannelStatus.TOO_HIGH
+            else:
+                values[index] = value
+    return DecodedChannels(registers, spec, values, statuses, raws)
+
+
+def decode_temperatures(input_register: Response, registers: Sequence[int] = TEMPERATURE_REGISTERS) -> DecodedChannels:
+    """The temperatures of the selected registers, all seven temperature sensors by default."""
+    return decode_channels(input_register, registers, TEMPERATURE)
@@ -1,4 +1,5 @@
 from blauberg.blauberg_mvhr_state import BlaubergMVHRState
+from blauberg.blauberg_read_plan import blauberg_read_plan
 from blauberg.blauberg_registers import (CoilRegister, DiscreteInputs,
                                          InputRegisters, HoldingRegister)
 from config.config_loader import ConfigLoader
@@ -41,12 +42,15 @@ class BlaubergMVHR(MVHR):
             .set_port(Port(config_loader.get_value(MVHR_PORT)))
         ).build()
 
+        # Only the registers the state decodes are requested on each read
+        self._read_plan = blauberg_read_plan(BlaubergMVHRState.CONSUMED_REGISTERS)
+
     @property
     def modbus(self) -> ModbusInterface:
         return self._modbus
 
     async def read(self) -> MVHRStateInterface:
-        return BlaubergMVHRState(await self.modbus.read())
+        return BlaubergMVHRState(await self.modbus.read(self._read_plan))
 
     def close(self) -> OperationResponse:
         return self.modbus.disconnect()
@@ -1,28 +1,64 @@
+import math
+from array import array
 from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from blauberg.blauberg_channels import DecodedChannels, decode_temperatures
 from blauberg.blauberg_registers import InputRegisters
 from blauberg.blauberg_temperature import BlaubergTemperature
 from modbus.modbus import ModbusData
 from mvhr_state import MVHRStateInterface
 from utils.temperaturecelsius import TemperatureInterface
 
+# The key the one pass decoding of all the temperatures is cached under
+_ALL_TEMPERATURES = '_all_temperatures'
+
 
 @dataclass(frozen=True)
 class BlaubergMVHRState(MVHRStateInterface):
+    """
+    The state of the unit from one read. Nothing is decoded until it is asked for and every value is
+    decoded at most once, so a poll only pays for the values its consumers use.
+    """
+    # The temperatures this state exposes and the registers they are decoded from, in as_array() order
+    TEMPERATURES = {
+        'temp_supply_in': InputRegisters.IR_CURTEMP_SUAIR_IN,
+        'temp_supply_out': InputRegisters.IR_CURTEMP_SUAIR_OUT,
+    }
+    # The registers this state decodes, only these need to be read from the unit
+    CONSUMED_REGISTERS = tuple(TEMPERATURES.values())
+
     data: ModbusData  # This is the input data passed to the class
-    _temp_supply_out: TemperatureInterface = field(init=False)
-    _temp_supply_in: TemperatureInterface = field(init=False)
+    _decoded: Dict[str, object] = field(init=False, default_factory=dict, repr=False, compare=False)
 
-    def __post_init__(self):
-        # Use object.__setattr__ to bypass the immutability in __post_init__
-        object.__setattr__(self, '_temp_supply_out',
-                           BlaubergTemperature(self.data.input_register, InputRegisters.IR_CURTEMP_SUAIR_OUT.value))
-        object.__setattr__(self, '_temp_supply_in',
-                           BlaubergTemperature(self.data.input_register, InputRegisters.IR_CURTEMP_SUAIR_IN.value))
+    def _temperature(self, name: str) -> TemperatureInterface:
+        # The cache dict is mutable, so memoizing does not need to get around the frozen dataclass
+        temperature = self._decoded.get(name)
+        if temperature is None:
+            temperature = self._decoded[name] = BlaubergTemperature(self.data.input_register,
+                                                                    self.TEMPERATURES[name].value)
+        return temperature
+
+    def _all_temperatures(self) -> DecodedChannels:
+        temperatures = self._decoded.get(_ALL_TEMPERATURES)
+        if temperatures is None:
+            registers = [register.value for register in self.CONSUMED_REGISTERS]
+            temperatures = self._decoded[_ALL_TEMPERATURES] = decode_temperatures(self.data.input_register,
+                                                                                  registers)
+        return temperatures
 
     @property
     def temp_supply_out(self) -> TemperatureInterface:
-        return self._temp_supply_out
+        return self._temperature('temp_supply_out')
 
     @property
     def temp_supply_in(self) -> TemperatureInterface:
-        return self._temp_supply_in
+        return self._temperature('temp_supply_in')
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        """Every temperature by name, None where it could not be read, decoded together in one pass."""
+        return dict(zip(self.TEMPERATURES, self._all_temperatures()))
+
+    def as_array(self) -> array:
+        """Every temperature in TEMPERATURES order as doubles, NaN where it could not be read."""
+        return array('d', [math.nan if value is None else value for value in self._all_temperatures()])
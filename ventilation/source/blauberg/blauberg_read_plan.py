@@ -0,0 +1,38 @@
+from enum import Enum
+from typing import Iterable
+
+from blauberg.blauberg_registers import CoilRegister, DiscreteInputs, InputRegisters, HoldingRegister
+from modbus.modbus_read_plan import ModbusReadPlan, ModbusReadPlanner
+
+# Which ModbusReadPlan table each Blauberg register enum belongs to
+BLAUBERG_TABLES = {
+    CoilRegister: 'coils',
+    DiscreteInputs: 'discrete_inputs',
+    InputRegisters: 'input_register',
+    HoldingRegister: 'holding_register',
+}
+
+# The *_SIZE members describe the table, they are not registers that can be read
+BLAUBERG_SIZES = {
+    CoilRegister.CL_SIZE,
+    DiscreteInputs.DI_SIZE,
+    InputRegisters.IR_SIZE,
+    HoldingRegister.HR_SIZE,
+}
+
+
+def blauberg_read_plan(registers: Iterable[Enum], planner: ModbusReadPlanner = None) -> ModbusReadPlan:
+    """
+    Compile the Blauberg registers a consumer declares into a ModbusReadPlan.
+
+    :param registers: Members of CoilRegister, DiscreteInputs, InputRegisters or HoldingRegister.
+    :param planner: The planner to use, defaults to one with no gap merging and standard max counts.
+    """
+    addresses = {table: [] for table in BLAUBERG_TABLES.values()}
+
+    for register in registers:
+        assert type(register) in BLAUBERG_TABLES, f"{register} is not a Blauberg register"
+        assert register not in BLAUBERG_SIZES, f"{register} is a table size, not a register"
+        addresses[BLAUBERG_TABLES[type(register)]].append(register.value)
+
+    return (planner or ModbusReadPlanner()).plan(**addresses)
@@ -0,0 +1,76 @@
+from enum import Enum
+
+from blauberg.blauberg_registers import InputRegisters
+from blauberg.blauberg_temperature import CONVERSION_FACTOR, NO_SENSOR, SENSOR_SHORT
+from modbus.modbus_schema import RegisterField, RegisterSchema, RegisterType
+
+
+def _field(register: Enum, **options) -> RegisterField:
+    """A field named after the register, without its table prefix."""
+    return RegisterField(name=register.name.split('_', 1)[1].lower(), address=register.value, **options)
+
+
+# Value 250 = 25.0 °C. -32768 - no sensor, +32767 - short circuit
+TEMPERATURE = dict(type=RegisterType.INT16, scale=CONVERSION_FACTOR, unit="°C",
+                   sentinels=frozenset({NO_SENSOR, SENSOR_SHORT}))
+# Value 250 = 25.0 °C, calculated by the unit so there are no sentinels
+SETPOINT = dict(type=RegisterType.INT16, scale=CONVERSION_FACTOR, unit="°C")
+# 0 – no sensor
+NO_SENSOR_ZERO = frozenset({0})
+
+# The sensor readings, grouped by kind. blauberg_channels decodes each group as one channel
+TEMPERATURE_FIELDS = tuple(_field(register, **TEMPERATURE) for register in (
+    InputRegisters.IR_CUR_SEL_TEMP,
+    InputRegisters.IR_CURTEMP_SUAIR_IN,
+    InputRegisters.IR_CURTEMP_SUAIR_OUT,
+    InputRegisters.IR_CURTEMP_EXAIR_IN,
+    InputRegisters.IR_CURTEMP_EXAIR_OUT,
+    InputRegisters.IR_CURTEMP_EXT,
+    InputRegisters.IR_CURTEMP_WATER,
+))
+HUMIDITY_FIELDS = (_field(InputRegisters.IR_CURRH_INT, unit="%", sentinels=NO_SENSOR_ZERO),
+                   _field(InputRegisters.IR_CURRH_EXT, unit="%", sentinels=NO_SENSOR_ZERO))
+CO2_FIELDS = (_field(InputRegisters.IR_CURCO2_INT, unit="ppm", sentinels=NO_SENSOR_ZERO),
+              _field(InputRegisters.IR_CURCO2_EXT, unit="ppm", sentinels=NO_SENSOR_ZERO))
+PM2_5_FIELDS = (_field(InputRegisters.IR_CURPM2_5_INT, unit="µg/m³", sentinels=NO_SENSOR_ZERO),
+                _field(InputRegisters.IR_CURPM2_5_EXT, unit="µg/m³", sentinels=NO_SENSOR_ZERO))
+VOC_FIELDS = (_field(InputRegisters.IR_CURVOC_INT, sentinels=NO_SENSOR_ZERO),
+              _field(InputRegisters.IR_CURVOC_EXT, sentinels=NO_SENSOR_ZERO))
+
+BLAUBERG_INPUT_REGISTERS = RegisterSchema('BlaubergInputRegisters', [
+    *TEMPERATURE_FIELDS,
+    _field(InputRegisters.IR_CURVBAT),
+    *HUMIDITY_FIELDS,
+    *CO2_FIELDS,
+    *PM2_5_FIELDS,
+    *VOC_FIELDS,
+    _field(InputRegisters.IR_CUR10V_SENSOR),
+    _field(InputRegisters.IR_CURSU_AIRFLOW, unit="m³/h"),
+    _field(InputRegisters.IR_CUREX_AIRFLOW, unit="m³/h"),
+    _field(InputRegisters.IR_CURSU_PRESS, unit="Pa"),
+    _field(InputRegisters.IR_CUREX_PRESS, unit="Pa"),
+    _field(InputRegisters.IR_SURPM, unit="rpm"),
+    _field(InputRegisters.IR_EXRPM, unit="rpm"),
+    # The timers and the motor hours take two registers each
+    _field(InputRegisters.IR_CURTIMER_TIME, type=RegisterType.UINT32),
+    _field(InputRegisters.IR_CURFILTER_TIMER, type=RegisterType.UINT32),
+    _field(InputRegisters.IR_TOTALWORKINGTIME, type=RegisterType.UINT32),
+    _field(InputRegisters.IR_STATE_FILTER),
+    _field(InputRegisters.IR_CURWEEKSPEED),
+    _field(InputRegisters.IR_CURWEEKSETTEMP, unit="°C"),
+    _field(InputRegisters.IR_VERMAIN_FMW),
+    _field(InputRegisters.IR_DEVICETYPE),
+    _field(InputRegisters.IR_ALARM),
+    _field(InputRegisters.IR_RH_U),
+    _field(InputRegisters.IR_CO2_U),
+    _field(InputRegisters.IR_PM2_5_U),
+    _field(InputRegisters.IR_VOC_U),
+    _field(InputRegisters.IR_PREHEATER_U),
+    _field(InputRegisters.IR_MAINHEATER_U),
+    _field(InputRegisters.IR_BPS_ROTOR_U),
+    _field(InputRegisters.IR_KKB_U),
+    _field(InputRegisters.IR_RETURNWATER_U),
+    _field(InputRegisters.IR_SUAIR_OUTSETTEMP, **SETPOINT),
+    _field(InputRegisters.IR_WATER_STANDBYSETTEMP, **SETPOINT),
+    _field(InputRegisters.IR_WATER_STARTSETTEMP, **SETPOINT),
+])
@@ -2,55 +2,54 @@ from dataclasses import dataclass
 from typing import List
 
 from blauberg.blauberg_registers import InputRegisters
+from modbus.modbus_arrays import RegisterArray
 from sensor.current_temperature_strategy import NO_SENSOR_DETECTED, SENSOR_SHORT_CIRCUIT_DETECTED
 from utils.strategies import ExceptionCascadeStrategy
 from utils.temperaturecelsius import TemperatureCelsius
-from utils.value import Response, ValidationStrategy
-from utils.status import Status
+from utils.value import Response, StepValidationStrategy, ValidationPipeline, ValidationStrategy, invalid
 
 CONVERSION_FACTOR = 10.0
 NO_SENSOR = -32768
 SENSOR_SHORT = 32767
 
-class SensorDetection(ValidationStrategy):
+class SensorDetection(StepValidationStrategy):
     """
     A custom validation strategy to handle specific sensor cases:
     - No sensor detected
     - Sensor short circuit
     """
-    @classmethod
-    def validate(cls, value: int) -> Response:
+    success_details = "Sensor check passed"
+
+    def apply(self, value: int) -> int:
         # Type check
         if not isinstance(value, int):
-            return Response(status=Status.EXCEPTION, details="Invalid value type", value=None)
+            raise invalid("Invalid value type")
 
         # Check for specific sensor conditions
         if value == NO_SENSOR:
-            return Response(status=Status.EXCEPTION, details=NO_SENSOR_DETECTED, value=None)
+            raise invalid(NO_SENSOR_DETECTED)
         if value == SENSOR_SHORT:
-            return Response(status=Status.EXCEPTION, details=SENSOR_SHORT_CIRCUIT_DETECTED, value=None)
-
-        # If no issues, return OK response
-        return Response(status=Status.OK, details="Sensor check passed", value=value)
+            raise invalid(SENSOR_SHORT_CIRCUIT_DETECTED)
+        return value
 
 
-class RawDataToCelsiusConversion(ValidationStrategy):
+class RawDataToCelsiusConversion(StepValidationStrategy):
     """
     A strategy to convert raw Modbus values to Celsius.
     """
-    @classmethod
-    def validate(cls, value: int) -> Response:
+    success_details = "Converted to Celsius"
+
+    def apply(self, value: int) -> float:
         try:
-            celsius_value = value / CONVERSION_FACTOR
-            return Response(status=Status.OK, details="Converted to Celsius", value=celsius_value)
+            return value / CONVERSION_FACTOR
         except ZeroDivisionError:
-            return Response(status=Status.EXCEPTION, details="Conversion factor is zero", value=None)
+            raise invalid("Conversion factor is zero")
         except TypeError:
-            return Response(status=Status.EXCEPTION, details="Invalid input type", value=None)
+            raise invalid("Invalid input type")
         except Exception as e:
-            return Response(status=Status.EXCEPTION, details=f"Unexpected error: {str(e)}", value=None)
+            raise invalid(f"Unexpected error: {str(e)}")
 
-class AllowedInputRegister(ValidationStrategy):
+class AllowedInputRegister(StepValidationStrategy):
     """
     A custom validation strategy to check if the selected temperature register is valid
     based on the input register values.
@@ -66,49 +65,64 @@ class AllowedInputRegister(ValidationStrategy):
         InputRegisters.IR_CURTEMP_WATER.value,
     }
 
-    def validate(self, selected_temp: int) -> Response:
+    success_details = "Validation successful"
+
+    def apply(self, selected_temp: int) -> int:
         # Ensure the selected temperature is an integer
         if not isinstance(selected_temp, int):
-            return Response(status=Status.EXCEPTION, details="Invalid value type", value=None)
+            raise invalid("Invalid value type")
 
         # Validate if the selected temperature register is in the valid set
-        if selected_temp in self.valid_registers:
-            return Response(status=Status.OK, details="Validation successful", value=selected_temp)
-        else:
-            return Response(status=Status.EXCEPTION, details="Invalid temperature selection", value=None)
+        if selected_temp not in self.valid_registers:
+            raise invalid("Invalid temperature selection")
+        return selected_temp
 
 
 @dataclass(frozen=True)
-class InputRegistersStrategy(ValidationStrategy):
+class InputRegistersStrategy(StepValidationStrategy):
     input_register: Response[List[int]]
+    success_details = "Valid register and data found"
 
-    def validate(self, value) -> Response:
+    def apply(self, value):
         # Check if the register index is within the data_array bounds
         if value >= len(self.input_register.value) or value < 0:
-            return Response(
-                status=Status.EXCEPTION,
-                details="Register selection out of bounds of input register",
-                value=None
-            )
+            raise invalid("Register selection out of bounds of input register")
 
-        # Return the value from the data array
-        register_value = self.input_register.value[value]
-        return Response(
-            status=Status.OK,
-            details="Valid register and data found",
-            value=register_value
-        )
+        # Return the value from the data array, temperatures are signed so the sentinels read as -32768 and 32767
+        registers = self.input_register.value
+        if isinstance(registers, RegisterArray):
+            return self._read(registers.int16(value))
+        register_value = self._read(registers[value])
+        return register_value - 0x10000 if register_value > 0x7FFF else register_value
+
+    @staticmethod
+    def _read(register_value):
+        if register_value is None:
+            raise invalid("Register was not read")
+        return register_value
 
 
 class BlaubergTemperature(TemperatureCelsius):
 
     def get__strategies(self) -> List[ValidationStrategy]:
+        return self._lookup_strategies() + self._conversion_strategies()
+
+    def _lookup_strategies(self) -> List[ValidationStrategy]:
+        """Find the selected register in this instance's input register."""
         return [self._input_register_exception_cascade,
                 AllowedInputRegister(),
-                self._input_registers_strategy,
-                SensorDetection(),
+                self._input_registers_strategy]
+
+    def _conversion_strategies(self) -> List[ValidationStrategy]:
+        """Turn the raw register value into a temperature, the same for every instance."""
+        return [SensorDetection(),
                 RawDataToCelsiusConversion()] + super().get__strategies()
 
+    def get__pipeline(self) -> ValidationPipeline:
+        # Only the lookup holds instance data, the conversion is compiled once
+        return ValidationPipeline(self._lookup_strategies() +
+                                  [self.compiled(self._range_key(), self._conversion_strategies)])
+
     def __init__(self, input_register: Response[List[int]], selected_temp: int):
         self._input_register_exception_cascade = ExceptionCascadeStrategy(input_register)
         self._input_registers_strategy = InputRegistersStrategy(input_register)
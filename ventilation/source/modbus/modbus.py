@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List
+from typing import FrozenSet, Optional, Sequence
+from modbus.modbus_read_plan import ModbusReadPlan
+from utils.deadline import Deadline
 from utils.operation_response import OperationResponse
 from utils.response import Response
 
@@ -13,10 +15,19 @@ RETRIES = 3
 
 @dataclass(frozen=True)
 class ModbusData:
-    input_register: Response[List[int]]
-    holding_register: Response[List[int]]
-    discrete_inputs: Response[List[bool]]
-    coils: Response[List[bool]]
+    """
+    One snapshot of a device. The readers fill the registers with a RegisterArray and the bits with a
+    packed BitArray, any sequence indexed by address can be used in their place.
+
+    stale names the tables whose response is the last good one from an earlier read, because the
+    deadline of this read passed before they could be read again, and the tables whose response is
+    a partial read, with some of the requested addresses missing.
+    """
+    input_register: Response[Sequence[Optional[int]]]
+    holding_register: Response[Sequence[Optional[int]]]
+    discrete_inputs: Response[Sequence[Optional[bool]]]
+    coils: Response[Sequence[Optional[bool]]]
+    stale: FrozenSet[str] = frozenset()
 
 
 class ModbusInterface(ABC):
@@ -29,5 +40,35 @@ class ModbusInterface(ABC):
         pass
 
     @abstractmethod
-    async def read(self) -> ModbusData:  #pragma: nocover
+    async def read(self, plan: ModbusReadPlan = None, deadline: Deadline = None) -> ModbusData:  #pragma: nocover
+        """Read every table in full, or only the requests of the given plan, finishing by the deadline if given."""
+        pass
+
+    @property
+    def shared_bus(self) -> Optional[str]:
+        """The bus this device shares with others, e.g. its serial port, or None if it has its own connection."""
+        return None
+
+
+class ModbusWriter(ABC):
+    """The write requests of a Modbus client, implemented by the clients that can write to their device."""
+
+    @abstractmethod
+    async def write_registers(self, address: int, values: Sequence[int]) -> OperationResponse:  #pragma: nocover
+        """Write consecutive holding registers starting at address."""
+        pass
+
+    @abstractmethod
+    async def write_coils(self, address: int, values: Sequence[bool]) -> OperationResponse:  #pragma: nocover
+        """Write consecutive coils starting at address."""
+        pass
+
+    @abstractmethod
+    async def write_holding_register(self, address: int, value: int) -> OperationResponse:  #pragma: nocover
+        """Write a single holding register."""
+        pass
+
+    @abstractmethod
+    async def write_coil(self, address: int, value: bool) -> OperationResponse:  #pragma: nocover
+        """Write a single coil."""
         pass
@@ -0,0 +1,220 @@
+import struct
+import sys
+from array import array
+from enum import Enum
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# (offset, values) pieces a reader assembles into one array, offsets not covered by any piece are unread
+Pieces = Iterable[Tuple[int, Sequence]]
+
+
+class WordOrder(Enum):
+    BIG = "big"  # High word in the lower register address, the usual Modbus convention
+    LITTLE = "little"  # Low word in the lower register address
+
+
+class BitArray(Sequence[Optional[bool]]):
+    """
+    Coils or discrete inputs packed eight to a byte, least significant bit first, the same layout
+    as the Modbus PDU payload, so a payload can be taken over without unpacking it.
+
+    An optional validity mask marks the addresses that were actually read, indexing an address
+    that was not read returns None.
+    """
+    __slots__ = ('_bytes', '_length', '_valid')
+
+    def __init__(self, packed: Union[bytes, bytearray] = b'', length: int = 0, valid: 'BitArray' = None):
+        assert len(packed) * 8 >= length, "Packed bytes are too short for the length"
+        assert valid is None or len(valid) == length, "Validity mask must match the length"
+        self._bytes = bytes(packed)
+        self._length = length
+        self._valid = valid
+
+    @classmethod
+    def from_bits(cls, bits: Iterable[bool]) -> 'BitArray':
+        packed = bytearray()
+        length = 0
+        for length, bit in enumerate(bits, start=1):
+            if (length - 1) % 8 == 0:
+                packed.append(0)
+            if bit:
+                packed[-1] |= 1 << ((length - 1) % 8)
+        return cls(packed, length)
+
+    @classmethod
+    def from_payload(cls, payload: bytes, count: int) -> 'BitArray':
+        """The bits of a read coils or read discrete inputs response payload, without the byte count."""
+        return cls(payload[:(count + 7) // 8], count)
+
+    @classmethod
+    def assemble(cls, length: int, pieces: Pieces) -> 'BitArray':
+        """Place each piece of bits at its offset, offsets outside every piece are marked unread."""
+        packed = bytearray((length + 7) // 8)
+        valid = bytearray(len(packed))
+        covered = 0
+        for offset, bits in pieces:
+            for index, bit in enumerate(bits, start=offset):
+                valid[index >> 3] |= 1 << (index & 7)
+                if bit:
+                    packed[index >> 3] |= 1 << (index & 7)
+                covered += 1
+        return cls(packed, length, None if covered == length else cls(valid, length))
+
+    @property
+    def packed(self) -> memoryview:
+        """Read only view of the packed bytes."""
+        return memoryview(self._bytes)
+
+    @property
+    def valid(self) -> Optional['BitArray']:
+        """The validity mask, None when every address was read."""
+        return self._valid
+
+    def is_valid(self, index: int) -> bool:
+        return self._valid is None or bool(self._valid[index])
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Bit index out of range")
+        if self._valid is not None and not self._valid[index]:
+            return None
+        return bool(self._bytes[index >> 3] & (1 << (index & 7)))
+
+    def __iter__(self) -> Iterator[Optional[bool]]:
+        return (self[index] for index in range(self._length))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (BitArray, list, tuple)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"BitArray({list(self)})"
+
+
+class RegisterArray(Sequence[Optional[int]]):
+    """
+    16 bit registers held in a single array('H') instead of a list of Python ints.
+
+    words and int16_view expose the registers as memoryviews without copying, and the typed accessors
+    decode int16, uint32, int32 and float32 values in place. An optional validity mask marks the
+    addresses that were actually read, indexing an address that was not read returns None.
+    """
+    __slots__ = ('_words', '_valid')
+
+    def __init__(self, words: array = None, valid: BitArray = None):
+        words = words if words is not None else array('H')
+        assert words.typecode == 'H', "Registers must be an array('H')"
+        assert valid is None or len(valid) == len(words), "Validity mask must match the length"
+        self._words = words
+        self._valid = valid
+
+    @classmethod
+    def from_registers(cls, registers: Iterable[int]) -> 'RegisterArray':
+        return cls(array('H', registers))
+
+    @classmethod
+    def from_payload(cls, payload: bytes) -> 'RegisterArray':
+        """The registers of a read registers response payload, without the byte count. Modbus sends them big endian."""
+        words = array('H')
+        words.frombytes(payload[:len(payload) & ~1])
+        if sys.byteorder == 'little':
+            words.byteswap()
+        return cls(words)
+
+    @classmethod
+    def assemble(cls, length: int, pieces: Pieces) -> 'RegisterArray':
+        """Place each piece of registers at its offset, offsets outside every piece are marked unread."""
+        words = array('H', bytes(2 * length))
+        ranges = []
+        for offset, registers in pieces:
+            piece = registers if isinstance(registers, array) else array('H', registers)
+            words[offset:offset + len(piece)] = piece
+            ranges.append((offset, len(piece)))
+
+        if sum(count for _, count in ranges) == length:
+            return cls(words)
+        valid = bytearray((length + 7) // 8)
+        for offset, count in ranges:
+            for index in range(offset, offset + count):
+                valid[index >> 3] |= 1 << (index & 7)
+        return cls(words, BitArray(valid, length))
+
+    @property
+    def words(self) -> memoryview:
+        """Read only view of the registers as unsigned 16 bit values."""
+        return memoryview(self._words).toreadonly()
+
+    def int16_view(self) -> memoryview:
+        """Read only view of the registers as signed 16 bit values."""
+        return self.words.cast('B').cast('h')
+
+    @property
+    def valid(self) -> Optional[BitArray]:
+        """The validity mask, None when every address was read."""
+        return self._valid
+
+    def is_valid(self, address: int) -> bool:
+        return self._valid is None or bool(self._valid[address])
+
+    def uint16(self, address: int) -> Optional[int]:
+        return self[address]
+
+    def int16(self, address: int) -> Optional[int]:
+        value = self[address]
+        return value - 0x10000 if value is not None and value & 0x8000 else value
+
+    def uint32(self, address: int, word_order: WordOrder = WordOrder.BIG) -> Optional[int]:
+        return self._unpack('>I', address, word_order)
+
+    def int32(self, address: int, word_order: WordOrder = WordOrder.BIG) -> Optional[int]:
+        return self._unpack('>i', address, word_order)
+
+    def float32(self, address: int, word_order: WordOrder = WordOrder.BIG) -> Optional[float]:
+        return self._unpack('>f', address, word_order)
+
+    def _unpack(self, fmt: str, address: int, word_order: WordOrder):
+        """Decode the two registers at address as one 32 bit value, None if either was not read."""
+        first, second = self[address], self[address + 1]
+        if first is None or second is None:
+            return None
+        high, low = (first, second) if word_order == WordOrder.BIG else (second, first)
+        return struct.unpack(fmt, struct.pack('>HH', high, low))[0]
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self._words)))]
+        value = self._words[index]
+        if self._valid is not None and not self._valid[index]:
+            return None
+        return value
+
+    def __iter__(self) -> Iterator[Optional[int]]:
+        if self._valid is None:
+            return iter(self._words)
+        return (self[index] for index in range(len(self._words)))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (RegisterArray, list, tuple)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"RegisterArray({list(self)})"
+
+    def tolist(self) -> List[Optional[int]]:
+        return list(self)
@@ -0,0 +1,195 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from modbus.modbus import ModbusData
+from modbus.modbus_arrays import BitArray, RegisterArray
+from utils.status import Status
+
+TABLES = ('coils', 'discrete_inputs', 'input_register', 'holding_register')
+REGISTER_TABLES = ('input_register', 'holding_register')
+
+# Buffers are compared this many items at a time before looking at single addresses
+BLOCK_SIZE = 64
+
+Changes = Dict[int, Any]  # address -> new value
+
+
+@dataclass(frozen=True)
+class ModbusChanges:
+    """The addresses whose value changed in one snapshot, with their new values, per table."""
+    version: int
+    coils: Changes = field(default_factory=dict)
+    discrete_inputs: Changes = field(default_factory=dict)
+    input_register: Changes = field(default_factory=dict)
+    holding_register: Changes = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return not any(getattr(self, table) for table in TABLES)
+
+    def only(self, table: str, addresses: Optional[Set[int]] = None) -> 'ModbusChanges':
+        """The changes of one table, optionally only at the given addresses."""
+        changes = getattr(self, table)
+        if addresses is not None:
+            changes = {address: value for address, value in changes.items() if address in addresses}
+        return ModbusChanges(version=self.version, **{table: changes})
+
+
+@dataclass(frozen=True)
+class _Subscription:
+    callback: Callable[[ModbusChanges], None]
+    table: Optional[str]
+    addresses: Optional[Set[int]]
+
+
+class ModbusChangeDetector:
+    """
+    Compares consecutive ModbusData snapshots and reports only the addresses that changed.
+
+    RegisterArray and BitArray snapshots are compared buffer to buffer, a block at a time, so an
+    unchanged table costs a few memory compares however many registers it holds. Other sequences are
+    compared element by element.
+
+    A register with a deadband is only reported once it moves more than the deadband away from the
+    value last reported for it, so slow drift is still reported once it adds up. Addresses that were
+    not read, or tables whose read failed, are left out and keep their last value.
+
+    Every snapshot with changes gets the next version number. changed_since(version) returns the
+    current value of every address changed after that version, and subscribers are called with
+    the changes they are interested in.
+    """
+
+    def __init__(self, deadbands: Dict[str, Dict[int, int]] = None):
+        """
+        :param deadbands: Per register table, the address -> deadband in raw register units,
+                          e.g. {'input_register': {1: 2}} ignores moves of 0.2 degrees on a 1/10 degree register.
+        """
+        deadbands = deadbands or {}
+        assert set(deadbands) <= set(REGISTER_TABLES), "Deadbands only apply to register tables"
+        self._deadbands = {table: dict(bands) for table, bands in deadbands.items()}
+        self._previous: Dict[str, Sequence] = {}
+        self._reported: Dict[str, Dict[int, Any]] = {table: {} for table in TABLES}
+        # (table, address) -> version of its last change, most recently changed last
+        self._changed_at: 'OrderedDict[Tuple[str, int], int]' = OrderedDict()
+        self._subscriptions: List[_Subscription] = []
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """The version of the last snapshot that had changes, 0 before any."""
+        return self._version
+
+    def update(self, data: ModbusData) -> ModbusChanges:
+        """Compare the snapshot with the previous one, record and publish what changed."""
+        changes = {}
+        for table in TABLES:
+            response = getattr(data, table)
+            if response.status != Status.OK or response.value is None:
+                continue
+            changes[table] = self._table_changes(table, response.value)
+            self._previous[table] = response.value
+
+        if not any(changes.values()):
+            return ModbusChanges(version=self._version)
+
+        self._version += 1
+        result = ModbusChanges(version=self._version, **changes)
+        for table, table_changes in changes.items():
+            for address in table_changes:
+                self._changed_at[(table, address)] = self._version
+                self._changed_at.move_to_end((table, address))
+        self._publish(result)
+        return result
+
+    def changed_since(self, version: int) -> ModbusChanges:
+        """The current value of every address that changed after the given version."""
+        changes = {table: {} for table in TABLES}
+        for (table, address), changed in reversed(self._changed_at.items()):
+            if changed <= version:
+                break
+            changes[table][address] = self._reported[table][address]
+        return ModbusChanges(version=self._version, **changes)
+
+    def subscribe(self, callback: Callable[[ModbusChanges], None], table: str = None,
+                  addresses: Iterable[int] = None) -> Callable[[ModbusChanges], None]:
+        """
+        Call back with every non empty set of changes, optionally only those of one table and addresses.
+        Returns the callback, to pass to unsubscribe.
+        """
+        assert table is None or table in TABLES, f"Unknown table {table}"
+        assert addresses is None or table is not None, "Addresses need a table"
+        self._subscriptions.append(_Subscription(callback, table, set(addresses) if addresses is not None else None))
+        return callback
+
+    def unsubscribe(self, callback: Callable[[ModbusChanges], None]):
+        self._subscriptions = [subscription for subscription in self._subscriptions
+                               if subscription.callback != callback]
+
+    def reset(self):
+        """Forget every snapshot, the next update reports every address read."""
+        self._previous.clear()
+        self._reported = {table: {} for table in TABLES}
+        self._changed_at.clear()
+
+    def _publish(self, changes: ModbusChanges):
+        for subscription in self._subscriptions:
+            if subscription.table is None:
+                subscription.callback(changes)
+                continue
+            selected = changes.only(subscription.table, subscription.addresses)
+            if not selected.empty:
+                subscription.callback(selected)
+
+    def _table_changes(self, table: str, values: Sequence) -> Changes:
+        reported = self._reported[table]
+        deadbands = self._deadbands.get(table, {})
+        changes = {}
+        for address in self._candidates(self._previous.get(table), values):
+            value = values[address]
+            if value is None:
+                continue  # Not read this time, keep the last value
+            last = reported.get(address)
+            if last is not None and (value == last or abs(value - last) <= deadbands.get(address, 0)):
+                continue
+            reported[address] = value
+            changes[address] = value
+        return changes
+
+    @classmethod
+    def _candidates(cls, previous: Optional[Sequence], values: Sequence) -> Iterator[int]:
+        """The addresses whose value, or whether they were read, differs from the previous snapshot."""
+        if previous is None or len(previous) != len(values):
+            return iter(range(len(values)))
+        if isinstance(values, RegisterArray) and isinstance(previous, RegisterArray):
+            return iter(sorted(set(cls._differing(values.words, previous.words)) |
+                               set(cls._differing_masks(values.valid, previous.valid, len(values)))))
+        if isinstance(values, BitArray) and isinstance(previous, BitArray):
+            return iter(sorted(set(cls._differing_bits(values.packed, previous.packed, len(values))) |
+                               set(cls._differing_masks(values.valid, previous.valid, len(values)))))
+        return (address for address, (old, new) in enumerate(zip(previous, values)) if old != new)
+
+    @staticmethod
+    def _differing(current: memoryview, previous: memoryview) -> Iterator[int]:
+        """Indexes at which two equal length buffers differ, whole blocks are compared first."""
+        if current == previous:
+            return
+        for start in range(0, len(current), BLOCK_SIZE):
+            end = min(start + BLOCK_SIZE, len(current))
+            if current[start:end] != previous[start:end]:
+                yield from (index for index in range(start, end) if current[index] != previous[index])
+
+    @classmethod
+    def _differing_bits(cls, current: memoryview, previous: memoryview, length: int) -> Iterator[int]:
+        for index in cls._differing(current, previous):
+            flipped = current[index] ^ previous[index]
+            yield from (address for address in range(index * 8, min(index * 8 + 8, length))
+                        if flipped & (1 << (address & 7)))
+
+    @classmethod
+    def _differing_masks(cls, current: Optional[BitArray], previous: Optional[BitArray], length: int) -> Iterator[int]:
+        if current is None and previous is None:
+            return iter(())
+        current = current if current is not None else BitArray.from_bits([True] * length)
+        previous = previous if previous is not None else BitArray.from_bits([True] * length)
+        return cls._differing_bits(current.packed, previous.packed, length)
@@ -4,7 +4,7 @@ from modbus.modbus import ModbusInterface
 from modbus.modbus_builder_client import ModbusBuilderClient
 from modbus.modbus_values import (CoilSize, DiscreteInputSize, InputRegisterSize,
                                   HoldingRegisterSize, Retries, ReconnectDelay,
-                                  ReconnectDelayMax, Timeout)
+                                  ReconnectDelayMax, Timeout, UnitId)
 
 
 class ModbusClientBuilder:
@@ -27,6 +27,7 @@ class ModbusClientBuilder:
         self._retries = None
         self._reconnect_delay = None
         self._reconnect_delay_max = None
+        self._unit_id = None
 
     def build(self) -> ModbusInterface:
         assert self._coil_size is not None, "Coil size must be set"
@@ -73,6 +74,10 @@ class ModbusClientBuilder:
     def reconnect_delay_max(self) -> ReconnectDelayMax:
         return self._reconnect_delay_max
 
+    @property
+    def unit_id(self) -> UnitId:
+        return self._unit_id
+
     # Setter methods with validation
     def set_coil_size(self, coil_size: CoilSize):
         assert isinstance(coil_size, CoilSize), "Invalid coil size value"
@@ -113,3 +118,8 @@ class ModbusClientBuilder:
         assert isinstance(reconnect_delay_max, ReconnectDelayMax), "Invalid reconnect delay max value"
         self._reconnect_delay_max = reconnect_delay_max
         return self
+
+    def set_unit_id(self, unit_id: UnitId):
+        assert isinstance(unit_id, UnitId), "Invalid unit id value"
+        self._unit_id = unit_id
+        return self
@@ -0,0 +1,315 @@
+import json
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# Modbus function codes and the names they are exported under
+FUNCTION_NAMES = {
+    1: 'read_coils',
+    2: 'read_discrete_inputs',
+    3: 'read_holding_registers',
+    4: 'read_input_registers',
+    5: 'write_coil',
+    6: 'write_register',
+    15: 'write_coils',
+    16: 'write_registers',
+}
+
+# The bucket boundaries, in seconds, the latency histograms are exported to Prometheus with
+PROMETHEUS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TEMP_SUFFIX = '.tmp'
+
+
+class RequestOutcome(Enum):
+    OK = 'ok'
+    # The device answered with an exception response, or the library reported an error
+    ERROR = 'error'
+    # No answer arrived in time
+    TIMEOUT = 'timeout'
+
+
+def pdu_sizes(function_code: int, count: int) -> Tuple[int, int]:
+    """
+    The bytes of the request PDU and of a successful response PDU for a request of count items,
+    without the unit id, MBAP header or CRC the transport adds.
+    """
+    if function_code in (1, 2):
+        return 5, 2 + math.ceil(count / 8)
+    if function_code in (3, 4):
+        return 5, 2 + 2 * count
+    if function_code in (5, 6):
+        return 5, 5
+    if function_code == 15:
+        return 6 + math.ceil(count / 8), 5
+    if function_code == 16:
+        return 6 + 2 * count, 5
+    raise ValueError(f"Unsupported function code {function_code}")
+
+
+class LatencyHistogram:
+    """
+    A log-linear histogram of latencies in the style of HdrHistogram.
+
+    Latencies are recorded in whole microseconds. Values below 2 ** precision_bits get a bucket each,
+    above that every power of two is split into 2 ** (precision_bits - 1) buckets, so any recorded value
+    is known to within 1 / 2 ** (precision_bits - 1) of itself (about 3% by default) from microseconds to
+    hours. Only buckets that were hit are stored, recording is a few integer operations and a dict update.
+    """
+    __slots__ = ('_bits', '_sub_buckets', '_half', '_counts', 'count', 'total', '_min', '_max')
+
+    def __init__(self, precision_bits: int = 6):
+        assert 2 <= precision_bits <= 16, "Precision bits must be between 2 and 16"
+        self._bits = precision_bits
+        self._sub_buckets = 1 << precision_bits
+        self._half = self._sub_buckets >> 1
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self._min = 0
+        self._max = 0
+
+    def record(self, seconds: float):
+        micros = max(0, round(seconds * 1_000_000))
+        index = self._index(micros)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        if self.count == 0 or micros < self._min:
+            self._min = micros
+        if micros > self._max:
+            self._max = micros
+        self.count += 1
+        self.total += seconds
+
+    @property
+    def min(self) -> float:
+        return self._min / 1_000_000
+
+    @property
+    def max(self) -> float:
+        return self._max / 1_000_000
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """The latency in seconds that the given percent of the recorded latencies did not exceed."""
+        assert 0 <= percent <= 100, "Percent must be between 0 and 100"
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(self._upper(index), self._max) / 1_000_000
+        return self.max  # pragma: no cover
+
+    def count_at_or_below(self, seconds: float) -> int:
+        """The number of latencies recorded at or below the given seconds, to the histogram's precision."""
+        limit = self._index(max(0, round(seconds * 1_000_000)))
+        return sum(count for index, count in self._counts.items() if index <= limit)
+
+    def _index(self, micros: int) -> int:
+        if micros < self._sub_buckets:
+            return micros
+        shift = micros.bit_length() - self._bits
+        return self._sub_buckets + (shift - 1) * self._half + (micros >> shift) - self._half
+
+    def _upper(self, index: int) -> int:
+        """The largest value in microseconds that falls into the bucket."""
+        if index < self._sub_buckets:
+            return index
+        shift, offset = divmod(index - self._sub_buckets, self._half)
+        return ((self._half + offset + 1) << (shift + 1)) - 1
+
+
+@dataclass
+class RequestStats:
+    """What the requests of one function code to one device cost."""
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    requests: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    retries: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'retries': self.retries,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'latency': {
+                'count': self.latency.count,
+                'sum': self.latency.total,
+                'min': self.latency.min,
+                'mean': self.latency.mean,
+                'p50': self.latency.percentile(50),
+                'p90': self.latency.percentile(90),
+                'p99': self.latency.percentile(99),
+                'max': self.latency.max,
+            },
+        }
+
+
+@dataclass(frozen=True)
+class PduRecord:
+    """One request as it went over the wire."""
+    timestamp: float
+    device: str
+    function_code: int
+    address: int
+    count: int
+    latency: float
+    outcome: RequestOutcome
+    detail: str = ""
+
+    def to_dict(self) -> dict:
+        return {
+            'timestamp': self.timestamp,
+            'device': self.device,
+            'function': FUNCTION_NAMES.get(self.function_code, str(self.function_code)),
+            'address': self.address,
+            'count': self.count,
+            'latency': self.latency,
+            'outcome': self.outcome.value,
+            'detail': self.detail,
+        }
+
+
+class ModbusInstrumentation:
+    """
+    Latency histograms and counters of the Modbus requests made, per device and function code.
+
+    Every request is recorded with its latency, its outcome and the PDU bytes it moved. Chunks the
+    readers had to read again are counted as retries. With pdu_history the most recent requests are
+    also kept, oldest first, to see what a device was asked just before it misbehaved.
+
+    The figures can be exported as a Prometheus text file, for the node exporter textfile collector,
+    or as a JSON snapshot. time_by_device() ranks the devices by the time their requests took.
+    """
+
+    def __init__(self, pdu_history: int = 0, clock: Callable[[], float] = time.perf_counter,
+                 wall_clock: Callable[[], float] = time.time):
+        """
+        :param pdu_history: The number of recent requests to keep, 0 keeps none.
+        :param clock: Monotonic time source latencies are measured with, replaceable for tests.
+        :param wall_clock: Time source of the PDU record timestamps, replaceable for tests.
+        """
+        assert pdu_history >= 0, "PDU history must not be negative"
+        self.clock = clock
+        self._wall_clock = wall_clock
+        self._stats: Dict[Tuple[str, int], RequestStats] = {}
+        self._recent: Optional[Deque[PduRecord]] = deque(maxlen=pdu_history) if pdu_history else None
+
+    def stats(self, device: str, function_code: int) -> RequestStats:
+        key = (device, function_code)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = RequestStats()
+        return stats
+
+    def record(self, device: str, function_code: int, address: int, count: int, latency: float,
+               outcome: RequestOutcome, detail: str = ""):
+        """Record one request of count items, count is the number of values written for writes."""
+        stats = self.stats(device, function_code)
+        request_bytes, response_bytes = pdu_sizes(function_code, count)
+        stats.requests += 1
+        stats.latency.record(latency)
+        stats.bytes_sent += request_bytes
+        if outcome == RequestOutcome.OK:
+            stats.bytes_received += response_bytes
+        elif outcome == RequestOutcome.ERROR:
+            # An exception response is the function code with the high bit set and the exception code
+            stats.errors += 1
+            stats.bytes_received += 2
+        else:
+            stats.timeouts += 1
+        if self._recent is not None:
+            self._recent.append(PduRecord(timestamp=self._wall_clock(), device=device, function_code=function_code,
+                                          address=address, count=count, latency=latency, outcome=outcome,
+                                          detail=detail))
+
+    def record_retries(self, device: str, function_code: int, retries: int):
+        if retries:
+            self.stats(device, function_code).retries += retries
+
+    def recent(self) -> List[PduRecord]:
+        return list(self._recent) if self._recent is not None else []
+
+    def time_by_device(self) -> List[Tuple[str, float]]:
+        """The seconds spent on the requests of every device, most first."""
+        totals: Dict[str, float] = {}
+        for (device, _), stats in self._stats.items():
+            totals[device] = totals.get(device, 0.0) + stats.latency.total
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def reset(self):
+        self._stats.clear()
+        if self._recent is not None:
+            self._recent.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            'requests': [dict(device=device, function=FUNCTION_NAMES[function_code], function_code=function_code,
+                              **stats.to_dict())
+                         for (device, function_code), stats in sorted(self._stats.items())],
+            'recent': [record.to_dict() for record in self.recent()],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self) -> str:
+        """The figures in the Prometheus text exposition format."""
+        lines = []
+        counters = (('modbus_requests_total', 'Modbus requests sent.', 'requests'),
+                    ('modbus_request_errors_total', 'Modbus requests answered with an error.', 'errors'),
+                    ('modbus_request_timeouts_total', 'Modbus requests not answered in time.', 'timeouts'),
+                    ('modbus_request_retries_total', 'Modbus chunk reads repeated after a failure.', 'retries'),
+                    ('modbus_pdu_bytes_sent_total', 'Modbus request PDU bytes sent.', 'bytes_sent'),
+                    ('modbus_pdu_bytes_received_total', 'Modbus response PDU bytes received.', 'bytes_received'))
+        items = sorted(self._stats.items())
+        for name, help_text, attribute in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f"{name}{{{self._labels(key)}}} {getattr(stats, attribute)}" for key, stats in items]
+
+        name = 'modbus_request_duration_seconds'
+        lines += [f"# HELP {name} Modbus request latency.", f"# TYPE {name} histogram"]
+        for key, stats in items:
+            labels = self._labels(key)
+            for bound in PROMETHEUS_BUCKETS:
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {stats.latency.count_at_or_below(bound)}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {stats.latency.count}')
+            lines.append(f"{name}_sum{{{labels}}} {stats.latency.total}")
+            lines.append(f"{name}_count{{{labels}}} {stats.latency.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write the Prometheus text file, replacing the previous one in one step so it is never read half written."""
+        self._write(path, self.to_prometheus())
+
+    def write_json(self, path: str):
+        self._write(path, self.to_json())
+
+    @staticmethod
+    def _write(path: str, content: str):
+        temp = path + TEMP_SUFFIX
+        with open(temp, 'w') as f:
+            f.write(content)
+        os.replace(temp, path)
+
+    @staticmethod
+    def _labels(key: Tuple[str, int]) -> str:
+        device, function_code = key
+        device = device.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return f'device="{device}",function="{FUNCTION_NAMES[function_code]}"'
+
@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from typing import Iterable, Set, Tuple
+
+ReadRange = Tuple[int, int]  # (address, count)
+
+
+@dataclass(frozen=True)
+class ModbusReadPlan:
+    """
+    The Modbus requests needed to read only the addresses a consumer uses, per table.
+    Each table holds (address, count) ranges in ascending address order.
+    """
+    coils: Tuple[ReadRange, ...] = ()
+    discrete_inputs: Tuple[ReadRange, ...] = ()
+    input_register: Tuple[ReadRange, ...] = ()
+    holding_register: Tuple[ReadRange, ...] = ()
+
+    @property
+    def request_count(self) -> int:
+        return len(self.coils) + len(self.discrete_inputs) + len(self.input_register) + len(self.holding_register)
+
+    @staticmethod
+    def addresses(ranges: Iterable[ReadRange]) -> Set[int]:
+        """Expand (address, count) ranges back into the set of addresses they cover."""
+        return {address for start, count in ranges for address in range(start, start + count)}
+
+
+class ModbusReadPlanner:
+    """
+    Compiles a set of consumed addresses into the minimal list of contiguous Modbus requests.
+
+    Two runs of addresses are merged into one request when the number of unused addresses between them
+    is no more than gap, and the merged request stays within the table's max_count.
+    Reading a few unused registers is usually cheaper than paying for another round trip.
+    """
+
+    def __init__(self, gap: int = 0,
+                 coil_max_count: int = 2000,
+                 discrete_input_max_count: int = 2000,
+                 input_register_max_count: int = 125,
+                 holding_register_max_count: int = 125):
+        assert gap >= 0, "Gap must not be negative"
+        assert min(coil_max_count, discrete_input_max_count,
+                   input_register_max_count, holding_register_max_count) > 0, "Max count must be positive"
+
+        self._gap = gap
+        self._coil_max_count = coil_max_count
+        self._discrete_input_max_count = discrete_input_max_count
+        self._input_register_max_count = input_register_max_count
+        self._holding_register_max_count = holding_register_max_count
+
+    def plan(self, coils: Iterable[int] = (),
+             discrete_inputs: Iterable[int] = (),
+             input_register: Iterable[int] = (),
+             holding_register: Iterable[int] = ()) -> ModbusReadPlan:
+        return ModbusReadPlan(
+            coils=self.coalesce(coils, self._gap, self._coil_max_count),
+            discrete_inputs=self.coalesce(discrete_inputs, self._gap, self._discrete_input_max_count),
+            input_register=self.coalesce(input_register, self._gap, self._input_register_max_count),
+            holding_register=self.coalesce(holding_register, self._gap, self._holding_register_max_count)
+        )
+
+    def merge(self, *plans: ModbusReadPlan) -> ModbusReadPlan:
+        """Combine several plans into one, so consumers due at the same time share the same requests."""
+        return self.plan(
+            coils=set().union(*(ModbusReadPlan.addresses(plan.coils) for plan in plans)),
+            discrete_inputs=set().union(*(ModbusReadPlan.addresses(plan.discrete_inputs) for plan in plans)),
+            input_register=set().union(*(ModbusReadPlan.addresses(plan.input_register) for plan in plans)),
+            holding_register=set().union(*(ModbusReadPlan.addresses(plan.holding_register) for plan in plans))
+        )
+
+    @staticmethod
+    def coalesce(addresses: Iterable[int], gap: int, max_count: int) -> Tuple[ReadRange, ...]:
+        """Group the sorted, de-duplicated addresses into (address, count) ranges."""
+        ranges = []
+        start = end = None
+
+        for address in sorted(set(addresses)):
+            assert address >= 0, f"Invalid address {address}"
+            if start is not None and address - end - 1 <= gap and address - start + 1 <= max_count:
+                end = address
+                continue
+            if start is not None:
+                ranges.append((start, end - start + 1))
+            start = end = address
+
+        if start is not None:
+            ranges.append((start, end - start + 1))
+
+        return tuple(ranges)
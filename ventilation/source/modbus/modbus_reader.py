@@ -1,8 +1,21 @@
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Callable, List, Awaitable, Generic
+from dataclasses import dataclass
+from typing import Callable, List, Awaitable, Generic, Iterable, Optional, Sequence, Set, Tuple
+from modbus.modbus_arrays import BitArray, RegisterArray
+from utils.deadline import Deadline
 from utils.response import T, Response
 from utils.status import Status
 
+# The details of a partial read start with this, a read that succeeded although some of its chunks failed
+PARTIAL_READ = "Partial read"
+
+
+def is_partial(response: Response) -> bool:
+    """True for a response some chunks of which failed or were cut off by the deadline."""
+    return response.status == Status.OK and response.details.startswith(PARTIAL_READ)
+
 
 class ModbusResultAdapter(Generic[T], ABC):
     @abstractmethod
@@ -30,56 +43,380 @@ class ModbusResultAdapter(Generic[T], ABC):
         """Converts the ModbusResultAdapter to a ValidatedResult."""
         pass
 
+    def is_rejected(self) -> bool:
+        """
+        Indicates the device refused the request as too large or out of range
+        (illegal data address or illegal data value), so a smaller request may succeed.
+        """
+        return False
+
+
+class DeadlineExceededResult(ModbusResultAdapter):
+    """The result of a request that was cut short, or never sent, because the call's deadline passed."""
+
+    async def read(self, client, address: int, count: int):  # pragma: no cover
+        pass
+
+    def is_error(self) -> bool:
+        return True
+
+    def get_data(self) -> List:
+        return []
+
+    def get_error_message(self) -> str:
+        return "Deadline exceeded"
+
+    def to_response(self) -> Response:
+        return Response(status=Status.EXCEPTION, details=self.get_error_message(), value=None)
+
+
+class AdaptiveMaxCount:
+    """
+    The largest request one table of a device accepts, and the addresses it refuses, learnt while reading.
+
+    Starts at the protocol limit. A rejected request is read again in halves. If every half is accepted the
+    span itself was readable, so the request was too large: the count is halved and the rejected size is
+    remembered as a ceiling. After grow_after full size requests in a row succeed, the count grows half way
+    back towards the ceiling. Once the count sits just below the ceiling, the ceiling is forgotten
+    after reprobe_after further successes, so a device that recovers is probed at larger sizes again.
+
+    A single address the device refuses on its own is pinned as a hole instead, and later requests are split
+    around it, so one unmapped address does not shrink the requests of the whole table. Holes are forgotten
+    after reprobe_after reads and found again if they are still there.
+    """
+
+    def __init__(self, limit: int, minimum: int = 1, grow_after: int = 20, reprobe_after: int = 500):
+        assert 0 < minimum <= limit, "Minimum must be positive and no larger than the limit"
+        assert grow_after > 0 and reprobe_after > 0, "Success thresholds must be positive"
+        self.limit = limit
+        self.minimum = minimum
+        self._grow_after = grow_after
+        self._reprobe_after = reprobe_after
+        self._count = limit
+        self._ceiling = limit + 1  # Smallest size known to be rejected
+        self._successes = 0
+        self.holes: Set[int] = set()
+        self._reads_since_pin = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def accepted(self, count: int):
+        if count < self._count:
+            return  # A short remainder chunk says nothing about the current size
+        self._successes += 1
+        converged = self._count + 1 >= self._ceiling
+        if converged and self._ceiling <= self.limit and self._successes >= self._reprobe_after:
+            self._ceiling = self.limit + 1
+            self._successes = 0
+        elif not converged and self._successes >= self._grow_after:
+            self._count = (self._count + self._ceiling) // 2
+            self._successes = 0
+
+    def rejected(self, count: int):
+        """A request of count was rejected although smaller requests over the same span were accepted."""
+        self._ceiling = min(self._ceiling, count)
+        self._count = max(self.minimum, min(self._count, count // 2))
+        self._successes = 0
+
+    def pin(self, address: int):
+        """The device refuses to read the address at all."""
+        self.holes.add(address)
+        self._reads_since_pin = 0
+
+    def read_started(self):
+        if self.holes:
+            self._reads_since_pin += 1
+            if self._reads_since_pin > self._reprobe_after:
+                self.holes.clear()
+
+
+@dataclass(frozen=True)
+class ChunkRetryPolicy:
+    """
+    How often a failed chunk is read again before it counts as failed. The wait before retry n
+    (counting from 0) is backoff * 2 ** n seconds, capped at max_backoff.
+    """
+    retries: int = 2
+    backoff: float = 0.05
+    max_backoff: float = 1.0
+
+    def __post_init__(self):
+        assert self.retries >= 0, "Retries must not be negative"
+        assert self.backoff >= 0 and self.max_backoff >= 0, "Backoff must not be negative"
+
+    def delay(self, attempt: int) -> float:
+        return min(self.max_backoff, self.backoff * 2 ** attempt)
+
+
+@dataclass(frozen=True)
+class ChunkStats:
+    """The outcome of reading one chunk, latency is the time taken by the last attempt in seconds."""
+    address: int
+    count: int
+    attempts: int
+    latency: float
+    status: Status
+
 
 class ModbusReader(Generic[T]):
-    def __init__(self, read_function: Callable[[int, int], Awaitable[ModbusResultAdapter[T]]], max_count: int):
+    # Weight of the newest request in the running mean of request latency
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, read_function: Callable[[int, int], Awaitable[ModbusResultAdapter[T]]], max_count: int,
+                 adaptive: bool = False,
+                 retry_policy: ChunkRetryPolicy = None,
+                 partial: bool = False,
+                 on_chunk: Callable[[ChunkStats], None] = None):
         """
         Initialize the ModbusReader.
 
         :param read_function: The function used to perform the Modbus read operation.
         :param max_count: The maximum number of items that can be read in a single Modbus request.
+        :param adaptive: Learn the largest request the device accepts, up to max_count. A rejected chunk
+                         is retried in smaller pieces instead of failing the read. Addresses the device
+                         refuses on their own are skipped from then on and read as None.
+        :param retry_policy: Read a failed chunk again, on its own, before giving up on it.
+        :param partial: Keep the chunks that succeeded when others fail. Their addresses read as None
+                        and the read only fails when no chunk succeeded.
+        :param on_chunk: Called with the attempts and latency of every chunk read.
         """
         self.read_function = read_function
         self.max_count = max_count
+        self.adaptive_max_count = AdaptiveMaxCount(max_count) if adaptive else None
+        self.retry_policy = retry_policy
+        self.partial = partial
+        self.on_chunk = on_chunk
+        self._latency: Optional[float] = None
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Running mean of the seconds one request takes, None until a request was made."""
+        return self._latency
+
+    def estimated_duration(self, ranges: Iterable[Tuple[int, int]]) -> float:
+        """The seconds reading the ranges one request after another is expected to take, 0 before any request."""
+        requests = sum(len(self._chunks(address, count)) for address, count in ranges)
+        return requests * (self._latency or 0.0)
 
-    async def read(self, start_address: int, total_count: int) -> Response[T]:
+    async def read(self, start_address: int, total_count: int, deadline: Deadline = None) -> Response[T]:
         """
         Read the specified number of items starting at the given address.
 
         :param start_address: The starting address for the read operation.
         :param total_count: The total number of items to read.
+        :param deadline: Every chunk, retry and split shares this deadline. Requests still outstanding when it
+                         passes are abandoned and chunks not yet sent are not sent, both fail as "Deadline exceeded".
         :return: A ValidatedResult object containing the status and read data.
         """
-        results = []
-        current_address = start_address
-        remaining_count = total_count
+        self._read_started()
+        pieces = await self._read_chunks(self._chunks(start_address, total_count), deadline)
+        return self._combine([(address - start_address, count, response) for address, count, response in pieces],
+                             total_count)
 
-        while remaining_count > 0:
-            current_count = min(self.max_count, remaining_count)
-            result_adapter = await self.read_function(current_address, current_count)
-            response = result_adapter.to_response()
+    async def read_ranges(self, ranges: Iterable[Tuple[int, int]], deadline: Deadline = None) -> Response[T]:
+        """
+        Read only the given (address, count) ranges, e.g. the requests of a ModbusReadPlan.
+
+        :param ranges: The (address, count) ranges to read, ranges larger than max_count are split.
+        :param deadline: Shared by every chunk, as for read.
+        :return: A Response whose value is indexed by register address. Addresses outside the ranges are None.
+        """
+        ranges = list(ranges)
+        self._read_started()
+        chunks = [chunk for address, count in ranges for chunk in self._chunks(address, count)]
+        pieces = await self._read_chunks(chunks, deadline)
+        return self._combine(pieces, max((address + count for address, count in ranges), default=0))
 
+    def _read_started(self):
+        if self.adaptive_max_count is not None:
+            self.adaptive_max_count.read_started()
+
+    def _combine(self, pieces: List[Tuple[int, int, Optional[Response[T]]]], length: int) -> Response[T]:
+        """
+        Assemble the (offset, count, response) pieces, placing each at its offset in a value of length items.
+        Without partial reads the first failed piece is returned. With partial reads failed pieces read as None
+        and are named in the details. Pieces without a response are holes, addresses the device refuses, and
+        read as None. When no piece was read at all the read fails.
+        """
+        values, failed = [], []
+        holes = False
+        for offset, count, response in pieces:
+            if response is None:
+                holes = True
+                continue
             if response.status == Status.EXCEPTION:
-                return response  # Return early if any error occurs
+                if not self.partial:
+                    return response  # Return early if any error occurs
+                failed.append((offset, count, response))
+                continue
+            values.append((offset, response.value[:count]))
+
+        if not values and failed:
+            return failed[0][2]
+        if not values and holes:
+            return Response(status=Status.EXCEPTION, details="Every address read was refused by the device",
+                            value=None)
 
-            results.extend(response.value)
-            current_address += current_count
-            remaining_count -= current_count
+        details = "Read successful"
+        if failed:
+            ranges = ", ".join(f"{offset}+{count}" for offset, count, _ in failed)
+            details = f"{PARTIAL_READ}, chunks {ranges} failed: {failed[0][2].details}"
 
         return Response[T](
             status=Status.OK,
-            details="Read successful",
-            value=results
+            details=details,
+            value=self._assemble(length, values)
         )
 
+    def _assemble(self, length: int, pieces: List[Tuple[int, Sequence]]) -> T:
+        """Place the values of each (offset, values) piece at its offset, offsets not read are None."""
+        results = [None] * length
+        for offset, values in pieces:
+            results[offset:offset + len(values)] = values
+        return results
+
+    async def _read_chunks(self, chunks: List[Tuple[int, int]],
+                           deadline: Deadline = None) -> List[Tuple[int, int, Optional[Response[T]]]]:
+        """
+        Read every chunk, in chunk order, into (address, count, response) pieces. Unless partial reads are
+        allowed, the read stops after the first failed piece, so no further requests are sent once an error
+        is known.
+        """
+        pieces = []
+        for address, count in chunks:
+            chunk_pieces = await self._read_chunk(address, count, deadline)
+            pieces.extend(chunk_pieces)
+            if not self.partial and self._failed(chunk_pieces):
+                break
+        return pieces
+
+    @staticmethod
+    def _failed(pieces: List[Tuple[int, int, Optional[Response[T]]]]) -> bool:
+        return any(response is not None and response.status == Status.EXCEPTION for _, _, response in pieces)
+
+    async def _read_chunk(self, address: int, count: int,
+                          deadline: Deadline = None) -> List[Tuple[int, int, Optional[Response[T]]]]:
+        """
+        Read one chunk into (address, count, response) pieces. When adapting, a rejected chunk is read again
+        in halves. A single address that is rejected is pinned as a hole, a piece without a response.
+        """
+        if deadline is not None and deadline.expired:
+            return [(address, count, DeadlineExceededResult().to_response())]
+
+        result_adapter = await self._attempt(address, count, deadline)
+        adaptive = self.adaptive_max_count
+        if adaptive is None or not result_adapter.is_rejected():
+            if adaptive is not None and not result_adapter.is_error():
+                adaptive.accepted(count)
+            return [(address, count, result_adapter.to_response())]
+
+        if count == 1:
+            adaptive.pin(address)
+            return [(address, count, None)]
+        if count <= adaptive.minimum:
+            return [(address, count, result_adapter.to_response())]
+
+        half = count // 2
+        pieces = await self._read_chunk(address, half, deadline)
+        if self.partial or not self._failed(pieces):
+            pieces += await self._read_chunk(address + half, count - half, deadline)
+            if all(response is not None and response.status == Status.OK for _, _, response in pieces):
+                # Every address of the span can be read, the request was only too large
+                adaptive.rejected(count)
+        return pieces
 
-class ModbusBitReader(ModbusReader[List[bool]]):
+    async def _attempt(self, address: int, count: int, deadline: Deadline = None) -> ModbusResultAdapter[T]:
+        """
+        Call the read function, retrying failures other than rejections as the retry policy allows.
+        No retry is made when the deadline would pass during its backoff.
+        """
+        retries = self.retry_policy.retries if self.retry_policy is not None else 0
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            result_adapter = await self._call(address, count, deadline)
+            latency = time.monotonic() - started
+            self._latency = latency if self._latency is None else \
+                self._latency + self.LATENCY_SMOOTHING * (latency - self._latency)
+            failed = result_adapter.is_error()
+            if not failed or result_adapter.is_rejected() or attempt >= retries:
+                break
+            delay = self.retry_policy.delay(attempt)
+            if deadline is not None and not deadline.allows(delay):
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        if self.on_chunk is not None:
+            self.on_chunk(ChunkStats(address=address, count=count, attempts=attempt + 1, latency=latency,
+                                     status=Status.EXCEPTION if failed else Status.OK))
+        return result_adapter
+
+    async def _call(self, address: int, count: int, deadline: Deadline = None) -> ModbusResultAdapter[T]:
+        """
+        One request, abandoned when the deadline passes before the answer arrives. Abandoning only stops waiting,
+        the transport keeps a request it already sent on the line until it is answered or times out.
+        """
+        if deadline is None:
+            return await self.read_function(address, count)
+        try:
+            return await asyncio.wait_for(self.read_function(address, count), timeout=deadline.remaining)
+        except asyncio.TimeoutError:
+            return DeadlineExceededResult()
+
+    def _chunks(self, start_address: int, total_count: int) -> List[Tuple[int, int]]:
+        """
+        Split the requested range into (address, count) pairs no larger than max_count, or the learnt count,
+        leaving out the holes the device refuses to read.
+        """
+        max_count = self.adaptive_max_count.count if self.adaptive_max_count is not None else self.max_count
+        chunks = []
+        for run_address, run_count in self._readable_runs(start_address, total_count):
+            current_address = run_address
+            remaining_count = run_count
+
+            while remaining_count > 0:
+                current_count = min(max_count, remaining_count)
+                chunks.append((current_address, current_count))
+                current_address += current_count
+                remaining_count -= current_count
+
+        return chunks
+
+    def _readable_runs(self, start_address: int, total_count: int) -> List[Tuple[int, int]]:
+        """The runs of the range between the pinned holes."""
+        holes = self.adaptive_max_count.holes if self.adaptive_max_count is not None else None
+        end = start_address + total_count
+        if not holes:
+            return [(start_address, total_count)]
+        runs = []
+        run_start = start_address
+        for hole in sorted(hole for hole in holes if start_address <= hole < end):
+            if hole > run_start:
+                runs.append((run_start, hole - run_start))
+            run_start = hole + 1
+        if run_start < end:
+            runs.append((run_start, end - run_start))
+        return runs
+
+
+class ModbusBitReader(ModbusReader[BitArray]):
+    """Reads coils or discrete inputs into a packed BitArray."""
     def __init__(self, read_function: Callable[[int, int], Awaitable[ModbusResultAdapter[List[bool]]]],
-                 max_count: int = 2000):
-        super().__init__(read_function, max_count)
+                 max_count: int = 2000, **options):
+        super().__init__(read_function, max_count, **options)
 
+    def _assemble(self, length: int, pieces: List[Tuple[int, Sequence]]) -> BitArray:
+        return BitArray.assemble(length, pieces)
 
-class ModbusWordReader(ModbusReader[List[int]]):
+
+class ModbusWordReader(ModbusReader[RegisterArray]):
+    """Reads registers into a RegisterArray backed by array('H')."""
     def __init__(self, read_function: Callable[[int, int], Awaitable[ModbusResultAdapter[List[int]]]],
-                 max_count: int = 125):
-        super().__init__(read_function, max_count)
+                 max_count: int = 125, **options):
+        super().__init__(read_function, max_count, **options)
+
+    def _assemble(self, length: int, pieces: List[Tuple[int, Sequence]]) -> RegisterArray:
+        return RegisterArray.assemble(length, pieces)
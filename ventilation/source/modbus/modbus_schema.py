@@ -0,0 +1,122 @@
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, FrozenSet, Iterable, Optional, Sequence, Tuple, Union
+
+from modbus.modbus_arrays import RegisterArray
+
+
+class RegisterType(Enum):
+    """How a value is stored in registers, the value is its big endian struct code."""
+    UINT16 = 'H'
+    INT16 = 'h'
+    # 32 bit values span two registers, high word in the lower address
+    UINT32 = 'I'
+    INT32 = 'i'
+    FLOAT32 = 'f'
+
+    @property
+    def registers(self) -> int:
+        return struct.calcsize('>' + self.value) // 2
+
+
+@dataclass(frozen=True)
+class RegisterField:
+    """
+    What one value in a register table means. The value is the raw value divided by scale, and None
+    when it is one of the sentinels, raw values a device uses to say there is no reading.
+    """
+    name: str
+    address: int
+    type: RegisterType = RegisterType.UINT16
+    scale: float = 1
+    unit: str = ""
+    sentinels: FrozenSet[int] = frozenset()
+
+    def __post_init__(self):
+        assert self.address >= 0, f"Invalid address {self.address}"
+        assert self.scale != 0, "Scale must not be zero"
+
+
+class RegisterSchema:
+    """
+    The fields of a register table compiled into one decoder.
+
+    When the schema is created the fields are turned into a single big endian struct format, with pad
+    bytes for the registers no field covers, and a namedtuple record type with one attribute per field.
+    decode() then unpacks a whole snapshot with one struct call and only visits the fields that are
+    scaled, have sentinels or were not read. Adding a field adds a format code and a record attribute,
+    nothing per poll.
+    """
+
+    def __init__(self, name: str, fields: Iterable[RegisterField]):
+        self._fields: Tuple[RegisterField, ...] = tuple(sorted(fields, key=lambda f: f.address))
+        self._by_name: Dict[str, RegisterField] = {f.name: f for f in self._fields}
+        assert len(self._by_name) == len(self._fields), "Field names must be unique"
+
+        fmt = '>'
+        address = 0
+        for f in self._fields:
+            assert f.address >= address, f"{f.name} overlaps the field before it"
+            fmt += 'xx' * (f.address - address) + f.type.value
+            address = f.address + f.type.registers
+        self._struct = struct.Struct(fmt)
+        self._length = address
+        self.record = namedtuple(name, [f.name for f in self._fields])
+
+        # (index, scale, sentinels) of the fields whose raw value is not already the value
+        self._conversions = tuple((index, f.scale, f.sentinels or None) for index, f in enumerate(self._fields)
+                                  if f.scale != 1 or f.sentinels)
+        self._spans = tuple((index, f.address, f.type.registers) for index, f in enumerate(self._fields))
+
+    @property
+    def fields(self) -> Tuple[RegisterField, ...]:
+        return self._fields
+
+    @property
+    def length(self) -> int:
+        """The number of registers from address 0 that cover every field."""
+        return self._length
+
+    def field(self, name: str) -> RegisterField:
+        return self._by_name[name]
+
+    def unit(self, name: str) -> str:
+        return self._by_name[name].unit
+
+    def decode(self, registers: Union[RegisterArray, Sequence[Optional[int]]]):
+        """
+        Decode a snapshot of the table into a record. Fields that were not read, or lie beyond the end
+        of a short snapshot, are None.
+        """
+        if not isinstance(registers, RegisterArray):
+            registers = RegisterArray.assemble(len(registers), [(address, [value & 0xFFFF])
+                                                                for address, value in enumerate(registers)
+                                                                if value is not None])
+        words = array('H')
+        words.frombytes(registers.words[:self._length].cast('B'))
+        missing = self._length - len(words)
+        if missing > 0:
+            words.frombytes(bytes(2 * missing))
+        if sys.byteorder == 'little':
+            words.byteswap()
+
+        values = list(self._struct.unpack(words))
+        for index, scale, sentinels in self._conversions:
+            value = values[index]
+            if sentinels is not None and value in sentinels:
+                values[index] = None
+            elif scale != 1:
+                values[index] = value / scale
+
+        valid = registers.valid
+        if missing > 0 or valid is not None:
+            length = len(registers)
+            for index, address, count in self._spans:
+                if address + count > length or \
+                        (valid is not None and not all(valid[a] for a in range(address, address + count))):
+                    values[index] = None
+        return self.record._make(values)
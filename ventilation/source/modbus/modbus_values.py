@@ -53,6 +53,28 @@ class StrictTimeout(Timeout, StrictValidatedValue):
     pass
 
 
+class UnitId(RangeValidatedValue[int]):
+    """
+    A class that represents and validates the unit id (slave address) a Modbus request is addressed to.
+    Any byte is valid: Modbus TCP devices commonly answer as unit 0 or 255. Serial lines only address
+    units SERIAL_MIN to SERIAL_MAX, 0 is their broadcast address and is never answered.
+    """
+    DEFAULT = 1
+    SERIAL_MIN = 1
+    SERIAL_MAX = 247
+
+    def __init__(self, value: int):
+        super().__init__(value, int, 0, 255)
+
+    @property
+    def is_serial(self) -> bool:
+        return self.value is not None and self.SERIAL_MIN <= self.value <= self.SERIAL_MAX
+
+
+class StrictUnitId(UnitId, StrictValidatedValue):
+    pass
+
+
 class ModbusSize(RangeValidatedValue[int]):
     """
     A class that represents and validates the size of Modbus data structures (e.g., coils, registers).
@@ -0,0 +1,144 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from modbus.modbus_read_plan import ReadRange
+from utils.operation_response import OperationResponse, OperationStatus
+from utils.response import Response
+from utils.status import Status
+
+V = TypeVar('V')
+
+# The most values one write multiple registers (function 16) or write multiple coils (function 15) request carries
+MAX_WRITE_REGISTERS = 123
+MAX_WRITE_COILS = 1968
+
+WriteFunction = Callable[[int, List[V]], Awaitable[OperationResponse]]
+ReadBackFunction = Callable[[Tuple[ReadRange, ...]], Awaitable[Response[Sequence[Optional[V]]]]]
+
+
+class ModbusWriteQueue:
+    """
+    Collects holding register and coil writes and sends them in as few requests as possible.
+
+    Writing an address again before the queue is flushed replaces the earlier value, only the last one is
+    sent. On flush every run of adjacent holding registers is written with one write multiple registers
+    (function 16) request and every run of adjacent coils with one write multiple coils (function 15)
+    request, runs longer than a request can carry are split.
+
+    A run whose write fails is queued again for the next flush, except for the addresses written again in
+    the meantime, whose newer value wins.
+
+    With verify, the ranges written successfully are read back afterwards and any address that holds a
+    different value is reported, e.g. a setpoint the device clamped or refused to apply.
+    """
+
+    def __init__(self, write_registers: WriteFunction[int], write_coils: WriteFunction[bool],
+                 read_registers: ReadBackFunction[int] = None, read_coils: ReadBackFunction[bool] = None,
+                 max_registers: int = MAX_WRITE_REGISTERS, max_coils: int = MAX_WRITE_COILS):
+        """
+        :param write_registers: Writes values to consecutive holding registers starting at an address.
+        :param write_coils: Writes values to consecutive coils starting at an address.
+        :param read_registers: Reads (address, count) ranges of holding registers, indexed by address, for verify.
+        :param read_coils: Reads (address, count) ranges of coils, indexed by address, for verify.
+        """
+        assert 0 < max_registers <= MAX_WRITE_REGISTERS, f"Max registers must be between 1 and {MAX_WRITE_REGISTERS}"
+        assert 0 < max_coils <= MAX_WRITE_COILS, f"Max coils must be between 1 and {MAX_WRITE_COILS}"
+        self._write_registers = write_registers
+        self._write_coils = write_coils
+        self._read_registers = read_registers
+        self._read_coils = read_coils
+        self._max_registers = max_registers
+        self._max_coils = max_coils
+        self._registers: Dict[int, int] = {}
+        self._coils: Dict[int, bool] = {}
+
+    @property
+    def pending(self) -> int:
+        """The number of addresses waiting to be written."""
+        return len(self._registers) + len(self._coils)
+
+    def set_register(self, address: int, value: int):
+        """Queue a register write, negative values are written as their 16 bit two's complement."""
+        assert address >= 0, f"Invalid address {address}"
+        assert isinstance(value, int) and -0x8000 <= value <= 0xFFFF, f"Register value {value} is not a 16 bit value"
+        self._registers[address] = value & 0xFFFF
+
+    def set_coil(self, address: int, value: bool):
+        assert address >= 0, f"Invalid address {address}"
+        self._coils[address] = bool(value)
+
+    def clear(self):
+        """Drop every write not yet sent."""
+        self._registers.clear()
+        self._coils.clear()
+
+    async def flush(self, verify: bool = False) -> OperationResponse:
+        """
+        Send every pending write. Writes queued while the flush is in progress are left for the next flush,
+        and so are the writes that fail.
+
+        :param verify: Read the written ranges back and fail if any address does not hold the value written.
+        """
+        assert not verify or (self._read_registers is not None and self._read_coils is not None), \
+            "Verify needs read back functions"
+        registers, self._registers = self._registers, {}
+        coils, self._coils = self._coils, {}
+
+        register_runs = self.runs(registers, self._max_registers)
+        coil_runs = self.runs(coils, self._max_coils)
+        failures = []
+        written_registers = await self._write_runs('holding_register', register_runs, self._write_registers,
+                                                   self._registers, failures)
+        written_coils = await self._write_runs('coils', coil_runs, self._write_coils, self._coils, failures)
+
+        if verify:
+            await self._verify('holding_register', written_registers, registers, self._read_registers, failures)
+            await self._verify('coils', written_coils, coils, self._read_coils, failures)
+
+        requests = len(register_runs) + len(coil_runs)
+        if failures:
+            return OperationResponse(status=OperationStatus.FAILED, details="; ".join(failures))
+        return OperationResponse(status=OperationStatus.OK,
+                                 details=f"Wrote {len(registers) + len(coils)} values in {requests} requests")
+
+    @staticmethod
+    def runs(values: Dict[int, V], max_count: int) -> List[Tuple[int, List[V]]]:
+        """Group the values into (address, values) runs of adjacent addresses, at most max_count long."""
+        runs = []
+        for address in sorted(values):
+            if runs and runs[-1][0] + len(runs[-1][1]) == address and len(runs[-1][1]) < max_count:
+                runs[-1][1].append(values[address])
+            else:
+                runs.append((address, [values[address]]))
+        return runs
+
+    @staticmethod
+    async def _write_runs(table: str, runs: List[Tuple[int, List[V]]], write: WriteFunction[V],
+                          pending: Dict[int, V], failures: List[str]) -> List[ReadRange]:
+        """
+        Write each run, returning the ranges written successfully and noting the failures. The values of a
+        failed run go back to pending, unless a newer value for the address was queued during the flush.
+        """
+        written = []
+        for address, values in runs:
+            response = await write(address, values)
+            if response.status == OperationStatus.OK:
+                written.append((address, len(values)))
+            else:
+                failures.append(f"{table} {address}+{len(values)} not written: {response.details}")
+                for offset, value in enumerate(values):
+                    pending.setdefault(address + offset, value)
+        return written
+
+    @staticmethod
+    async def _verify(table: str, ranges: List[ReadRange], expected: Dict[int, V], read: ReadBackFunction[V],
+                      failures: List[str]):
+        if not ranges:
+            return
+        response = await read(tuple(ranges))
+        if response.status != Status.OK:
+            failures.append(f"{table} read back failed: {response.details}")
+            return
+        mismatched = [address for start, count in ranges for address in range(start, start + count)
+                      if response.value[address] != expected[address]]
+        if mismatched:
+            failures.append(f"{table} read back differs at {', '.join(map(str, mismatched))}")
@@ -1,6 +1,7 @@
 from modbus.modbus_client_builder import ModbusClientBuilder
-from modbus.rtu_values import BaudRate, StopBits, SerialPort, ParityType
+from modbus.rtu_values import BaudRate, StopBits, SerialPort, ParityType, BusPriority
 from modbus.modbus import ModbusInterface
+from modbus.modbus_values import UnitId
 
 
 class ModbusRTUClientBuilder(ModbusClientBuilder):
@@ -10,6 +11,7 @@ class ModbusRTUClientBuilder(ModbusClientBuilder):
         self._parity = None
         self._stop_bits = None
         self._serial_port = None
+        self._bus_priority = BusPriority.NORMAL
 
     # Properties with getters
     @property
@@ -28,6 +30,10 @@ class ModbusRTUClientBuilder(ModbusClientBuilder):
     def serial_port(self) -> SerialPort:
         return self._serial_port
 
+    @property
+    def bus_priority(self) -> BusPriority:
+        return self._bus_priority
+
     # Setter methods with validation
     def set_baud_rate(self, baud_rate: BaudRate):
         assert isinstance(baud_rate, BaudRate), "Invalid baud rate"
@@ -49,9 +55,16 @@ class ModbusRTUClientBuilder(ModbusClientBuilder):
         self._serial_port = serial_port
         return self
 
+    def set_bus_priority(self, bus_priority: BusPriority):
+        assert isinstance(bus_priority, BusPriority), "Invalid bus priority"
+        self._bus_priority = bus_priority
+        return self
+
     def build(self) -> ModbusInterface:
         assert self._baud_rate, "Baud rate must be set for ModbusRTU"
         assert self._parity, "Parity must be set for ModbusRTU"
         assert self._stop_bits, "Stop bits must be set for ModbusRTU"
         assert self._serial_port, "Serial port must be set for ModbusRTU"
+        assert self._unit_id is None or self._unit_id.is_serial, \
+            f"Unit id must be {UnitId.SERIAL_MIN} to {UnitId.SERIAL_MAX} for ModbusRTU"
         return super().build()
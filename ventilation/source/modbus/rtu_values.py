@@ -1,6 +1,6 @@
 import platform
 import re
-from enum import Enum
+from enum import Enum, IntEnum
 
 from utils.constants import DEFAULT_SUCCESS_MESSAGE
 from utils.value import ValidatedValue, StrictValidatedValue, TypeValidationStrategy, EnumValidationStrategy
@@ -14,6 +14,16 @@ class ParityType(Enum):
     ODD = 'O'
 
 
+class BusPriority(IntEnum):
+    """
+    The order in which requests waiting for a shared serial line are sent, lower values go first.
+    Requests of the same priority are sent in the order they were made.
+    """
+    HIGH = 0  # Latency sensitive, e.g. the sensors a control loop depends on
+    NORMAL = 1
+    LOW = 2  # Background polling that can wait, e.g. logging or diagnostics
+
+
 class SerialPort(ValidatedValue[str]):
     """
     A class that represents and validates a serial port name depending on the operating system.
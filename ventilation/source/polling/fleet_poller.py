@@ -0,0 +1,172 @@
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from devices.device_factory import DeviceFactory, DeviceStatus
+from modbus.modbus import ModbusData, ModbusInterface
+from modbus.modbus_read_plan import ModbusReadPlan
+from utils.standard_name import StandardName
+from utils.status import Status
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_CYCLE_PERIOD = 1.0
+
+
+@dataclass(frozen=True)
+class FleetDevice:
+    """
+    One device of the fleet. Devices with the same bus, e.g. the RTU slaves on one serial port,
+    are read one at a time, devices without a bus are read concurrently.
+    """
+    name: str
+    modbus: ModbusInterface
+    plan: Optional[ModbusReadPlan] = None
+    bus: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class DeviceReading:
+    """
+    The outcome of reading one device in a cycle.
+
+    Fields:
+        - started: Seconds from the start of the cycle until the read was issued.
+        - duration: Seconds the read took.
+        - error: Set when the read raised instead of returning data.
+    """
+    name: str
+    data: Optional[ModbusData]
+    started: float
+    duration: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and all(
+            response.status == Status.OK for response in
+            (self.data.coils, self.data.discrete_inputs, self.data.input_register, self.data.holding_register))
+
+
+@dataclass(frozen=True)
+class FleetCycle:
+    """The readings of every device in one cycle, in the order the devices were given, with timing statistics."""
+    readings: Tuple[DeviceReading, ...]
+    started: float
+    duration: float
+
+    def __getitem__(self, name: str) -> DeviceReading:
+        return next(reading for reading in self.readings if reading.name == name)
+
+    @property
+    def failed(self) -> List[str]:
+        return [reading.name for reading in self.readings if not reading.ok]
+
+    @property
+    def max_latency(self) -> float:
+        return max((reading.duration for reading in self.readings), default=0.0)
+
+    @property
+    def mean_latency(self) -> float:
+        return sum(reading.duration for reading in self.readings) / len(self.readings) if self.readings else 0.0
+
+    @property
+    def max_wait(self) -> float:
+        """The longest a device waited for its turn, on a busy bus or for a free concurrency slot."""
+        return max((reading.started for reading in self.readings), default=0.0)
+
+
+class FleetPoller:
+    """
+    Polls many Modbus devices per cycle.
+
+    Devices without a bus are read concurrently, at most max_concurrency requests are in flight at once.
+    The devices sharing a bus are read in turn by a single task per bus, buses run in parallel with each
+    other. Each cycle a bus starts one device further along its list, so no device always waits last.
+    """
+
+    def __init__(self, devices: Iterable[FleetDevice],
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param devices: The devices to poll, names must be unique.
+        :param max_concurrency: The most reads in flight at once across the whole fleet.
+        :param clock: Monotonic time source, replaceable for tests.
+        """
+        self._devices = list(devices)
+        assert self._devices, "At least one device is required"
+        assert len({device.name for device in self._devices}) == len(self._devices), "Device names must be unique"
+        assert max_concurrency > 0, "Max concurrency must be positive"
+
+        self._max_concurrency = max_concurrency
+        self._clock = clock
+        self._buses: Dict[str, List[FleetDevice]] = defaultdict(list)
+        for device in self._devices:
+            if device.bus is not None:
+                self._buses[device.bus].append(device)
+        self._cycle = 0
+        self._stop_event = asyncio.Event()
+
+    @classmethod
+    def from_factory(cls, device_names: Iterable[StandardName],
+                     plans: Dict[str, ModbusReadPlan] = None, **kwargs) -> 'FleetPoller':
+        """
+        Create the devices through the DeviceFactory and poll their modbus interfaces. Devices on a
+        shared serial port are grouped by the port their interface reports.
+        """
+        plans = plans or {}
+        devices = []
+        for name in device_names:
+            response = DeviceFactory.get_device(name)
+            assert response.status == DeviceStatus.VALID, response.details
+            modbus = response.device.modbus
+            devices.append(FleetDevice(name=name.value, modbus=modbus, plan=plans.get(name.value),
+                                       bus=modbus.shared_bus))
+        return cls(devices, **kwargs)
+
+    async def poll_cycle(self) -> FleetCycle:
+        """Read every device once."""
+        started = self._clock()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        readings: Dict[str, DeviceReading] = {}
+
+        async def read(device: FleetDevice):
+            async with semaphore:
+                readings[device.name] = await self._read(device, started)
+
+        async def read_bus(devices: List[FleetDevice]):
+            offset = self._cycle % len(devices)
+            for device in devices[offset:] + devices[:offset]:
+                await read(device)
+
+        await asyncio.gather(*[read(device) for device in self._devices if device.bus is None],
+                             *[read_bus(devices) for devices in self._buses.values()])
+        self._cycle += 1
+
+        return FleetCycle(readings=tuple(readings[device.name] for device in self._devices),
+                          started=started, duration=self._clock() - started)
+
+    async def _read(self, device: FleetDevice, cycle_started: float) -> DeviceReading:
+        started = self._clock()
+        try:
+            data, error = await device.modbus.read(device.plan), None
+        except Exception as e:
+            data, error = None, f"{type(e).__name__}: {e}"
+        return DeviceReading(name=device.name, data=data, started=started - cycle_started,
+                             duration=self._clock() - started, error=error)
+
+    async def run(self, on_cycle: Callable[[FleetCycle], None], period: float = DEFAULT_CYCLE_PERIOD):
+        """Poll a cycle every period seconds until stop is called. A cycle that overruns starts the next at once."""
+        assert period > 0, "Period must be positive"
+        self._stop_event.clear()
+        while not self._stop_event.is_set():
+            cycle = await self.poll_cycle()
+            on_cycle(cycle)
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=max(0.0, period - cycle.duration))
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,134 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from modbus.modbus import ModbusData, ModbusInterface
+from modbus.modbus_change_detector import ModbusChangeDetector, ModbusChanges
+from modbus.modbus_read_plan import ModbusReadPlan, ModbusReadPlanner
+
+DEFAULT_TICK = 0.05
+
+
+@dataclass(frozen=True)
+class PollGroup:
+    """
+    A named set of registers polled at its own period, e.g. temperatures every 0.2s
+    and configuration holding registers every 60s.
+    """
+    name: str
+    period: float
+    plan: ModbusReadPlan
+
+    def __post_init__(self):
+        assert self.period > 0, "Poll period must be positive"
+
+
+@dataclass(frozen=True)
+class PollResult:
+    """The data read for every group that was due in the same tick, and what changed if changes are tracked."""
+    groups: Tuple[str, ...]
+    data: ModbusData
+    timestamp: float
+    changes: Optional[ModbusChanges] = None
+
+
+class PollScheduler:
+    """
+    Multi-rate polling of a ModbusInterface.
+
+    Every group keeps its own schedule. Groups that are due within the same tick are merged into a
+    single ModbusReadPlan, so they share one batched read. The first poll of each group is offset by
+    a random phase inside its period and each reschedule adds a little jitter, so many devices started
+    together do not all hit the bus at the same instant. The jitter only delays a poll, the cadence
+    is kept from the unjittered deadlines so it does not drift.
+    """
+
+    def __init__(self, modbus: ModbusInterface, groups: List[PollGroup],
+                 on_result: Callable[[PollResult], None],
+                 planner: ModbusReadPlanner = None,
+                 tick: float = DEFAULT_TICK,
+                 jitter: float = 0.1,
+                 clock: Callable[[], float] = time.monotonic,
+                 rng: random.Random = None,
+                 change_detector: ModbusChangeDetector = None):
+        """
+        :param modbus: The device to poll.
+        :param groups: The register groups and their periods.
+        :param on_result: Called with the result of every batched read.
+        :param planner: Used to merge the plans of groups due together.
+        :param tick: Groups due within this many seconds of each other are read together.
+        :param jitter: Fraction of a group's period added at random to each reschedule.
+        :param clock: Monotonic time source, replaceable for tests.
+        :param rng: Random source for phase and jitter, replaceable for tests.
+        :param change_detector: Compares every read with the previous one, its subscribers get only the changes.
+        """
+        assert groups, "At least one poll group is required"
+        assert len({group.name for group in groups}) == len(groups), "Poll group names must be unique"
+        assert tick >= 0, "Tick must not be negative"
+        assert 0 <= jitter < 1, "Jitter must be a fraction of the period"
+
+        self._modbus = modbus
+        self._groups = list(groups)
+        self._on_result = on_result
+        self._planner = planner or ModbusReadPlanner()
+        self._tick = tick
+        self._jitter = jitter
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._change_detector = change_detector
+        self._stop_event = asyncio.Event()
+
+        now = self._clock()
+        # The unjittered deadline of every group, the cadence is kept from these
+        self._base_due = {group.name: now + self._rng.uniform(0, group.period) for group in self._groups}
+        self._next_due = dict(self._base_due)
+
+    @property
+    def next_due(self) -> float:
+        """The time at which the next group is due."""
+        return min(self._next_due.values())
+
+    def due_groups(self, now: float) -> List[PollGroup]:
+        """The groups due now, or within one tick from now."""
+        return [group for group in self._groups if self._next_due[group.name] <= now + self._tick]
+
+    async def poll_once(self) -> Optional[PollResult]:
+        """Read every due group in one batched request and reschedule them. Returns None if nothing was due."""
+        now = self._clock()
+        due = self.due_groups(now)
+        if not due:
+            return None
+
+        data = await self._modbus.read(self._planner.merge(*(group.plan for group in due)))
+
+        for group in due:
+            self._reschedule(group, now)
+
+        changes = self._change_detector.update(data) if self._change_detector is not None else None
+        result = PollResult(groups=tuple(group.name for group in due), data=data, timestamp=now, changes=changes)
+        self._on_result(result)
+        return result
+
+    def _reschedule(self, group: PollGroup, now: float):
+        # Keep to the group's cadence, but never try to catch up on periods that were missed
+        base_due = self._base_due[group.name] + group.period
+        if base_due <= now:
+            base_due = now + group.period
+        self._base_due[group.name] = base_due
+        self._next_due[group.name] = base_due + self._rng.uniform(0, self._jitter * group.period)
+
+    async def run(self):
+        """Poll until stop is called."""
+        self._stop_event.clear()
+        while not self._stop_event.is_set():
+            await self.poll_once()
+            delay = max(0.0, self.next_due - self._clock())
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,329 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, ClassVar, Dict, Optional, Set, TypeVar
+
+from pymodbus.client import ModbusBaseClient
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+from modbus.modbus_values import UnitId
+from py_modbus.modbus_connection_manager import ModbusConnectionManager
+from utils.operation_response import OperationResponse, OperationStatus
+
+R = TypeVar('R')
+
+DEFAULT_PROBE_INTERVAL = 10.0
+DEFAULT_PROBE_TIMEOUT = 2.0
+DEFAULT_DRAIN_TIMEOUT = 5.0
+
+
+@dataclass(frozen=True)
+class ReconnectBackoff:
+    """
+    Exponential reconnect delays with jitter.
+
+    Attempt n waits delay * 2^n seconds, capped at delay_max, scaled down at random by up to the jitter
+    fraction, so clients that lost the same gateway at the same moment do not all retry in step.
+    """
+    delay: float
+    delay_max: float
+    jitter: float = 0.5
+
+    def __post_init__(self):
+        assert 0 < self.delay <= self.delay_max, "Delay must be positive and no larger than the maximum delay"
+        assert 0 <= self.jitter <= 1, "Jitter must be a fraction between 0 and 1"
+
+    def delay_for(self, attempt: int, rand: Callable[[], float] = random.random) -> float:
+        delay = min(self.delay_max, self.delay * (2 ** attempt))
+        return delay * (1 - self.jitter * rand())
+
+
+@dataclass(frozen=True)
+class ConnectionMetrics:
+    """
+    A snapshot of one pooled connection.
+
+    Fields:
+        - consumers: Clients currently connected through the pool.
+        - in_flight: Requests sent and not yet answered.
+        - connection_losses: Times a failed request or probe found the connection down.
+        - reconnects: Times the connection was re-established after a loss.
+        - failed_reconnects: Reconnect attempts that did not succeed.
+        - rejected: Requests failed at once because the connection was down.
+    """
+    endpoint: str
+    connected: bool
+    consumers: int
+    in_flight: int
+    requests: int
+    rejected: int
+    probes: int
+    failed_probes: int
+    connection_losses: int
+    reconnects: int
+    failed_reconnects: int
+    last_error: Optional[str]
+
+
+async def default_probe(client: ModbusBaseClient):
+    """Read one holding register, any answer, a Modbus exception response included, proves the link is alive."""
+    await client.read_holding_registers(0, 1, slave=UnitId.DEFAULT)
+
+
+class PooledConnection:
+    """
+    One connection to an endpoint, shared by every client that talks to it.
+
+    The connection is opened by the first client to connect and, once the last one disconnects, closed
+    after the requests in flight have drained. While it has clients a supervisor task probes it whenever it
+    has been idle for a probe interval, which detects half open sockets, and reconnects it with jittered
+    exponential backoff after it was lost. Requests made while it is down fail at once with a
+    ConnectionException instead of each waiting out the timeout.
+    """
+
+    def __init__(self, endpoint: str, client: ModbusBaseClient, backoff: ReconnectBackoff,
+                 probe: Callable[[ModbusBaseClient], Awaitable] = default_probe,
+                 probe_interval: float = DEFAULT_PROBE_INTERVAL,
+                 probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+                 drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param endpoint: The host:port the client connects to.
+        :param client: The client owning the transport.
+        :param backoff: The delays between reconnect attempts.
+        :param probe: Performs a cheap request on the client, raising when the link is dead.
+        :param probe_interval: Seconds of idleness before the connection is probed.
+        :param probe_timeout: Seconds a probe may take before the connection is considered lost.
+        :param drain_timeout: Seconds the last disconnect waits for requests in flight before closing.
+        :param clock: Monotonic time source, replaceable for tests.
+        """
+        assert probe_interval > 0 and probe_timeout > 0, "Probe interval and timeout must be positive"
+        assert drain_timeout >= 0, "Drain timeout must not be negative"
+        self._endpoint = endpoint
+        self._client = client
+        self._manager = ModbusConnectionManager(client)
+        self._backoff = backoff
+        self._probe = probe
+        self._probe_interval = probe_interval
+        self._probe_timeout = probe_timeout
+        self._drain_timeout = drain_timeout
+        self._clock = clock
+
+        self._up = False
+        self._consumers: Set[int] = set()  # id() of every client connected through the connection
+        self._in_flight = 0
+        self._last_activity = clock()
+        self._last_error: Optional[str] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._counters = dict(requests=0, rejected=0, probes=0, failed_probes=0, connection_losses=0,
+                              reconnects=0, failed_reconnects=0)
+
+    @property
+    def endpoint(self) -> str:
+        return self._endpoint
+
+    @property
+    def client(self) -> ModbusBaseClient:
+        return self._client
+
+    @property
+    def in_flight(self) -> int:
+        """Requests sent and not yet answered."""
+        return self._in_flight
+
+    @property
+    def connected(self) -> bool:
+        return self._up and bool(self._client.connected)
+
+    def metrics(self) -> ConnectionMetrics:
+        return ConnectionMetrics(endpoint=self._endpoint, connected=self.connected, consumers=len(self._consumers),
+                                 in_flight=self._in_flight, last_error=self._last_error, **self._counters)
+
+    async def connect(self, consumer: object) -> OperationResponse:
+        """
+        Connect consumer, opening the connection if it is the first. Connecting a consumer again is a no-op.
+
+        :param consumer: The client connecting, identified by its id.
+        """
+        if self.connected:
+            self._consumers.add(id(consumer))
+            return OperationResponse(status=OperationStatus.OK, details="Connected to pooled connection.")
+
+        response = await self._manager.connect()
+        if response.status == OperationStatus.OK:
+            self._consumers.add(id(consumer))
+            self._up = True
+            self._last_activity = self._clock()
+            self._supervise()
+        else:
+            self._last_error = response.details
+        return response
+
+    def disconnect(self, consumer: object) -> OperationResponse:
+        """
+        Disconnect consumer, closing the connection once no consumer is left. Disconnecting a consumer that
+        is not connected is a no-op, so it cannot close the connection under the others.
+        """
+        if id(consumer) not in self._consumers:
+            return OperationResponse(status=OperationStatus.OK, details="Not connected to pooled connection.")
+        self._consumers.discard(id(consumer))
+        if self._consumers:
+            return OperationResponse(status=OperationStatus.OK,
+                                     details=f"Disconnected, connection still in use by {len(self._consumers)} clients.")
+
+        self._up = False
+        self._notify()
+        if self._in_flight:
+            asyncio.get_running_loop().create_task(self._drain_and_close())
+            return OperationResponse(status=OperationStatus.OK,
+                                     details=f"Closing once {self._in_flight} requests in flight complete.")
+        return self._manager.disconnect()
+
+    async def close(self) -> OperationResponse:
+        """Disconnect every client, waiting for the requests in flight to drain before closing."""
+        self._consumers.clear()
+        self._up = False
+        self._notify()
+        await self._wait_for_drain()
+        if self._supervisor is not None:
+            await asyncio.gather(self._supervisor, return_exceptions=True)
+        return self._manager.disconnect()
+
+    async def execute(self, request: Callable[[ModbusBaseClient], Awaitable[R]]) -> R:
+        """
+        Send a request on the connection.
+
+        :raises ConnectionException: At once while the connection is down, or when the request found it lost.
+
+        The connection is marked lost, for the supervisor to reconnect, when a request raises
+        ConnectionException or ModbusIOException, which pymodbus raises after closing the transport once its
+        retries are used up, or when the client is disconnected after the request.
+        """
+        if not self.connected:
+            self._counters['rejected'] += 1
+            raise ConnectionException(f"{self._endpoint} is not connected")
+
+        self._in_flight += 1
+        self._counters['requests'] += 1
+        try:
+            return await request(self._client)
+        except (ConnectionException, ModbusIOException) as e:
+            self._lost(e)
+            raise
+        finally:
+            if not self._client.connected:
+                self._lost(ConnectionException(f"{self._endpoint} closed during a request"))
+            self._in_flight -= 1
+            self._last_activity = self._clock()
+            if not self._in_flight and self._drained is not None:
+                self._drained.set()
+
+    def _supervise(self):
+        if self._supervisor is None or self._supervisor.done():
+            self._wake = asyncio.Event()
+            self._supervisor = asyncio.get_running_loop().create_task(self._run_supervisor())
+
+    def _notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    def _lost(self, error: BaseException):
+        if not self._up:
+            return
+        self._up = False
+        self._last_error = f"{type(error).__name__}: {error}"
+        self._counters['connection_losses'] += 1
+        self._client.close()
+        self._notify()
+
+    async def _run_supervisor(self):
+        """Probe the connection while it is up, reconnect it with backoff while it is down, until it has no clients."""
+        attempt = 0
+        while self._consumers:
+            if self._up:
+                attempt = 0
+                await self._sleep(self._probe_interval)
+                if self._up and self._consumers and not self._in_flight and \
+                        self._clock() - self._last_activity >= self._probe_interval:
+                    await self._run_probe()
+            else:
+                await self._sleep(self._backoff.delay_for(attempt))
+                if self._consumers:
+                    await self._reconnect()
+                    attempt += 1
+
+    async def _sleep(self, seconds: float):
+        """Sleep, waking early when the connection is lost or released."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _run_probe(self):
+        self._counters['probes'] += 1
+        try:
+            await asyncio.wait_for(self._probe(self._client), timeout=self._probe_timeout)
+            self._last_activity = self._clock()
+        except Exception as e:
+            self._counters['failed_probes'] += 1
+            self._lost(e)
+
+    async def _reconnect(self):
+        try:
+            await self._client.connect()
+        except Exception as e:
+            self._last_error = f"{type(e).__name__}: {e}"
+        if self._client.connected:
+            self._up = True
+            self._last_activity = self._clock()
+            self._counters['reconnects'] += 1
+        else:
+            self._counters['failed_reconnects'] += 1
+
+    async def _wait_for_drain(self):
+        if not self._in_flight:
+            return
+        self._drained = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout=self._drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _drain_and_close(self):
+        await self._wait_for_drain()
+        if not self._consumers:
+            self._manager.disconnect()
+
+
+class ModbusConnectionPool:
+    """
+    The pooled connections of the process, one per endpoint and lane. Clients of the same host:port share its
+    connections, created with the settings of the first of them. Lane 0 is the endpoint's main connection,
+    further lanes are extra connections a client opens to have several requests in flight at once.
+    """
+    _connections: ClassVar[Dict[str, PooledConnection]] = {}
+
+    @classmethod
+    def connection(cls, endpoint: str, client_factory: Callable[[], ModbusBaseClient],
+                   backoff: ReconnectBackoff, lane: int = 0, **options) -> PooledConnection:
+        """
+        The connection to endpoint on the lane, created on first use.
+
+        :param client_factory: Creates the client owning the transport, only called for a new connection.
+        :param lane: Which of the endpoint's connections, extra lanes are pooled as "host:port#lane".
+        :param options: Passed to PooledConnection for a new connection.
+        """
+        assert lane >= 0, "Lane must not be negative"
+        key = endpoint if lane == 0 else f"{endpoint}#{lane}"
+        connection = cls._connections.get(key)
+        if connection is None:
+            connection = cls._connections[key] = PooledConnection(key, client_factory(), backoff, **options)
+        return connection
+
+    @classmethod
+    def metrics(cls) -> Dict[str, ConnectionMetrics]:
+        return {endpoint: connection.metrics() for endpoint, connection in cls._connections.items()}
@@ -1,40 +1,43 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import List
+from typing import Any, ClassVar, List
 
 from pymodbus import ModbusException
+from pymodbus.exceptions import ModbusIOException
 from pymodbus.client import ModbusBaseClient
-from pymodbus.pdu import ExceptionResponse, ModbusResponse
+from pymodbus.pdu import ExceptionResponse, ModbusExceptions, ModbusResponse
 from modbus.modbus_reader import ModbusResultAdapter
+from modbus.modbus_values import UnitId
+from utils.operation_response import OperationResponse, OperationStatus
 from utils.response import T, Response
 from utils.status import Status
 
 
 @dataclass(frozen=True)
-class PyModbusBaseResult(ModbusResultAdapter[T], ABC):
-    """Immutable base class for handling Modbus results using PyModbus."""
+class PyModbusResponse:
+    """Immutable base class for the errors a PyModbus request can end in, shared by reads and writes."""
+    # The Modbus function code of the request, set by the concrete classes
+    function_code: ClassVar[int]
     _result: ModbusResponse = field(default=None, init=False)
 
     @classmethod
-    async def create(cls, client: ModbusBaseClient, address: int, count: int):
-        """Asynchronous factory method to create an instance and perform the read operation."""
-        instance = cls()  # Create the instance
-        object.__setattr__(instance, '_result', await instance.read(client, address, count))
+    def failed(cls, error: ModbusException):
+        """An instance for a request that could not be sent, e.g. because the connection is down."""
+        instance = cls()
+        object.__setattr__(instance, '_result', error)
         return instance
 
-    @abstractmethod
-    async def read(self, client: ModbusBaseClient, address: int, count: int) -> ModbusResponse: # pragma: no cover
-        """Perform the Modbus read operation. Must be implemented by subclasses."""
-        pass
-
-    @abstractmethod
-    def get_data(self) -> List[T]: # pragma: no cover
-        """Extract data from the ModbusResponse. Must be implemented by subclasses."""
-        pass
-
     def is_error(self) -> bool:
         return isinstance(self._result, (ModbusException, ExceptionResponse)) or self._result.isError()
 
+    def is_rejected(self) -> bool:
+        return isinstance(self._result, ExceptionResponse) and \
+            self._result.exception_code in (ModbusExceptions.IllegalAddress, ModbusExceptions.IllegalValue)
+
+    def is_timeout(self) -> bool:
+        """The request went unanswered, the library gives up with a ModbusIOException after its retries."""
+        return isinstance(self._result, ModbusIOException)
+
     def get_error_message(self) -> str:
         if isinstance(self._result, ModbusException):
             return f"ModbusException: {self._result}"
@@ -44,6 +47,28 @@ class PyModbusBaseResult(ModbusResultAdapter[T], ABC):
             return f"Modbus library error: {self._result}"
         return "Unknown error"
 
+
+@dataclass(frozen=True)
+class PyModbusBaseResult(PyModbusResponse, ModbusResultAdapter[T], ABC):
+    """Immutable base class for handling Modbus results using PyModbus."""
+
+    @classmethod
+    async def create(cls, client: ModbusBaseClient, address: int, count: int, slave: int = UnitId.DEFAULT):
+        """Asynchronous factory method to create an instance and perform the read operation."""
+        instance = cls()  # Create the instance
+        object.__setattr__(instance, '_result', await instance.read(client, address, count, slave))
+        return instance
+
+    @abstractmethod
+    async def read(self, client: ModbusBaseClient, address: int, count: int, slave: int) -> ModbusResponse: # pragma: no cover
+        """Perform the Modbus read operation. Must be implemented by subclasses."""
+        pass
+
+    @abstractmethod
+    def get_data(self) -> List[T]: # pragma: no cover
+        """Extract data from the ModbusResponse. Must be implemented by subclasses."""
+        pass
+
     def to_response(self) -> Response[T]:
         """Converts the PyModbusBaseResult to a ValidatedResult."""
         if self.is_error():
@@ -67,23 +92,25 @@ class PyModbusBitResult(PyModbusBaseResult[List[bool]]):
         return self._result.bits if not self.is_error() else []
 
     @abstractmethod
-    async def read(self, client: ModbusBaseClient, address: int, count: int) -> ModbusResponse: # pragma: no cover
+    async def read(self, client: ModbusBaseClient, address: int, count: int, slave: int) -> ModbusResponse: # pragma: no cover
         """To be implemented in subclasses."""
         pass
 
 @dataclass(frozen=True)
 class PyModbusCoilResult(PyModbusBitResult):
     """Immutable class for handling the result of reading coils using PyModbus."""
+    function_code: ClassVar[int] = 1
 
-    async def read(self, client: ModbusBaseClient, address: int, count: int) -> ModbusResponse:
-        return await client.read_coils(address, count)
+    async def read(self, client: ModbusBaseClient, address: int, count: int, slave: int) -> ModbusResponse:
+        return await client.read_coils(address, count, slave=slave)
 
 @dataclass(frozen=True)
 class PyModbusDiscreteInputResult(PyModbusBitResult):
     """Immutable class for handling the result of reading discrete inputs using PyModbus."""
+    function_code: ClassVar[int] = 2
 
-    async def read(self, client: ModbusBaseClient, address: int, count: int) -> ModbusResponse:
-        return await client.read_discrete_inputs(address, count)
+    async def read(self, client: ModbusBaseClient, address: int, count: int, slave: int) -> ModbusResponse:
+        return await client.read_discrete_inputs(address, count, slave=slave)
 
 @dataclass(frozen=True)
 class PyModbusRegisterResult(PyModbusBaseResult[List[int]]):
@@ -93,20 +120,76 @@ class PyModbusRegisterResult(PyModbusBaseResult[List[int]]):
         return self._result.registers if not self.is_error() else []
 
     @abstractmethod
-    async def read(self, client: ModbusBaseClient, address: int, count: int) -> ModbusResponse: # pragma: no cover
+    async def read(self, client: ModbusBaseClient, address: int, count: int, slave: int) -> ModbusResponse: # pragma: no cover
         """To be implemented in subclasses."""
         pass
 
 @dataclass(frozen=True)
 class PyModbusInputRegisterResult(PyModbusRegisterResult):
     """Immutable class for handling the result of reading input registers using PyModbus."""
+    function_code: ClassVar[int] = 4
 
-    async def read(self, client: ModbusBaseClient, address: int, count: int) -> ModbusResponse:
-        return await client.read_input_registers(address, count)
+    async def read(self, client: ModbusBaseClient, address: int, count: int, slave: int) -> ModbusResponse:
+        return await client.read_input_registers(address, count, slave=slave)
 
 @dataclass(frozen=True)
 class PyModbusHoldingRegisterResult(PyModbusRegisterResult):
     """Immutable class for handling the result of reading holding registers using PyModbus."""
+    function_code: ClassVar[int] = 3
+
+    async def read(self, client: ModbusBaseClient, address: int, count: int, slave: int) -> ModbusResponse:
+        return await client.read_holding_registers(address, count, slave=slave)
+
+
+@dataclass(frozen=True)
+class PyModbusWriteResult(PyModbusResponse, ABC):
+    """Immutable base class for handling the result of a write using PyModbus."""
+
+    @classmethod
+    async def create(cls, client: ModbusBaseClient, address: int, value: Any, slave: int = UnitId.DEFAULT):
+        """Asynchronous factory method to create an instance and perform the write operation."""
+        instance = cls()
+        object.__setattr__(instance, '_result', await instance.write(client, address, value, slave))
+        return instance
+
+    @abstractmethod
+    async def write(self, client: ModbusBaseClient, address: int, value: Any, slave: int) -> ModbusResponse: # pragma: no cover
+        """Perform the Modbus write operation. Must be implemented by subclasses."""
+        pass
+
+    def to_operation_response(self) -> OperationResponse:
+        if self.is_error():
+            return OperationResponse(status=OperationStatus.FAILED, details=self.get_error_message())
+        return OperationResponse(status=OperationStatus.OK, details="Write successful")
+
+@dataclass(frozen=True)
+class PyModbusRegisterWriteResult(PyModbusWriteResult):
+    """Immutable class for writing a single holding register (function 6) using PyModbus."""
+    function_code: ClassVar[int] = 6
+
+    async def write(self, client: ModbusBaseClient, address: int, value: int, slave: int) -> ModbusResponse:
+        return await client.write_register(address, value, slave=slave)
+
+@dataclass(frozen=True)
+class PyModbusRegistersWriteResult(PyModbusWriteResult):
+    """Immutable class for writing consecutive holding registers (function 16) using PyModbus."""
+    function_code: ClassVar[int] = 16
+
+    async def write(self, client: ModbusBaseClient, address: int, value: List[int], slave: int) -> ModbusResponse:
+        return await client.write_registers(address, value, slave=slave)
+
+@dataclass(frozen=True)
+class PyModbusCoilWriteResult(PyModbusWriteResult):
+    """Immutable class for writing a single coil (function 5) using PyModbus."""
+    function_code: ClassVar[int] = 5
+
+    async def write(self, client: ModbusBaseClient, address: int, value: bool, slave: int) -> ModbusResponse:
+        return await client.write_coil(address, value, slave=slave)
+
+@dataclass(frozen=True)
+class PyModbusCoilsWriteResult(PyModbusWriteResult):
+    """Immutable class for writing consecutive coils (function 15) using PyModbus."""
+    function_code: ClassVar[int] = 15
 
-    async def read(self, client: ModbusBaseClient, address: int, count: int) -> ModbusResponse:
-        return await client.read_holding_registers(address, count)
+    async def write(self, client: ModbusBaseClient, address: int, value: List[bool], slave: int) -> ModbusResponse:
+        return await client.write_coils(address, value, slave=slave)
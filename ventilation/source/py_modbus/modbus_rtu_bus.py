@@ -0,0 +1,196 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, ClassVar, Dict, List, Set, Tuple, TypeVar
+
+from pymodbus.client import AsyncModbusSerialClient, ModbusBaseClient
+
+from modbus.rtu_values import BusPriority, ParityType
+from py_modbus.modbus_connection_manager import ModbusConnectionManager
+from utils.operation_response import OperationResponse, OperationStatus
+
+R = TypeVar('R')
+
+# Above 19200 baud the Modbus over serial line specification fixes the silent interval instead of scaling it
+FIXED_INTERVAL_BAUD_RATE = 19200
+FIXED_SILENT_INTERVAL = 0.00175
+
+
+def silent_interval(baud_rate: int, parity: ParityType, stop_bits: int) -> float:
+    """
+    The 3.5 character silence that must separate two RTU frames, in seconds.
+    A character is a start bit, 8 data bits, the parity bit if any and the stop bits.
+    """
+    bits_per_character = 1 + 8 + (0 if parity == ParityType.NONE else 1) + stop_bits
+    if baud_rate > FIXED_INTERVAL_BAUD_RATE:
+        return FIXED_SILENT_INTERVAL
+    return 3.5 * bits_per_character / baud_rate
+
+
+class ModbusRTUBus:
+    """
+    Arbitrates one serial port between every RTU client configured on it.
+
+    The bus owns the single serial client of the port, so the port is opened once however many units are
+    on the line. Each logical client addresses its own unit id and hands its requests to execute, which
+    sends them one at a time, highest priority first and in order of arrival within a priority, and keeps
+    the 3.5 character silent interval between the end of one exchange and the start of the next.
+
+    The port is opened by the first client to connect and closed when the last one disconnects.
+    """
+    _buses: ClassVar[Dict[str, 'ModbusRTUBus']] = {}
+
+    def __init__(self, client: ModbusBaseClient, interval: float, settings: Tuple = (),
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param client: The client owning the serial transport.
+        :param interval: Seconds of silence to keep between frames.
+        :param settings: The line settings the port was opened with, every client of the port must match them.
+        :param clock: Monotonic time source, replaceable for tests.
+        """
+        assert interval >= 0, "Silent interval must not be negative"
+        self._client = client
+        self._manager = ModbusConnectionManager(client)
+        self._interval = interval
+        self._clock = clock
+        self._settings = settings
+        self._consumers: Set[int] = set()  # id() of every client connected through the bus
+        self._busy = False
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._last_frame = float('-inf')
+
+    @classmethod
+    def for_port(cls, builder) -> 'ModbusRTUBus':
+        """The bus of the builder's serial port, created with the builder's settings on first use."""
+        port = builder.serial_port.value
+        settings = (builder.baud_rate.value, builder.parity, builder.stop_bits.value)
+        bus = cls._buses.get(port)
+        if bus is not None:
+            assert bus._settings == settings, f"Serial port {port} is already in use with different line settings"
+            return bus
+
+        client = AsyncModbusSerialClient(
+            port=port,
+            baudrate=builder.baud_rate.value,
+            parity=builder.parity.value,
+            stopbits=builder.stop_bits.value,
+            timeout=builder.timeout.value,
+            reconnect_delay=builder.reconnect_delay.value,
+            reconnect_delay_max=builder.reconnect_delay_max.value,
+            retries=builder.retries.value
+        )
+        bus = cls._buses[port] = cls(client, silent_interval(*settings), settings)
+        return bus
+
+    @property
+    def client(self) -> ModbusBaseClient:
+        return self._client
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    @property
+    def connections(self) -> int:
+        """The number of clients currently connected through the bus."""
+        return len(self._consumers)
+
+    @property
+    def waiting(self) -> int:
+        """The number of requests queued behind the one on the line."""
+        return sum(1 for _, _, waiter in self._waiting if not waiter.done())
+
+    async def connect(self, consumer: object) -> OperationResponse:
+        """
+        Connect consumer, opening the port if it is the first. Connecting a consumer again is a no-op.
+
+        :param consumer: The client connecting, identified by its id.
+        """
+        if self._consumers and self._client.connected:
+            self._consumers.add(id(consumer))
+            return OperationResponse(status=OperationStatus.OK, details="Connected to shared serial bus.")
+
+        response = await self._manager.connect()
+        if response.status == OperationStatus.OK:
+            self._consumers.add(id(consumer))
+        return response
+
+    def disconnect(self, consumer: object) -> OperationResponse:
+        """
+        Disconnect consumer, closing the port once no consumer is left. Disconnecting a consumer that is not
+        connected is a no-op, so it cannot close the port under the other units.
+        """
+        if id(consumer) not in self._consumers:
+            return OperationResponse(status=OperationStatus.OK, details="Not connected to shared serial bus.")
+        self._consumers.discard(id(consumer))
+        if self._consumers:
+            return OperationResponse(status=OperationStatus.OK,
+                                     details=f"Disconnected, serial bus still in use by {len(self._consumers)} clients.")
+        return self._manager.disconnect()
+
+    async def execute(self, request: Callable[[ModbusBaseClient], Awaitable[R]],
+                      priority: BusPriority = BusPriority.NORMAL) -> R:
+        """
+        Wait for the line, then send the request.
+
+        Cancelling the call while it waits for the line withdraws the request. Once the request is on the
+        line, cancelling only abandons its answer: the exchange runs on until the reply or the client's timeout,
+        and the line stays held until then. RTU frames carry no transaction id, so a reply still arriving
+        after the line was released would be taken for the answer to the next request.
+
+        :param request: Performs one exchange on the client it is given, e.g. a read addressed to a unit id.
+        :param priority: Where the request queues behind the others waiting for the line.
+        """
+        await self._acquire(priority)
+        exchange = asyncio.get_running_loop().create_task(self._exchange(request))
+        exchange.add_done_callback(_retrieve)
+        return await asyncio.shield(exchange)
+
+    async def _exchange(self, request: Callable[[ModbusBaseClient], Awaitable[R]]) -> R:
+        """Send the request on the held line, then release it."""
+        try:
+            silence = self._last_frame + self._interval - self._clock()
+            if silence > 0:
+                await asyncio.sleep(silence)
+            return await request(self._client)
+        finally:
+            self._flush()
+            self._last_frame = self._clock()
+            self._release()
+
+    def _flush(self):
+        """Drop any partial frame the client has buffered, so the next exchange starts from a clean line."""
+        ctx = getattr(self._client, 'ctx', None)
+        if ctx is not None:
+            ctx.framer.resetFrame()
+
+    async def _acquire(self, priority: BusPriority):
+        if not self._busy:
+            self._busy = True
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The line was handed over just as the request was cancelled, pass it on
+                self._release()
+            raise
+
+    def _release(self):
+        while self._waiting:
+            _, _, waiter = heapq.heappop(self._waiting)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._busy = False
+
+
+def _retrieve(exchange: asyncio.Task):
+    """Mark the outcome of an exchange whose caller gave up on it as retrieved."""
+    if not exchange.cancelled():
+        exchange.exception()
@@ -1,23 +1,50 @@
-from pymodbus.client import AsyncModbusSerialClient
+from dataclasses import field
+from typing import Awaitable, Callable
 
-from py_modbus.modus_py_client import ModbusPYClient
+from pymodbus.client import ModbusBaseClient
+
+from modbus.modbus_reader import ChunkRetryPolicy
+from py_modbus.modbus_rtu_bus import ModbusRTUBus
+from py_modbus.modus_py_client import ModbusPYClient, R
+from utils.operation_response import OperationResponse
 
 
 class ModbusRTUClient(ModbusPYClient):
+    """
+    A client for one unit on a serial line. Every client on the same serial port shares the port's
+    ModbusRTUBus, which owns the serial transport and sends the requests of all units one at a time.
+    """
+    # Cheap RTU gateways and I/O modules often reject full size requests
+    adaptive_max_count = True
+    # Noisy RS-485 lines corrupt the odd frame, read again only the chunk that was lost
+    chunk_retry_policy = ChunkRetryPolicy()
+    partial_reads = True
+    _bus: ModbusRTUBus = field(init=False)
+
     def __init__(self, builder):
         # Lazy import to avoid circular dependency
         from modbus.modus_rtu_client_builder import ModbusRTUClientBuilder
 
         assert isinstance(builder, ModbusRTUClientBuilder), "builder must be an instance of ModbusRTUBuilder"
 
-        client = AsyncModbusSerialClient(
-            port=builder.serial_port.value,
-            baudrate=builder.baud_rate.value,
-            parity=builder.parity.value,
-            stopbits=builder.stop_bits.value,
-            timeout=builder.timeout.value,
-            reconnect_delay=builder.reconnect_delay.value,
-            reconnect_delay_max=builder.reconnect_delay_max.value,
-            retries=builder.retries.value
-        )
-        super().__init__(client, builder)
+        bus = ModbusRTUBus.for_port(builder)
+        object.__setattr__(self, '_bus', bus)
+        super().__init__(bus.client, builder)
+
+    @property
+    def shared_bus(self) -> str:
+        # Every slave on the same serial port shares one RS-485 line
+        return self._builder.serial_port.value
+
+    @property
+    def device(self) -> str:
+        return f"{self._builder.serial_port.value}/{self.unit_id}"
+
+    def _send(self, request: Callable[[ModbusBaseClient], Awaitable[R]]) -> Awaitable[R]:
+        return self._bus.execute(request, priority=self._builder.bus_priority)
+
+    async def connect(self) -> OperationResponse:
+        return await self._bus.connect(self)
+
+    def disconnect(self) -> OperationResponse:
+        return self._bus.disconnect(self)
@@ -1,21 +1,73 @@
+import asyncio
+from dataclasses import field
+from typing import Awaitable, Callable, Tuple
+
+from pymodbus.client import ModbusBaseClient
 from pymodbus.client.tcp import AsyncModbusTcpClient
 
-from py_modbus.modus_py_client import ModbusPYClient
+from py_modbus.modbus_connection_pool import ModbusConnectionPool, PooledConnection, ReconnectBackoff
+from py_modbus.modus_py_client import ModbusPYClient, R
+from utils.operation_response import OperationResponse
 
 
 class ModbusTCPClient(ModbusPYClient):
+    """
+    A client for one unit behind a Modbus TCP endpoint. Every client of the same host:port shares the
+    endpoint's PooledConnection, which keeps the connection healthy and reconnects it with backoff.
+
+    snapshot_connections: the connections opened to the endpoint. pymodbus waits for the answer to one
+    request before it sends the next on a connection, so with more than one the tables of a snapshot are
+    read at once, each request on the least busy connection, and a snapshot costs about one round trip
+    instead of four. Many devices accept only a few connections, the extra ones are used when they connect.
+    """
+    snapshot_connections: int = 1
+    _connection: PooledConnection = field(init=False)
+    _lanes: Tuple[PooledConnection, ...] = field(init=False)
+
     def __init__(self, builder):
         # Lazy import to avoid circular dependency
         from modbus.modbus_tcp_client_builder import ModbusTCPClientBuilder
 
         assert isinstance(builder, ModbusTCPClientBuilder), "builder must be an instance of ModbusTCPBuilder"
+        assert self.snapshot_connections > 0, "A client needs at least one connection"
+
+        lanes = tuple(ModbusConnectionPool.connection(
+            endpoint=f"{builder.ip_address.value}:{builder.port.value}",
+            client_factory=lambda: AsyncModbusTcpClient(
+                host=builder.ip_address.value,
+                port=builder.port.value,
+                timeout=builder.timeout.value,
+                # The pool reconnects with its own backoff, pymodbus reconnecting too would race it
+                reconnect_delay=0,
+                reconnect_delay_max=builder.reconnect_delay_max.value,
+                retries=builder.retries.value
+            ),
+            backoff=ReconnectBackoff(builder.reconnect_delay.value, builder.reconnect_delay_max.value),
+            lane=lane,
+            probe_timeout=builder.timeout.value
+        ) for lane in range(self.snapshot_connections))
+        object.__setattr__(self, '_connection', lanes[0])
+        object.__setattr__(self, '_lanes', lanes)
+        super().__init__(lanes[0].client, builder)
+
+    @property
+    def device(self) -> str:
+        return f"{self._connection.endpoint}/{self.unit_id}"
+
+    @property
+    def concurrent_tables(self) -> bool:
+        return len(self._lanes) > 1
+
+    def _send(self, request: Callable[[ModbusBaseClient], Awaitable[R]]) -> Awaitable[R]:
+        connected = [lane for lane in self._lanes if lane.connected]
+        lane = min(connected, key=lambda lane: lane.in_flight) if connected else self._connection
+        return lane.execute(request)
+
+    async def connect(self) -> OperationResponse:
+        """Connect the main connection, whose response is returned, and try the extra ones alongside it."""
+        responses = await asyncio.gather(*[lane.connect(self) for lane in self._lanes])
+        return responses[0]
 
-        client = AsyncModbusTcpClient(
-            host=builder.ip_address.value,
-            port=builder.port.value,
-            timeout=builder.timeout.value,
-            reconnect_delay=builder.reconnect_delay.value,
-            reconnect_delay_max=builder.reconnect_delay_max.value,
-            retries=builder.retries.value
-        )
-        super().__init__(client, builder)
+    def disconnect(self) -> OperationResponse:
+        responses = [lane.disconnect(self) for lane in self._lanes]
+        return responses[0]
@@ -1,21 +1,62 @@
+import asyncio
 from dataclasses import field
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type, TypeVar
 
+from pymodbus import ModbusException
 from pymodbus.client import ModbusBaseClient
 from modbus.modbus_client_builder import ModbusClientBuilder
 from modbus.modbus_builder_client import ModbusBuilderClient
-from modbus.modbus_reader import ModbusBitReader, ModbusWordReader
-from modbus.modbus import ModbusData
+from modbus.modbus_metrics import ModbusInstrumentation, RequestOutcome
+from modbus.modbus_reader import (ChunkStats, ModbusBitReader, ModbusReader, ModbusWordReader, ChunkRetryPolicy,
+                                  is_partial)
+from modbus.modbus import ModbusData, ModbusWriter
+from modbus.modbus_read_plan import ModbusReadPlan, ReadRange
+from modbus.modbus_values import UnitId
+from modbus.modbus_write_queue import ModbusWriteQueue, MAX_WRITE_COILS, MAX_WRITE_REGISTERS
 from py_modbus.modbus_connection_manager import ModbusConnectionManager
-from py_modbus.modbus_result import (PyModbusCoilResult, PyModbusDiscreteInputResult,
-                                     PyModbusInputRegisterResult, PyModbusHoldingRegisterResult)
-from utils.operation_response import OperationResponse
+from py_modbus.modbus_result import (PyModbusResponse, PyModbusBaseResult, PyModbusCoilResult, PyModbusDiscreteInputResult,
+                                     PyModbusInputRegisterResult, PyModbusHoldingRegisterResult,
+                                     PyModbusWriteResult, PyModbusRegisterWriteResult, PyModbusRegistersWriteResult,
+                                     PyModbusCoilWriteResult, PyModbusCoilsWriteResult)
+from utils.deadline import Deadline
+from utils.operation_response import OperationResponse, OperationStatus
+from utils.response import Response
+from utils.status import Status
 
+R = TypeVar('R')
+P = TypeVar('P', bound=PyModbusResponse)
 
-class ModbusPYClient(ModbusBuilderClient):
+
+class ModbusPYClient(ModbusBuilderClient, ModbusWriter):
     """
    ModbusClient class that inherits from frozen ModbusInterface.
    Declares client-related fields to be supplied later, after initialization.
+
+   adaptive_max_count: when True each table reader learns the largest request the device accepts,
+   for devices and gateways that reject full size requests.
+
+   chunk_retry_policy and partial_reads: retry only a failed chunk with backoff, and keep the chunks that
+   succeeded when one still fails, so a single corrupted frame does not force every table to be read again.
+
+   low_priority_tables: on a read with a deadline, these tables are skipped when their expected duration
+   no longer fits the remaining budget. A table that is skipped, or that the deadline cut short, is answered
+   with its last good response and named in ModbusData.stale. A partial read never becomes the last good
+   response: it is answered with the last good one if there is one, or else itself, and named in stale.
+
+   concurrent_tables: when True the tables of a snapshot are read at once instead of one after another.
+   pymodbus sends one request at a time on a connection, so only transports with several connections to the
+   device enable it; the requests of one table are still sent in order.
+
+   writes: a ModbusWriteQueue that coalesces writes and sends adjacent addresses in one request.
+
+   instrumentation: when set, every request is recorded in it under this client's device name, with its
+   function code, latency and outcome, and every chunk the readers read again is counted as a retry.
    """
+    adaptive_max_count: bool = False
+    chunk_retry_policy: ChunkRetryPolicy = None
+    partial_reads: bool = False
+    low_priority_tables: Tuple[str, ...] = ('holding_register',)
+    instrumentation: ModbusInstrumentation = None
     _client: ModbusBaseClient = field(init=False)
     _client_manager: ModbusConnectionManager = field(init=False)
     _coils_reader: ModbusBitReader = field(init=False)
@@ -23,6 +64,8 @@ class ModbusPYClient(ModbusBuilderClient):
     _input_registers: ModbusWordReader = field(init=False)
     _holding_registers: ModbusWordReader = field(init=False)
     _builder: ModbusClientBuilder = field(init=False)
+    _last_good: Dict[Tuple[str, Optional[Tuple[ReadRange, ...]]], Response] = field(init=False)
+    _writes: ModbusWriteQueue = field(init=False)
 
     def __init__(self, client: ModbusBaseClient, builder: ModbusClientBuilder):
 
@@ -31,28 +74,120 @@ class ModbusPYClient(ModbusBuilderClient):
         # Initialize mutable fields that don't affect the parent frozen class
         object.__setattr__(self, '_client', client)
         object.__setattr__(self, '_client_manager', ModbusConnectionManager(self._client))
+        object.__setattr__(self, '_last_good', {})
 
         # Setting readers as mutable fields
         object.__setattr__(self, '_coils_reader', ModbusBitReader(
-            read_function=lambda address, count: PyModbusCoilResult.create(
-                self._client, address, count)
+            read_function=lambda address, count: self._request(PyModbusCoilResult, address, count),
+            **self._reader_options(PyModbusCoilResult)
         ))
 
         object.__setattr__(self, '_discrete_inputs', ModbusBitReader(
-            read_function=lambda address, count: PyModbusDiscreteInputResult.create(
-                self._client, address, count)
+            read_function=lambda address, count: self._request(PyModbusDiscreteInputResult, address, count),
+            **self._reader_options(PyModbusDiscreteInputResult)
         ))
 
         object.__setattr__(self, '_input_registers', ModbusWordReader(
-            read_function=lambda address, count: PyModbusInputRegisterResult.create(
-                self._client, address, count)
+            read_function=lambda address, count: self._request(PyModbusInputRegisterResult, address, count),
+            **self._reader_options(PyModbusInputRegisterResult)
         ))
 
         object.__setattr__(self, '_holding_registers', ModbusWordReader(
-            read_function=lambda address, count: PyModbusHoldingRegisterResult.create(
-                self._client, address, count)
+            read_function=lambda address, count: self._request(PyModbusHoldingRegisterResult, address, count),
+            **self._reader_options(PyModbusHoldingRegisterResult)
+        ))
+
+        object.__setattr__(self, '_writes', ModbusWriteQueue(
+            write_registers=self.write_registers,
+            write_coils=self.write_coils,
+            read_registers=lambda ranges: self._holding_registers.read_ranges(ranges),
+            read_coils=lambda ranges: self._coils_reader.read_ranges(ranges)
         ))
 
+    def _send(self, request: Callable[[ModbusBaseClient], Awaitable[R]]) -> Awaitable[R]:
+        """Perform one exchange on the transport, overridden by transports that arbitrate or pool it."""
+        return request(self._client)
+
+    async def _request(self, result_class: Type[PyModbusBaseResult], address: int, count: int) -> PyModbusBaseResult:
+        """Issue one read request to this client's unit."""
+        return await self._exchange(result_class, address, count,
+                                    lambda client: result_class.create(client, address, count, slave=self.unit_id))
+
+    async def _write(self, result_class: Type[PyModbusWriteResult], address: int, value) -> OperationResponse:
+        """Issue one write request to this client's unit."""
+        count = len(value) if isinstance(value, list) else 1
+        result = await self._exchange(result_class, address, count,
+                                      lambda client: result_class.create(client, address, value, slave=self.unit_id))
+        return result.to_operation_response()
+
+    async def _exchange(self, result_class: Type[P], address: int, count: int,
+                        request: Callable[[ModbusBaseClient], Awaitable[P]]) -> P:
+        """
+        Send one request, recording it when the client is instrumented. Its latency is measured from the moment
+        the transport sends it, after any wait for a shared bus or pooled connection.
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return await self._send_or_fail(result_class, request)
+
+        started = None
+
+        def timed(client: ModbusBaseClient) -> Awaitable[P]:
+            # Called by the transport once the request has the line, so waiting for it is not counted
+            nonlocal started
+            started = instrumentation.clock()
+            return request(client)
+
+        try:
+            result = await self._send_or_fail(result_class, timed)
+        except asyncio.CancelledError:
+            # The reader abandoned the request because its deadline passed, one never sent is not recorded
+            if started is not None:
+                instrumentation.record(self.device, result_class.function_code, address, count,
+                                       instrumentation.clock() - started, RequestOutcome.TIMEOUT, "Deadline exceeded")
+            raise
+        latency = instrumentation.clock() - started if started is not None else 0.0
+
+        if not result.is_error():
+            outcome, detail = RequestOutcome.OK, ""
+        else:
+            outcome = RequestOutcome.TIMEOUT if result.is_timeout() else RequestOutcome.ERROR
+            detail = result.get_error_message()
+        instrumentation.record(self.device, result_class.function_code, address, count, latency, outcome, detail)
+        return result
+
+    async def _send_or_fail(self, result_class: Type[P], request: Callable[[ModbusBaseClient], Awaitable[P]]) -> P:
+        try:
+            return await self._send(request)
+        except ModbusException as e:
+            return result_class.failed(e)
+
+    def _reader_options(self, result_class: Type[PyModbusBaseResult]) -> dict:
+        return dict(adaptive=self.adaptive_max_count, retry_policy=self.chunk_retry_policy,
+                    partial=self.partial_reads, on_chunk=lambda stats: self._chunk_read(result_class, stats))
+
+    def _chunk_read(self, result_class: Type[PyModbusBaseResult], stats: ChunkStats):
+        if self.instrumentation is not None:
+            self.instrumentation.record_retries(self.device, result_class.function_code, stats.attempts - 1)
+
+    @property
+    def concurrent_tables(self) -> bool:
+        return False
+
+    @property
+    def writes(self) -> ModbusWriteQueue:
+        return self._writes
+
+    @property
+    def device(self) -> str:
+        """The name this client's requests are recorded under by the instrumentation."""
+        return f"unit_{self.unit_id}"
+
+    @property
+    def unit_id(self) -> int:
+        unit_id = self._builder.unit_id
+        return unit_id.value if unit_id is not None else UnitId.DEFAULT
+
     @property
     def coil_size(self):
         return self._builder.coil_size
@@ -75,10 +210,108 @@ class ModbusPYClient(ModbusBuilderClient):
     def disconnect(self) -> OperationResponse:
         return self._client_manager.disconnect()
 
-    async def read(self) -> ModbusData:
+    async def write_registers(self, address: int, values: Sequence[int]) -> OperationResponse:
+        """Write consecutive holding registers with function 16, split into requests of at most 123 registers."""
+        values = list(values)
+        for offset in range(0, len(values), MAX_WRITE_REGISTERS):
+            response = await self._write(PyModbusRegistersWriteResult, address + offset,
+                                         values[offset:offset + MAX_WRITE_REGISTERS])
+            if response.status != OperationStatus.OK:
+                return response
+        return OperationResponse(status=OperationStatus.OK, details="Write successful")
+
+    async def write_coils(self, address: int, values: Sequence[bool]) -> OperationResponse:
+        """Write consecutive coils with function 15, split into requests of at most 1968 coils."""
+        values = list(values)
+        for offset in range(0, len(values), MAX_WRITE_COILS):
+            response = await self._write(PyModbusCoilsWriteResult, address + offset,
+                                         values[offset:offset + MAX_WRITE_COILS])
+            if response.status != OperationStatus.OK:
+                return response
+        return OperationResponse(status=OperationStatus.OK, details="Write successful")
+
+    async def write_holding_register(self, address: int, value: int) -> OperationResponse:
+        return await self._write(PyModbusRegisterWriteResult, address, value)
+
+    async def write_coil(self, address: int, value: bool) -> OperationResponse:
+        return await self._write(PyModbusCoilWriteResult, address, value)
+
+    async def read(self, plan: ModbusReadPlan = None, deadline: Deadline = None) -> ModbusData:
+        if deadline is not None:
+            return await self._read_within(deadline, plan)
+
+        if plan is not None:
+            return await self._read_plan(plan)
+
+        coils, discrete_inputs, input_register, holding_register = await self._gather(
+            self._coils_reader.read(0, self.coil_size.value),
+            self._discrete_inputs.read(0, self.discrete_input_size.value),
+            self._input_registers.read(0, self.input_register_size.value),
+            self._holding_registers.read(0, self.holding_register_size.value)
+        )
+        return ModbusData(
+            coils=coils,
+            discrete_inputs=discrete_inputs,
+            input_register=input_register,
+            holding_register=holding_register
+        )
+
+    async def _read_plan(self, plan: ModbusReadPlan) -> ModbusData:
+        """Read only the ranges of the plan, values are indexed by address and unread addresses are None."""
+        coils, discrete_inputs, input_register, holding_register = await self._gather(
+            self._coils_reader.read_ranges(plan.coils),
+            self._discrete_inputs.read_ranges(plan.discrete_inputs),
+            self._input_registers.read_ranges(plan.input_register),
+            self._holding_registers.read_ranges(plan.holding_register)
+        )
         return ModbusData(
-            coils=await self._coils_reader.read(0, self.coil_size.value),
-            discrete_inputs=await self._discrete_inputs.read(0, self.discrete_input_size.value),
-            input_register=await self._input_registers.read(0, self.input_register_size.value),
-            holding_register=await self._holding_registers.read(0, self.holding_register_size.value)
+            coils=coils,
+            discrete_inputs=discrete_inputs,
+            input_register=input_register,
+            holding_register=holding_register
         )
+
+    async def _gather(self, *reads: Awaitable[R]) -> List[R]:
+        """Await the table reads at once when the transport can overlap them, otherwise in order."""
+        if self.concurrent_tables:
+            return list(await asyncio.gather(*reads))
+        return [await read for read in reads]
+
+    async def _read_within(self, deadline: Deadline, plan: ModbusReadPlan = None) -> ModbusData:
+        """Read the tables in priority order, or at once when concurrent, without overrunning the deadline."""
+        tables = (
+            ('coils', self._coils_reader, self.coil_size),
+            ('discrete_inputs', self._discrete_inputs, self.discrete_input_size),
+            ('input_register', self._input_registers, self.input_register_size),
+            ('holding_register', self._holding_registers, self.holding_register_size)
+        )
+        results = await self._gather(*[
+            self._read_table(table, reader, getattr(plan, table) if plan is not None else ((0, size.value),),
+                             plan is not None, deadline)
+            for table, reader, size in sorted(tables, key=lambda entry: entry[0] in self.low_priority_tables)])
+
+        responses = {table: response for table, response, _ in results}
+        return ModbusData(**responses, stale=frozenset(table for table, _, stale in results if stale))
+
+    async def _read_table(self, table: str, reader: ModbusReader, ranges: Tuple[ReadRange, ...], planned: bool,
+                          deadline: Deadline) -> Tuple[str, Response, bool]:
+        """
+        Read one table by the deadline. Returns the table, its response and whether that response is stale.
+        A low priority table is only skipped when there is an earlier response to fall back on. A partial
+        read, with chunks that failed or that the deadline left out, counts as cut short.
+        """
+        key = (table, ranges if planned else None)
+        stale = self._last_good.get(key)
+        if stale is not None and table in self.low_priority_tables and \
+                not deadline.allows(reader.estimated_duration(ranges)):
+            return table, stale, True
+
+        response = await reader.read_ranges(ranges, deadline=deadline)
+        if is_partial(response):
+            return table, stale if stale is not None else response, True
+        if response.status == Status.OK:
+            self._last_good[key] = response
+            return table, response, False
+        if stale is not None and deadline.expired:
+            return table, stale, True
+        return table, response, False
@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 
 from reader.reader import Reader, T
 from utils.response import Response
-from utils.standard_name import StandardName
+from utils.standard_name import StandardName, sn
 
 class DeviceReader(Reader[T], ABC):
     """
@@ -10,7 +10,7 @@ class DeviceReader(Reader[T], ABC):
     """
     def __init__(self, device_to_read: StandardName):
         # Device name will be set by the child class
-        self.config_name: StandardName = StandardName(f"{self.get_device_name()}_{device_to_read.value}")
+        self.config_name: StandardName = sn(f"{self.get_device_name()}_{device_to_read.value}")
 
     @abstractmethod
     def get_device_name(self) -> str:
@@ -3,6 +3,7 @@ from sensor.current_temperature_strategy import ADCToCurrentConversionStrategy,
 from utils.response import Response
 from utils.strategies import ExceptionCascadeStrategy
 from utils.temperaturecelsius import TemperatureCelsius, LowTemperatureRange, HighTemperatureRange
+from utils.value import ValidationPipeline
 
 LOW = 0
 HIGH = 1
@@ -32,10 +33,20 @@ class CurrentSensorTemperature(TemperatureCelsius):
     def get__strategies(self) -> [TemperatureCelsius]:
         return [
             self._adc_exception_cascade,       # Does the ADC need to cascade an error
+        ] + self._conversion_strategies()
+
+    def _conversion_strategies(self) -> [TemperatureCelsius]:
+        return [
             SensorDetectionStrategy(),         # Then check for sensor issues using the current
             ADCToCurrentConversionStrategy(),  # First, convert ADC to current
                                                # Convert current to temperature
             CurrentToTemperatureConversionStrategy(self._temp_low_range, self._temp_high_range)
         ] + super().get__strategies()
 
+    def get__pipeline(self) -> ValidationPipeline:
+        # Only the ADC cascade holds instance data, the conversion is compiled once for each pair of ranges
+        key = (self._range_key(), self._temp_low_range.value, self._temp_high_range.value)
+        return ValidationPipeline([self._adc_exception_cascade,
+                                   self.compiled(key, self._conversion_strategies)])
+
 
@@ -1,7 +1,5 @@
-from utils.response import Response
-from utils.status import Status
 from utils.temperaturecelsius import LowTemperatureRange, HighTemperatureRange
-from utils.value import ValidationStrategy
+from utils.value import StepValidationStrategy, ValidationFailure, invalid
 
 """
 At 20mA, the voltage across the 200-ohm resistor is:
@@ -37,7 +35,7 @@ NO_SENSOR_DETECTED = "No sensor detected"
 SENSOR_SHORT_CIRCUIT_DETECTED = "Sensor short circuit detected"
 
 # Strategy for detecting sensor issues (open and short circuits)
-class SensorDetectionStrategy(ValidationStrategy):
+class SensorDetectionStrategy(StepValidationStrategy):
     """
     This strategy checks if the ADC value is outside the valid range, which indicates an issue with the sensor:
     - If the ADC value is less than the open circuit threshold (LOW_THRESHOLD), it indicates that no sensor is detected (open circuit).
@@ -46,16 +44,18 @@ class SensorDetectionStrategy(ValidationStrategy):
     Validation:
     - The method ensures that the sensor is functioning properly by checking if the ADC value is within the valid range.
     """
-    def validate(self, adc_value: int) -> Response:
+    success_details = "Sensor detection successful"
+
+    def apply(self, adc_value: int) -> int:
         if adc_value < LOW_THRESHOLD:
-            return Response(status=Status.EXCEPTION, details=NO_SENSOR_DETECTED, value=None)
+            raise invalid(NO_SENSOR_DETECTED)
         if adc_value > HIGH_THRESHOLD:
-            return Response(status=Status.EXCEPTION, details=SENSOR_SHORT_CIRCUIT_DETECTED, value=None)
-        return Response(status=Status.OK, details="Sensor detection successful", value=adc_value)
+            raise invalid(SENSOR_SHORT_CIRCUIT_DETECTED)
+        return adc_value
 
 
 # Strategy for converting ADC value to current (mA)
-class ADCToCurrentConversionStrategy(ValidationStrategy):
+class ADCToCurrentConversionStrategy(StepValidationStrategy):
     """
     Converts the raw ADC value into the corresponding current in mA, considering the 200-ohm resistor.
 
@@ -65,7 +65,9 @@ class ADCToCurrentConversionStrategy(ValidationStrategy):
 
     return is rounded to avoid floating point issues
     """
-    def validate(self, adc_value: int) -> Response:
+    success_details = "ADC to current conversion successful"
+
+    def apply(self, adc_value: int) -> float:
         try:
             # Allow for tolerance in ADC values to determine 4mA or 20mA
             if LOW_THRESHOLD <= adc_value <= LOW_VALUE:
@@ -79,33 +81,35 @@ class ADCToCurrentConversionStrategy(ValidationStrategy):
                 # Convert voltage to current (based on 200-ohm resistor)
                 current_ma = (voltage / RESISTOR) * CONVERT_TO_MA  # Convert from A to mA
 
-            return Response(status=Status.OK, details="ADC to current conversion successful", value=round(current_ma, 2))
+            return round(current_ma, 2)
 
         except Exception as e:
-            return Response(status=Status.EXCEPTION, details=f"ADC to Current Conversion error: {e}", value=None)
+            raise invalid(f"ADC to Current Conversion error: {e}")
 
 
 # Strategy for converting current (mA) to temperature (Celsius)
-class CurrentToTemperatureConversionStrategy(ValidationStrategy):
+class CurrentToTemperatureConversionStrategy(StepValidationStrategy):
     """
     Converts the current (in mA) to temperature in Celsius.
 
     The sensor operates within a 4-20 mA range, and this strategy maps that range to a temperature range
     of 0°C to 50°C (or any other custom range provided).
     """
+    success_details = "Current to temperature conversion successful"
+
     def __init__(self, min_temp: LowTemperatureRange, max_temp: HighTemperatureRange):
         self.max_temp = max_temp.value
         self.min_temp = min_temp.value
 
-    def validate(self, current_ma: float) -> Response:
+    def apply(self, current_ma: float) -> float:
         try:
             if not (MIN_CURRENT_MA <= current_ma <= MAX_CURRENT_MA):
-                return Response(status=Status.EXCEPTION, details=f"Current {current_ma} is out of range", value=None)
+                raise invalid(f"Current {current_ma} is out of range")
 
             # Conversion formula: linear mapping from 4-20mA to the temperature range
-            temperature_c = (((current_ma - MIN_CURRENT_MA) / (MAX_CURRENT_MA - MIN_CURRENT_MA))
-                             * (self.max_temp - self.min_temp) + self.min_temp)
-
-            return Response(status=Status.OK, details="Current to temperature conversion successful", value=temperature_c)
+            return (((current_ma - MIN_CURRENT_MA) / (MAX_CURRENT_MA - MIN_CURRENT_MA))
+                    * (self.max_temp - self.min_temp) + self.min_temp)
+        except ValidationFailure:
+            raise
         except Exception as e:
-            return Response(status=Status.EXCEPTION, details=f"Current to Temperature Conversion error: {e}", value=None)
+            raise invalid(f"Current to Temperature Conversion error: {e}")
@@ -3,7 +3,7 @@ from typing import List
 from utils.response import Response
 from utils.strategies import ExceptionCascadeStrategy
 from utils.temperaturecelsius import TemperatureCelsius
-from utils.value import ValidationStrategy
+from utils.value import ValidationPipeline, ValidationStrategy
 
 
 class SPITemperature(TemperatureCelsius):
@@ -11,6 +11,11 @@ class SPITemperature(TemperatureCelsius):
     def get__strategies(self) -> List[ValidationStrategy]:
         return [self._spi_exception_cascade] + super().get__strategies()
 
+    def get__pipeline(self) -> ValidationPipeline:
+        # Only the SPI cascade holds instance data, the range validation is compiled once
+        return ValidationPipeline([self._spi_exception_cascade,
+                                   self.compiled(self._range_key(), super().get__strategies)])
+
     def __init__(self, spi_response: Response[int]):
         self._spi_exception_cascade = ExceptionCascadeStrategy(spi_response)
 
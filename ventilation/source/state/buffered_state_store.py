@@ -0,0 +1,241 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from state.state_store import StateStore
+from state.system_state import SystemState
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_FSYNC_INTERVAL = 30.0
+DEFAULT_MAX_PENDING = 10000
+
+# Markers placed on the writer queue besides states and commands
+_STOP = object()
+_FLUSH_DUE = object()
+
+
+class Durability(Enum):
+    NONE = "none"  # Leave flushing to disk to the operating system
+    PERIODIC = "periodic"  # fsync at most once every fsync_interval seconds, and no later than that after a write
+    EVERY_WRITE = "every_write"  # fsync every batch before it counts as written
+
+
+@dataclass(frozen=True)
+class StateWriterMetrics:
+    """
+    Fields:
+        - pending: States queued but not yet written.
+        - max_pending: The highest number of pending states seen, shows how close the queue came to full.
+        - dropped: States dropped because the queue was full.
+        - written: States written to the store.
+        - batches: Batches written to the store.
+        - fsyncs: Batches that were fsynced.
+        - errors: Batches that failed to write, the states of a failed batch are lost.
+        - last_batch_seconds: How long the last batch took to write.
+    """
+    pending: int
+    max_pending: int
+    dropped: int
+    written: int
+    batches: int
+    fsyncs: int
+    errors: int
+    last_batch_seconds: float
+
+
+class BufferedStateStore(StateStore):
+    """
+    Wraps another StateStore so appends only queue the state and return straight away.
+
+    A background thread writes the queued states in batches, when batch_size states are pending or
+    flush_interval seconds after the first state of a batch arrived, whichever is first. Every batch is
+    one write of whole records, so a crash can only lose or tear the last batch, which the stores
+    ignore on load. When max_pending states are queued, append drops the state and counts it rather
+    than block the caller, which usually is the event loop, until the writer catches up.
+
+    Reads, clear and close first wait for every queued state to be written.
+    """
+
+    def __init__(self, store: StateStore,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 durability: Durability = Durability.PERIODIC,
+                 fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        assert batch_size > 0, "Batch size must be positive"
+        assert flush_interval > 0, "Flush interval must be positive"
+        assert fsync_interval > 0, "Fsync interval must be positive"
+        assert max_pending > 0, "Max pending must be positive"
+
+        self._store = store
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._durability = durability
+        self._fsync_interval = fsync_interval
+        # Holds states to write, markers, or (command, future, sync) to run on the writer thread in order
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._last_fsync = time.monotonic()
+        self._unsynced = False  # Batches were written since the last fsync, only used by the writer thread
+        self._closed = False
+
+        self._lock = threading.Lock()
+        self._max_pending = 0
+        self._dropped = 0
+        self._written = 0
+        self._batches = 0
+        self._fsyncs = 0
+        self._errors = 0
+        self._last_batch_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="state-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def metrics(self) -> StateWriterMetrics:
+        with self._lock:
+            return StateWriterMetrics(
+                pending=self._queue.qsize(),
+                max_pending=self._max_pending,
+                dropped=self._dropped,
+                written=self._written,
+                batches=self._batches,
+                fsyncs=self._fsyncs,
+                errors=self._errors,
+                last_batch_seconds=self._last_batch_seconds
+            )
+
+    def append(self, state: SystemState):
+        assert not self._closed, "The state store has been closed"
+        try:
+            self._queue.put_nowait(state)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return
+        with self._lock:
+            self._max_pending = max(self._max_pending, self._queue.qsize())
+
+    def append_batch(self, states: List[SystemState], sync: bool = False):
+        for state in states:
+            self.append(state)
+        if sync:
+            self._call(lambda: None, sync=True)
+
+    def flush(self, sync: bool = False):
+        """Wait until every queued state has been written, optionally fsyncing them."""
+        self._call(lambda: None, sync=sync)
+
+    def load(self, offset: int = 0) -> Iterator[SystemState]:
+        self.flush()
+        return self._store.load(offset)
+
+    def latest(self) -> Optional[SystemState]:
+        self.flush()
+        return self._store.latest()
+
+    def index(self) -> List[Tuple[float, int]]:
+        self.flush()
+        return self._store.index()
+
+    def clear(self):
+        self._call(self._store.clear)
+
+    def close(self):
+        """Write every queued state, fsync them and stop the writer thread."""
+        if self._closed:
+            return
+        self._call(self._store.close, sync=self._durability != Durability.NONE)
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def submit(self, command: Callable[[], None]) -> Future:
+        """
+        Queue the command to run on the writer thread after every state queued before it, without waiting
+        for it. Lets files written next to the history, like the rollups, share the writer thread. Unlike
+        append this waits for room when the queue is full, so the command is never dropped.
+        """
+        return self._submit(command)
+
+    def _call(self, command: Callable[[], None], sync: bool = False):
+        """Run the command on the writer thread, after every state queued before it has been written."""
+        return self._submit(command, sync).result()
+
+    def _submit(self, command: Callable[[], None], sync: bool = False) -> Future:
+        assert not self._closed, "The state store has been closed"
+        future = Future()
+        self._queue.put((command, future, sync))
+        return future
+
+    def _run(self):
+        batch: List[SystemState] = []
+        deadline = 0.0
+
+        while True:
+            try:
+                item = self._queue.get(timeout=self._wait_timeout(batch, deadline))
+            except queue.Empty:
+                item = _FLUSH_DUE  # The flush interval of the batch, or the fsync interval, has passed
+
+            if isinstance(item, SystemState):
+                if not batch:
+                    deadline = time.monotonic() + self._flush_interval
+                batch.append(item)
+                if len(batch) < self._batch_size:
+                    continue
+                self._write(batch)
+            elif item is _STOP:
+                self._write(batch)
+                return
+            elif item is _FLUSH_DUE:
+                self._write(batch)
+            else:
+                command, future, sync = item
+                self._write(batch, force_sync=sync)
+                self._run_command(command, future)
+            batch = []
+
+    def _wait_timeout(self, batch: List[SystemState], deadline: float) -> Optional[float]:
+        """
+        Seconds the writer may wait for the next item: until the batch is due or, with PERIODIC durability,
+        until batches written since the last fsync must be synced. None waits for the next item.
+        """
+        wakes = [deadline] if batch else []
+        if self._unsynced and self._durability == Durability.PERIODIC:
+            wakes.append(self._last_fsync + self._fsync_interval)
+        return max(0.0, min(wakes) - time.monotonic()) if wakes else None
+
+    def _write(self, batch: List[SystemState], force_sync: bool = False):
+        started = time.monotonic()
+        sync = force_sync or self._durability == Durability.EVERY_WRITE or (
+            self._durability == Durability.PERIODIC and started - self._last_fsync >= self._fsync_interval)
+        if not batch and not force_sync and not (sync and self._unsynced):
+            return
+
+        try:
+            self._store.append_batch(batch, sync=sync)
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            return
+
+        if sync:
+            self._last_fsync = started
+        self._unsynced = not sync and (self._unsynced or bool(batch))
+        with self._lock:
+            self._written += len(batch)
+            self._batches += 1 if batch else 0
+            self._fsyncs += 1 if sync else 0
+            self._last_batch_seconds = time.monotonic() - started
+
+    @staticmethod
+    def _run_command(command: Callable[[], None], future: Future):
+        try:
+            future.set_result(command())
+        except Exception as e:
+            future.set_exception(e)
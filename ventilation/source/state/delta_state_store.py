@@ -0,0 +1,247 @@
+import json
+import os
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from state.state_store import StateStore
+from state.system_state import SystemState
+
+KEYFRAME = 0
+DELTA = 1
+
+# kind, timestamp, payload length
+HEADER = struct.Struct('<BdI')
+# payload length repeated after the payload, so the file can also be walked backwards
+FOOTER = struct.Struct('<I')
+
+# Short section names keep every record small
+SECTIONS = {
+    's': 'sensor_data',
+    'r': 'triggered_rules',
+    'o': 'operational_states',
+}
+
+DEFAULT_KEYFRAME_INTERVAL = 100
+
+Sections = Dict[str, Dict[str, Any]]
+
+
+class DeltaStateStore(StateStore):
+    """
+    A compact binary state log that stores only the keys that changed on each update.
+
+    Every record is a fixed size header (kind, timestamp, payload length), a compact JSON payload and
+    a footer repeating the payload length. A keyframe record holds the full state, a delta record only
+    the keys whose value changed since the previous state. A keyframe is written every keyframe_interval
+    records, and as the first record of every session, so a state never depends on more than
+    keyframe_interval records and a reopened log never depends on in-memory state from a previous run.
+
+    Full states are rebuilt on demand by replaying deltas on top of the nearest keyframe.
+    A record cut short by a crash is ignored when loading, and removed before the next write. After a
+    failed write the next record is a keyframe, so no delta refers to a state that was not stored.
+    """
+
+    def __init__(self, file_path: str, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        assert keyframe_interval > 0, "Keyframe interval must be positive"
+        self.file_path = file_path
+        self._keyframe_interval = keyframe_interval
+        self._last_state: Optional[SystemState] = None
+        self._records_since_keyframe = 0
+        self._tail_checked = False
+
+    def append(self, state: SystemState):
+        self.append_batch([state])
+
+    def append_batch(self, states: List[SystemState], sync: bool = False):
+        if not self._tail_checked:
+            self._trim_torn_tail()
+            self._tail_checked = True
+        try:
+            records = b''.join(self._encode_next(state) for state in states)
+            with open(self.file_path, 'ab') as f:
+                f.write(records)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        except Exception:
+            # Deltas must not refer to states that may not have been stored
+            self._last_state = None
+            self._tail_checked = False
+            raise
+
+    def _trim_torn_tail(self):
+        """Cut the log back to the end of its last complete record."""
+        try:
+            with open(self.file_path, 'rb+') as f:
+                size = f.seek(0, os.SEEK_END)
+                if size == 0 or self._previous_record_start(f, size) is not None:
+                    return
+                offset = 0
+                while offset + HEADER.size <= size:
+                    f.seek(offset)
+                    length = HEADER.unpack(f.read(HEADER.size))[2]
+                    end = offset + HEADER.size + length + FOOTER.size
+                    if end > size:
+                        break
+                    f.seek(end - FOOTER.size)
+                    if FOOTER.unpack(f.read(FOOTER.size))[0] != length:
+                        break
+                    offset = end
+                f.truncate(offset)
+        except FileNotFoundError:
+            pass
+
+    def _encode_next(self, state: SystemState) -> bytes:
+        """Encode the state as a keyframe or as a delta against the previously encoded state."""
+        if self._last_state is None or self._records_since_keyframe >= self._keyframe_interval:
+            kind, sections = KEYFRAME, self._sections(state)
+            self._records_since_keyframe = 0
+        else:
+            kind, sections = DELTA, self._delta(self._last_state, state)
+
+        self._last_state = state
+        self._records_since_keyframe += 1
+        return self.encode(kind, state.timestamp, sections)
+
+    def load(self, offset: int = 0) -> Iterator[SystemState]:
+        try:
+            with open(self.file_path, 'rb') as f:
+                f.seek(offset)
+                current: Optional[Sections] = None
+                for kind, timestamp, sections in self.records(f):
+                    current = self.apply(current, kind, sections)
+                    if current is not None:
+                        yield self.to_state(current, timestamp)
+        except FileNotFoundError:
+            return
+
+    def latest(self) -> Optional[SystemState]:
+        """Rebuild the last state from the last keyframe, reading at most keyframe_interval records."""
+        try:
+            with open(self.file_path, 'rb') as f:
+                offset = self._last_keyframe_offset(f)
+                if offset is None:
+                    return None
+                f.seek(offset)
+                current, timestamp = None, None
+                for kind, timestamp, sections in self.records(f):
+                    current = self.apply(current, kind, sections)
+                return self.to_state(current, timestamp) if current is not None else None
+        except FileNotFoundError:
+            return None
+
+    def index(self) -> List[Tuple[float, int]]:
+        """
+        (timestamp, offset) of every keyframe, the positions a load can resume from.
+        Only record headers are read, payloads are skipped over.
+        """
+        entries = []
+        try:
+            with open(self.file_path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                offset = 0
+                while offset + HEADER.size <= size:
+                    f.seek(offset)
+                    kind, timestamp, length = HEADER.unpack(f.read(HEADER.size))
+                    end = offset + HEADER.size + length + FOOTER.size
+                    if end > size:
+                        break  # Torn write at the end of the log
+                    if kind == KEYFRAME:
+                        entries.append((timestamp, offset))
+                    offset = end
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _last_keyframe_offset(self, f: BinaryIO) -> Optional[int]:
+        """
+        Walk backwards from the end of the log using the record footers. If the tail is torn the
+        footers cannot be trusted, so fall back to scanning the headers from the start.
+        """
+        position = f.seek(0, os.SEEK_END)
+        while position > 0:
+            start = self._previous_record_start(f, position)
+            if start is None:
+                break
+            f.seek(start)
+            if HEADER.unpack(f.read(HEADER.size))[0] == KEYFRAME:
+                return start
+            position = start
+
+        if position == 0:
+            return None  # Only deltas without a keyframe, nothing can be rebuilt
+
+        keyframes = self.index()
+        return keyframes[-1][1] if keyframes else None
+
+    @classmethod
+    def _previous_record_start(cls, f: BinaryIO, position: int) -> Optional[int]:
+        """The offset of the record ending at position, or None if the footer and header do not agree."""
+        if position < HEADER.size + FOOTER.size:
+            return None
+        f.seek(position - FOOTER.size)
+        length = FOOTER.unpack(f.read(FOOTER.size))[0]
+        start = position - FOOTER.size - length - HEADER.size
+        if start < 0:
+            return None
+        f.seek(start)
+        if HEADER.unpack(f.read(HEADER.size))[2] != length:
+            return None
+        return start
+
+    def clear(self):
+        with open(self.file_path, 'wb'):
+            pass
+        self._last_state = None
+        self._records_since_keyframe = 0
+
+    @classmethod
+    def encode(cls, kind: int, timestamp: float, sections: Sections) -> bytes:
+        payload = json.dumps(sections, separators=(',', ':')).encode('utf-8')
+        return HEADER.pack(kind, timestamp, len(payload)) + payload + FOOTER.pack(len(payload))
+
+    @classmethod
+    def records(cls, f: BinaryIO) -> Iterator[Tuple[int, float, Sections]]:
+        """Yield (kind, timestamp, sections) for every complete record from the current file position."""
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            kind, timestamp, length = HEADER.unpack(header)
+            payload = f.read(length)
+            footer = f.read(FOOTER.size)
+            if len(payload) < length or len(footer) < FOOTER.size or FOOTER.unpack(footer)[0] != length:
+                return  # Torn write at the end of the log
+            yield kind, timestamp, json.loads(payload)
+
+    @classmethod
+    def apply(cls, current: Optional[Sections], kind: int, sections: Sections) -> Optional[Sections]:
+        """Apply a record to the running sections, returning new dicts so earlier states are not changed."""
+        if kind == KEYFRAME:
+            return {code: dict(sections.get(code, {})) for code in SECTIONS}
+        if current is None:
+            return None  # A delta without a keyframe before it cannot be rebuilt
+        return {code: {**current[code], **sections.get(code, {})} for code in SECTIONS}
+
+    @classmethod
+    def to_state(cls, sections: Sections, timestamp: float) -> SystemState:
+        return SystemState(
+            sensor_data=sections['s'],
+            triggered_rules=sections['r'],
+            operational_states=sections['o'],
+            timestamp=timestamp
+        )
+
+    @classmethod
+    def _sections(cls, state: SystemState) -> Sections:
+        return {code: dict(getattr(state, name)) for code, name in SECTIONS.items()}
+
+    @classmethod
+    def _delta(cls, previous: SystemState, state: SystemState) -> Sections:
+        delta = {}
+        for code, name in SECTIONS.items():
+            old, new = getattr(previous, name), getattr(state, name)
+            changed = {key: value for key, value in new.items() if key not in old or old[key] != value}
+            if changed:
+                delta[code] = changed
+        return delta
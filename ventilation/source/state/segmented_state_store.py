@@ -0,0 +1,349 @@
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from state.state_store import StateStore, JsonLinesStateStore
+from state.system_state import SystemState
+
+DEFAULT_MAX_SEGMENT_BYTES = 16 * 1024 * 1024
+
+# A load offset is segment sequence * SEGMENT_STRIDE + byte offset inside the active segment
+SEGMENT_STRIDE = 1 << 40
+
+SEALED_SUFFIX = '.sealed'  # Rotated out of the active file, waiting for compaction
+COMPRESSED_SUFFIX = '.gz'
+TEMP_SUFFIX = '.tmp'
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Limits on the sealed segments kept on disk, the oldest segments are deleted first.
+    The active segment is never deleted. A limit left as None is not applied.
+
+    Fields:
+        - max_segments: The number of sealed segments to keep.
+        - max_bytes: The total size on disk of the sealed segments.
+        - max_age: Seconds, a segment is deleted once every state in it is older than this.
+    """
+    max_segments: Optional[int] = None
+    max_bytes: Optional[int] = None
+    max_age: Optional[float] = None
+
+    def __post_init__(self):
+        assert self.max_segments is None or self.max_segments >= 0, "Max segments must not be negative"
+        assert self.max_bytes is None or self.max_bytes >= 0, "Max bytes must not be negative"
+        assert self.max_age is None or self.max_age > 0, "Max age must be positive"
+
+
+class SegmentedStateStore(StateStore):
+    """
+    A JSON-lines state log split into segments, so it stops growing without bound.
+
+    New states are appended to the active segment at file_path. Once it holds max_segment_bytes, or
+    its first state is max_segment_age seconds older than the new one, it is renamed to a sealed
+    segment, file_path.000001.sealed and so on, and a fresh active segment is started. Rotation is
+    checked before each batch is written, so a segment can overshoot by one batch.
+
+    Sealed segments are compacted on a background thread: runs of consecutive states that differ only
+    in their timestamp are collapsed to the first state of the run, and the result is optionally gzip
+    compressed. Every line is a full state, so each segment starts with a keyframe and can be loaded on
+    its own. After compaction the retention policy deletes the oldest segments.
+    """
+
+    def __init__(self, file_path: str,
+                 max_segment_bytes: Optional[int] = DEFAULT_MAX_SEGMENT_BYTES,
+                 max_segment_age: Optional[float] = None,
+                 compress: bool = True,
+                 retention: RetentionPolicy = RetentionPolicy(),
+                 compact_in_background: bool = True,
+                 clock: Callable[[], float] = time.time):
+        """
+        :param file_path: The active segment, sealed segments are kept next to it.
+        :param max_segment_bytes: Size at which the active segment is rotated, None to not rotate on size.
+        :param max_segment_age: Seconds of history at which the active segment is rotated, None to not rotate on age.
+        :param compress: gzip sealed segments once compacted.
+        :param retention: Limits on the sealed segments kept on disk.
+        :param compact_in_background: Compact on a worker thread, otherwise compaction runs inside append.
+        :param clock: Wall clock time source for the retention max_age, replaceable for tests.
+        """
+        assert max_segment_bytes is None or max_segment_bytes > 0, "Max segment bytes must be positive"
+        assert max_segment_age is None or max_segment_age > 0, "Max segment age must be positive"
+
+        self.file_path = file_path
+        self._max_segment_bytes = max_segment_bytes
+        self._max_segment_age = max_segment_age
+        self._compress = compress
+        self._retention = retention
+        self._clock = clock
+        self._active = JsonLinesStateStore(file_path)
+        # Guards renaming and deleting segment files against readers opening them, and the pending tasks
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-compactor") \
+            if compact_in_background else None
+        self._pending: List[Future] = []
+        self._first_timestamps: Dict[int, Optional[float]] = {}
+
+        for leftover in glob.glob(glob.escape(file_path) + '.*' + TEMP_SUFFIX):
+            os.remove(leftover)  # A compaction interrupted by a restart, the sealed segment is still there
+
+        segments = self.segments()
+        self._active_sequence = (segments[-1] + 1) if segments else 1
+        self._active_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        with closing(self._active.load()) as states:
+            first = next(states, None)
+        self._active_first = first.timestamp if first is not None else None
+
+        for sequence in segments:
+            if os.path.exists(self._segment_path(sequence, sealed=True)):
+                self._schedule_compaction(sequence)
+        self._schedule(self._apply_retention)
+
+    def append(self, state: SystemState):
+        self.append_batch([state])
+
+    def append_batch(self, states: List[SystemState], sync: bool = False):
+        if not states:
+            return
+        if self._should_rotate(states[0]):
+            self.rotate()
+        self._active.append_batch(states, sync=sync)
+        self._active_bytes = os.path.getsize(self.file_path)
+        if self._active_first is None:
+            self._active_first = states[0].timestamp
+
+    def _should_rotate(self, state: SystemState) -> bool:
+        if self._active_first is None:
+            return False  # Never seal an empty segment
+        return ((self._max_segment_bytes is not None and self._active_bytes >= self._max_segment_bytes) or
+                (self._max_segment_age is not None and
+                 state.timestamp - self._active_first >= self._max_segment_age))
+
+    def rotate(self):
+        """Seal the active segment and start a new one."""
+        if self._active_first is None:
+            return
+        sequence = self._active_sequence
+        with self._lock:
+            os.replace(self.file_path, self._segment_path(sequence, sealed=True))
+            self._first_timestamps[sequence] = self._active_first
+            self._active_sequence += 1
+        self._active_bytes = 0
+        self._active_first = None
+        self._schedule_compaction(sequence)
+
+    def segments(self) -> List[int]:
+        """The sequence numbers of the sealed segments, oldest first."""
+        sequences = set()
+        for path in glob.glob(glob.escape(self.file_path) + '.[0-9]*'):
+            name = path[len(self.file_path) + 1:]
+            sequence = name.split('.')[0]
+            if sequence.isdigit() and not name.endswith(TEMP_SUFFIX):
+                sequences.add(int(sequence))
+        return sorted(sequences)
+
+    def wait(self):
+        """Wait for every scheduled compaction and retention pass to finish."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                future = self._pending.pop(0)
+            # Not under the lock, the task takes it to rename and delete segment files
+            future.result()
+
+    def load(self, offset: int = 0) -> Iterator[SystemState]:
+        """
+        Yield every state from the segment the offset points into. A byte offset is only honoured in the
+        active segment, sealed segments may have been compacted since the offset was taken and are read whole.
+        """
+        sequence, position = divmod(offset, SEGMENT_STRIDE)
+        for segment in self.segments():
+            if segment >= sequence:
+                yield from self._load_segment(segment)
+        if self._active_sequence >= sequence:
+            yield from self._active.load(position if self._active_sequence == sequence else 0)
+
+    def latest(self) -> Optional[SystemState]:
+        state = self._active.latest()
+        if state is not None:
+            return state
+        for segment in reversed(self.segments()):
+            last = None
+            for last in self._load_segment(segment):
+                pass
+            if last is not None:
+                return last
+        return None
+
+    def index(self) -> List[Tuple[float, int]]:
+        """
+        One entry per sealed segment, at its first state, and one per state in the active segment.
+        The index stays small however much history is kept.
+        """
+        entries = []
+        for segment in self.segments():
+            timestamp = self._first_timestamp(segment)
+            if timestamp is not None:
+                entries.append((timestamp, segment * SEGMENT_STRIDE))
+        base = self._active_sequence * SEGMENT_STRIDE
+        entries.extend((timestamp, base + offset) for timestamp, offset in self._active.index())
+        return entries
+
+    def disk_usage(self) -> int:
+        """Bytes on disk taken by the active and sealed segments."""
+        paths = glob.glob(glob.escape(self.file_path) + '.[0-9]*') + [self.file_path]
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+    def clear(self):
+        self.wait()
+        with self._lock:
+            for segment in self.segments():
+                self._remove_segment(segment)
+            self._active.clear()
+            self._active_bytes = 0
+            self._active_first = None
+
+    def close(self):
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _schedule(self, task: Callable[[], None]):
+        if self._executor is None:
+            task()
+        else:
+            with self._lock:
+                self._pending = [future for future in self._pending if not future.done()]
+                self._pending.append(self._executor.submit(task))
+
+    def _schedule_compaction(self, sequence: int):
+        self._schedule(lambda: self._compact(sequence))
+        self._schedule(self._apply_retention)
+
+    def _compact(self, sequence: int):
+        """Collapse runs of unchanged states, then write the segment out compressed or plain."""
+        sealed = self._segment_path(sequence, sealed=True)
+        target = self._segment_path(sequence)
+        temp = target + TEMP_SUFFIX
+        with self._open(temp, 'wt') as out:
+            previous = None
+            for state in self._read_lines(sealed):
+                content = (state.sensor_data, state.triggered_rules, state.operational_states)
+                if content != previous:
+                    out.write(json.dumps(state.to_dict()) + "\n")
+                    previous = content
+        # The sealed file is the only copy until the compacted one and its name are on disk
+        _fsync_path(temp)
+        with self._lock:
+            os.replace(temp, target)
+            _fsync_directory(target)
+            os.remove(sealed)
+
+    def _apply_retention(self):
+        retention = self._retention
+        segments = self.segments()
+        sizes = {segment: sum(os.path.getsize(path) for path in self._segment_files(segment)) for segment in segments}
+        total = sum(sizes.values())
+        now = self._clock()
+
+        for position, segment in enumerate(segments):
+            remaining = len(segments) - position
+            # Every state in a segment is older than the first state of the segment after it
+            newer = segments[position + 1] if position + 1 < len(segments) else None
+            newest = self._first_timestamp(newer) if newer is not None else self._active_first
+            expired = retention.max_age is not None and newest is not None and now - newest > retention.max_age
+
+            if not ((retention.max_segments is not None and remaining > retention.max_segments) or
+                    (retention.max_bytes is not None and total > retention.max_bytes) or expired):
+                break
+            total -= sizes.get(segment, 0)
+            with self._lock:
+                self._remove_segment(segment)
+
+    def _remove_segment(self, sequence: int):
+        for path in self._segment_files(sequence):
+            os.remove(path)
+        self._first_timestamps.pop(sequence, None)
+
+    def _first_timestamp(self, sequence: int) -> Optional[float]:
+        if sequence not in self._first_timestamps:
+            with closing(self._load_segment(sequence)) as states:
+                first = next(states, None)
+            self._first_timestamps[sequence] = first.timestamp if first is not None else None
+        return self._first_timestamps[sequence]
+
+    def _load_segment(self, sequence: int) -> Iterator[SystemState]:
+        with self._lock:
+            path = self._existing_path(sequence)
+            if path is None:
+                return  # Removed by retention
+            f = self._open(path, 'rt')
+        with f:
+            yield from self._parse(f)
+
+    def _read_lines(self, path: str) -> Iterator[SystemState]:
+        with self._open(path, 'rt') as f:
+            yield from self._parse(f)
+
+    @staticmethod
+    def _parse(f: TextIO) -> Iterator[SystemState]:
+        try:
+            for line in f:
+                try:
+                    yield SystemState.from_dict(json.loads(line))
+                except ValueError:
+                    pass  # Torn write at the end of the segment
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            return  # Compressed segment cut short
+
+    def _existing_path(self, sequence: int) -> Optional[str]:
+        # A compacted segment replaces its sealed file, so prefer it when both exist
+        files = self._segment_files(sequence)
+        return files[0] if files else None
+
+    def _segment_files(self, sequence: int) -> List[str]:
+        """The files of a segment, compacted before sealed. Compacted files written with either compress setting are found."""
+        base = f"{self.file_path}.{sequence:06d}"
+        return [path for path in (base + COMPRESSED_SUFFIX, base, base + SEALED_SUFFIX) if os.path.exists(path)]
+
+    def _segment_path(self, sequence: int, sealed: bool = False) -> str:
+        path = f"{self.file_path}.{sequence:06d}"
+        if sealed:
+            return path + SEALED_SUFFIX
+        return path + COMPRESSED_SUFFIX if self._compress else path
+
+    @staticmethod
+    def _open(path: str, mode: str) -> TextIO:
+        if path.endswith(COMPRESSED_SUFFIX) or path.endswith(COMPRESSED_SUFFIX + TEMP_SUFFIX):
+            return gzip.open(path, mode)
+        return open(path, mode)
+
+
+def _fsync_path(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_directory(path: str):
+    """Make a rename in the directory of path durable. Not every platform can open a directory, those skip it."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,204 @@
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterator, List, Optional
+
+from state.system_state import SystemState
+
+SENSOR_DATA = 'sensor_data'
+
+
+class EvictionPolicy(Enum):
+    OLDEST = "oldest"  # Drop the oldest states first
+    DOWNSAMPLE = "downsample"  # Thin out the older states, then drop the oldest of the thinned ones
+
+
+@dataclass(frozen=True)
+class StateSeries:
+    """
+    The numeric values of one key over time. Both arrays are array('d') of equal length, so they can be
+    handed to numpy.frombuffer without copying.
+    """
+    timestamps: array
+    values: array
+
+
+def state_size(state: SystemState) -> int:
+    """Approximate number of bytes a SystemState keeps alive, including its keys and values."""
+    size = sys.getsizeof(state)
+    for mapping in (state.sensor_data, state.triggered_rules, state.operational_states):
+        size += sys.getsizeof(mapping) + sys.getsizeof(dict(mapping))
+        size += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in mapping.items())
+    return size
+
+
+class StateHistory:
+    """
+    In-memory window of the most recent states, bounded by count, approximate bytes and age.
+    With no limits set the window is unbounded, as the history has always been.
+
+    Age is measured against the newest state's timestamp, so the window does not shrink while
+    no updates arrive.
+
+    A sorted timestamp index is kept alongside the states, so range and series find the start and
+    end of a time window by bisection. States are expected to arrive in timestamp order.
+
+    Downsampling leaves gaps in the older part of the window. contiguous_timestamp tells from where on
+    the window still holds every state that was appended. Each state is thinned out at most once, and
+    thinned states take up at most half the window. Beyond that the count and byte limits evict the
+    oldest of them, as they do with the OLDEST policy, so the window does not keep its first state forever.
+
+    State sizes are only computed when max_bytes is set.
+    """
+
+    def __init__(self, max_count: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 max_age: Optional[float] = None,
+                 policy: EvictionPolicy = EvictionPolicy.OLDEST):
+        assert max_count is None or max_count > 0, "Max count must be positive"
+        assert max_bytes is None or max_bytes > 0, "Max bytes must be positive"
+        assert max_age is None or max_age > 0, "Max age must be positive"
+
+        self._max_count = max_count
+        self._max_bytes = max_bytes
+        self._max_age = max_age
+        self._policy = policy
+        # Parallel lists, entries before _start have been evicted and are dropped in bulk by _compact
+        self._states: List[SystemState] = []
+        self._sizes: List[int] = []
+        self._timestamps: List[float] = []
+        self._start = 0
+        self._memory_bytes = 0
+        self._evicted = 0
+        # The window holds every appended state from this timestamp on
+        self._contiguous_from: Optional[float] = None
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the states in the window, 0 unless max_bytes is set."""
+        return self._memory_bytes
+
+    @property
+    def evicted(self) -> int:
+        """Number of states dropped from the window since it was created."""
+        return self._evicted
+
+    @property
+    def oldest_timestamp(self) -> Optional[float]:
+        return self._timestamps[self._start] if len(self) else None
+
+    @property
+    def contiguous_timestamp(self) -> Optional[float]:
+        """The oldest timestamp from which no state has been dropped from the window, None when empty."""
+        return self._contiguous_from if len(self) else None
+
+    def append(self, state: SystemState):
+        if not len(self):
+            self._contiguous_from = state.timestamp
+        size = state_size(state) if self._max_bytes is not None else 0
+        self._states.append(state)
+        self._sizes.append(size)
+        self._timestamps.append(state.timestamp)
+        self._memory_bytes += size
+        self._evict()
+
+    def clear(self):
+        self._states, self._sizes, self._timestamps = [], [], []
+        self._start = 0
+        self._memory_bytes = 0
+        self._contiguous_from = None
+
+    def to_list(self) -> List[SystemState]:
+        return self._states[self._start:]
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None) -> List[SystemState]:
+        """The states with start <= timestamp <= end, either bound may be left open."""
+        low, high = self._bounds(start, end)
+        return self._states[low:high]
+
+    def series(self, key: str, start: Optional[float] = None, end: Optional[float] = None,
+               section: str = SENSOR_DATA) -> StateSeries:
+        """
+        The numeric values of a key between start and end. States where the key is missing or
+        not a number are left out.
+
+        :param section: The SystemState mapping to read the key from, sensor_data by default.
+        """
+        low, high = self._bounds(start, end)
+        timestamps, values = array('d'), array('d')
+        for index in range(low, high):
+            value = getattr(self._states[index], section).get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                timestamps.append(self._timestamps[index])
+                values.append(value)
+        return StateSeries(timestamps=timestamps, values=values)
+
+    def __len__(self) -> int:
+        return len(self._states) - self._start
+
+    def __iter__(self) -> Iterator[SystemState]:
+        return iter(self.to_list())
+
+    def _bounds(self, start: Optional[float], end: Optional[float]):
+        low = self._start if start is None else bisect_left(self._timestamps, start, lo=self._start)
+        high = len(self._timestamps) if end is None else bisect_right(self._timestamps, end, lo=low)
+        return low, high
+
+    def _evict(self):
+        if self._max_age is not None:
+            oldest_allowed = self._timestamps[-1] - self._max_age
+            while self._timestamps[self._start] < oldest_allowed:
+                self._pop_oldest()
+
+        while self._over_limit():
+            if not (self._policy == EvictionPolicy.DOWNSAMPLE and self._downsample()):
+                self._pop_oldest()
+
+        self._compact()
+
+    def _over_limit(self) -> bool:
+        return ((self._max_count is not None and len(self) > self._max_count) or
+                (self._max_bytes is not None and self._memory_bytes > self._max_bytes and len(self) > 1))
+
+    def _pop_oldest(self):
+        self._memory_bytes -= self._sizes[self._start]
+        self._start += 1
+        self._evicted += 1
+        if len(self):
+            self._contiguous_from = max(self._contiguous_from, self._timestamps[self._start])
+
+    def _compact(self):
+        """Drop evicted entries once they make up half of the lists, keeping eviction O(1) amortised."""
+        if self._start and self._start * 2 >= len(self._states):
+            del self._states[:self._start]
+            del self._sizes[:self._start]
+            del self._timestamps[:self._start]
+            self._start = 0
+
+    def _downsample(self) -> bool:
+        """
+        Drop every other state in the older half of the states not thinned out yet, the first of them is kept.
+        Returns False when thinned states would then make up more than half the window, or when the window
+        is too small to thin out.
+        """
+        first = bisect_left(self._timestamps, self._contiguous_from, lo=self._start)
+        half = first + (len(self._states) - first) // 2
+        thinned = list(range(self._start, first))
+        thinned += [index for index in range(first, half) if (index - first) % 2 == 0]
+        kept = thinned + list(range(half, len(self._states)))
+        if len(thinned) * 2 > len(kept):
+            return False
+        dropped = len(self) - len(kept)
+
+        if dropped:
+            # The older half now has gaps, only the newer half holds every state
+            self._contiguous_from = max(self._contiguous_from, self._timestamps[half])
+        self._states = [self._states[index] for index in kept]
+        self._sizes = [self._sizes[index] for index in kept]
+        self._timestamps = [self._timestamps[index] for index in kept]
+        self._start = 0
+        self._memory_bytes = sum(self._sizes)
+        self._evicted += dropped
+        return dropped > 0
@@ -1,17 +1,40 @@
-import json
-from typing import Optional, List, Dict, Any
+from bisect import bisect_right
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 
+from state.state_history import StateHistory, StateSeries
+from state.state_rollup import Rollup, RollupEngine
+from state.state_store import StateStore, JsonLinesStateStore
 from state.system_state import SystemState
 
 
 class StateManager:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, store: StateStore = None, history: StateHistory = None,
+                 fast_start: bool = False, rollups: RollupEngine = None):
+        """
+        :param file_path: The file the state history is kept in.
+        :param store: The storage format for the history, defaults to one JSON line per state.
+                      Use a DeltaStateStore to write only the keys that changed on each update,
+                      or a SegmentedStateStore to rotate, compact and expire the file.
+        :param history: The in-memory window of recent states, defaults to an unbounded window.
+                        States evicted from a bounded window remain available from the store.
+        :param fast_start: Only recover the latest state from the end of the file instead of loading the
+                           whole history. Older states are streamed on demand by iter_full_history.
+        :param rollups: Keeps min/max/mean/last rollups of the sensor data as states are updated,
+                        usually persisted to a file next to the history. Give it the submit method of a
+                        BufferedStateStore as writer to write that file from the state writer thread too.
+        """
         self._current_state: Optional[SystemState] = None  # Allow None initially
-        self._state_history: List[SystemState] = []
+        self._state_history: StateHistory = history if history is not None else StateHistory()
         self.file_path = file_path
+        self._store = store if store is not None else JsonLinesStateStore(file_path)
+        self._store_index: Optional[List[Tuple[float, int]]] = None  # Built on use, dropped on every append
+        self._rollups = rollups
 
-        # Load existing states from the file if they exist
-        self._load_state_history()
+        if fast_start:
+            self._current_state = self._store.latest()
+        else:
+            # Load existing states from the file if they exist
+            self._load_state_history()
 
     def update_state(self, sensor_data: Dict[str, Any] = None,
                      triggered_rules: Dict[str, str] = None,
@@ -42,7 +65,7 @@ class StateManager:
             timestamp=timestamp
         )
         # Add the initial state to the history
-        self._save_current_state_to_history()
+        self._save_current_state_to_history(sensor_data)
 
     def _update_existing_state(self, sensor_data, triggered_rules, operational_states, timestamp):
         """Update the existing state with new data."""
@@ -59,7 +82,7 @@ class StateManager:
 
         # Update to the new state Save the current state to the history
         self._current_state = new_state
-        self._save_current_state_to_history()
+        self._save_current_state_to_history(sensor_data)
 
     @classmethod
     def _merge_data(cls, current_data: Dict[str, Any], new_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
@@ -69,38 +92,92 @@ class StateManager:
         """
         return {**current_data, **(new_data or {})}
 
-    def _save_current_state_to_history(self):
-        """Append the current state to the state history and save it to the file."""
+    def _save_current_state_to_history(self, sensor_data: Optional[Dict[str, Any]]):
+        """
+        Append the current state to the state history and save it to the file. Only the sensor data of
+        this update is rolled up, readings carried forward from earlier states were counted already.
+        """
         self._state_history.append(self._current_state)
         self._write_state_to_file(self._current_state)
+        if self._rollups is not None and sensor_data:
+            self._rollups.add_readings(self._current_state.timestamp, sensor_data)
 
     @property
     def current_state(self) -> Optional[SystemState]:
         return self._current_state
 
-    def get_state_history(self) -> List[SystemState]:
+    @property
+    def history_window(self) -> StateHistory:
+        """The in-memory window, exposes its size and memory accounting."""
         return self._state_history
 
+    def get_state_history(self) -> List[SystemState]:
+        """The states held in the in-memory window, oldest first."""
+        return self._state_history.to_list()
+
+    def state_range(self, start: Optional[float] = None, end: Optional[float] = None) -> List[SystemState]:
+        """The states in the in-memory window with start <= timestamp <= end, found by bisection."""
+        return self._state_history.range(start, end)
+
+    def sensor_series(self, name: str, start: Optional[float] = None, end: Optional[float] = None) -> StateSeries:
+        """The numeric readings of one sensor in the in-memory window between start and end."""
+        return self._state_history.series(name, start, end)
+
+    def sensor_rollups(self, name: str, resolution: float, start: Optional[float] = None,
+                       end: Optional[float] = None) -> List[Rollup]:
+        """The rollup buckets of one sensor, answered without reading the raw history."""
+        assert self._rollups is not None, "Rollups are not enabled"
+        return self._rollups.query(name, resolution, start, end)
+
+    def iter_full_history(self, since: Optional[float] = None) -> Iterator[SystemState]:
+        """
+        Every state that was stored, oldest first, optionally only those at or after since.
+        States older than the contiguous part of the in-memory window, including the states it
+        dropped when downsampling, are streamed lazily from the store, starting from the closest
+        position in the store's offset index. The rest come from the window.
+        """
+        contiguous = self._state_history.contiguous_timestamp
+        if contiguous is None or since is None or since < contiguous:
+            for state in self._store.load(self._store_offset(since)):
+                if contiguous is not None and state.timestamp >= contiguous:
+                    break
+                if since is None or state.timestamp >= since:
+                    yield state
+
+        if contiguous is not None:
+            yield from self._state_history.range(contiguous if since is None else max(since, contiguous))
+
+    def _store_offset(self, since: Optional[float]) -> int:
+        """The offset of the last resumable position in the store at or before since."""
+        if since is None:
+            return 0
+        if self._store_index is None:
+            self._store_index = self._store.index()
+        position = bisect_right([timestamp for timestamp, _ in self._store_index], since) - 1
+        return self._store_index[position][1] if position >= 0 else 0
+
+    def close(self):
+        """Write out anything the store still holds and release it."""
+        if self._rollups is not None:
+            # Queued before the store closes, in case the rollups are written by its writer thread
+            self._rollups.flush()
+        self._store.close()
+
     def clear_state_history(self):
-        self._state_history = []
-        with open(self.file_path, 'w') as f:
-            f.write("")
+        self._state_history.clear()
+        self._store.clear()
+        self._store_index = None
+        if self._rollups is not None:
+            self._rollups.clear()
 
     def _write_state_to_file(self, state: SystemState):
-        """Serialize the state to JSON and append it to the file."""
-        with open(self.file_path, 'a') as f:
-            f.write(json.dumps(state.to_dict()) + "\n")
+        """Append the state to the store. The store may rotate or compact on append, so its index is rebuilt."""
+        self._store.append(state)
+        self._store_index = None
 
     def _load_state_history(self):
-        """Load state history from a file, if the file exists."""
-        try:
-            with open(self.file_path, 'r') as f:
-                for line in f:
-                    self._load_state_from_line(line)
-        except FileNotFoundError:
-            # If the file does not exist, start with an empty history
-            pass
-
-    def _load_state_from_line(self, line: str):
-        """Load a single state from a line of JSON and append it to the state history."""
-        self._state_history.append(SystemState.from_dict(json.loads(line)))
+        """Load state history from the store, an absent file is an empty history."""
+        for state in self._store.load():
+            self._state_history.append(state)
+            # The last stored state is the merged state to continue from
+            self._current_state = state
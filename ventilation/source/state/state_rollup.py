@@ -0,0 +1,255 @@
+import json
+import math
+import os
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from state.state_store import trim_torn_tail
+from state.system_state import SystemState
+
+MINUTE = 60.0
+QUARTER_HOUR = 900.0
+HOUR = 3600.0
+DAY = 86400.0
+DEFAULT_RESOLUTIONS = (MINUTE, QUARTER_HOUR, HOUR)
+# Seconds of sealed buckets kept per resolution, counted back from the newest bucket of the sensor
+DEFAULT_RETENTION = {MINUTE: DAY, QUARTER_HOUR: 30 * DAY, HOUR: 365 * DAY}
+# The rollup file is rewritten with only the kept buckets once it holds this many times as many lines
+COMPACT_FACTOR = 2
+COMPACT_MIN_LINES = 1000
+TEMP_SUFFIX = '.tmp'
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """
+    Summary of one sensor's readings over one bucket of time.
+
+    Fields:
+        - start: Start of the bucket, a multiple of the resolution.
+        - resolution: Length of the bucket in seconds.
+        - count: Number of readings folded into the bucket.
+        - minimum, maximum, last: Smallest, largest and most recent reading.
+        - total: Sum of the readings, kept instead of the mean so buckets can be combined.
+    """
+    start: float
+    resolution: float
+    count: int
+    minimum: float
+    maximum: float
+    total: float
+    last: float
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+
+    def add(self, value: float) -> 'Rollup':
+        return replace(self, count=self.count + 1, minimum=min(self.minimum, value),
+                       maximum=max(self.maximum, value), total=self.total + value, last=value)
+
+    def to_dict(self, key: str) -> dict:
+        return {'k': key, 'r': self.resolution, 't': self.start, 'n': self.count,
+                'min': self.minimum, 'max': self.maximum, 'sum': self.total, 'last': self.last}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Tuple[str, 'Rollup']:
+        return data['k'], cls(start=data['t'], resolution=data['r'], count=data['n'], minimum=data['min'],
+                              maximum=data['max'], total=data['sum'], last=data['last'])
+
+
+class RollupEngine:
+    """
+    Incremental min/max/mean/last rollups of every numeric sensor reading, by default in 1 minute,
+    15 minute and 1 hour buckets.
+
+    Each state is folded into the open bucket of every sensor and resolution in O(1). When a state
+    falls into a later bucket the open one is sealed and, if a file_path is given, appended to the
+    rollup file as one JSON line. Rollups can then be queried without touching the raw history.
+
+    A state older than the open bucket of a sensor is not folded in, states are expected to arrive
+    in timestamp order.
+
+    Sealed buckets older than the retention of their resolution are dropped, and the rollup file is
+    rewritten with only the kept buckets once it has grown to COMPACT_FACTOR times their number.
+
+    The file is written by the writer, which by default runs the writes in place. The writes only read
+    snapshots of the buckets, so a writer may run them later on another thread, in the order given.
+    """
+
+    def __init__(self, file_path: Optional[str] = None, resolutions: Iterable[float] = DEFAULT_RESOLUTIONS,
+                 retention: Mapping[float, float] = None,
+                 writer: Optional[Callable[[Callable[[], None]], Any]] = None):
+        """
+        :param retention: Seconds of sealed buckets to keep per resolution, defaults to DEFAULT_RETENTION.
+                          Resolutions without a retention keep every bucket.
+        :param writer: Runs the writes to the rollup file. Pass BufferedStateStore.submit to write from the
+                       state writer thread, keeping the file I/O off the polling path.
+        """
+        self.resolutions = tuple(sorted(resolutions))
+        assert self.resolutions, "At least one resolution is required"
+        assert all(resolution > 0 for resolution in self.resolutions), "Resolutions must be positive"
+        self.retention = dict(DEFAULT_RETENTION if retention is None else retention)
+        assert all(seconds > 0 for seconds in self.retention.values()), "Retention must be positive"
+
+        self.file_path = file_path
+        self._writer = writer if writer is not None else _run_now
+        self._file_lines = 0
+        self._tail_checked = False  # Only used by the writes
+        # Sealed buckets per (resolution, key), in start order
+        self._sealed: Dict[Tuple[float, str], List[Rollup]] = {}
+        self._starts: Dict[Tuple[float, str], List[float]] = {}
+        self._open: Dict[Tuple[float, str], Rollup] = {}
+        self._load()
+
+    def add(self, state: SystemState):
+        """Fold every numeric sensor reading of the state into the open buckets."""
+        self.add_readings(state.timestamp, state.sensor_data)
+
+    def add_readings(self, timestamp: float, readings: Mapping[str, Any]):
+        """Fold the numeric readings taken at timestamp into the open buckets, each reading is counted once."""
+        sealed = []
+        for key, value in readings.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            for resolution in self.resolutions:
+                start = math.floor(timestamp / resolution) * resolution
+                series = (resolution, key)
+                current = self._open.get(series)
+                if current is None or start > current.start:
+                    if current is not None:
+                        self._seal(series, current)
+                        sealed.append((key, current))
+                    self._open[series] = Rollup(start=start, resolution=resolution, count=1, minimum=value,
+                                                maximum=value, total=value, last=value)
+                elif start == current.start:
+                    self._open[series] = current.add(value)
+        self._write(sealed)
+
+    def query(self, key: str, resolution: float, start: Optional[float] = None,
+              end: Optional[float] = None) -> List[Rollup]:
+        """
+        The buckets of a sensor at one resolution whose start lies between start and end, oldest first.
+        The open bucket is included, so the newest bucket may still change.
+        """
+        assert resolution in self.resolutions, f"No rollups at resolution {resolution}"
+        series = (resolution, key)
+        sealed = self._sealed.get(series, [])
+        starts = self._starts.get(series, [])
+        low = 0 if start is None else bisect_left(starts, start)
+        high = len(starts) if end is None else bisect_right(starts, end, lo=low)
+        rollups = sealed[low:high]
+
+        current = self._open.get(series)
+        if current is not None and (start is None or current.start >= start) and (end is None or current.start <= end):
+            rollups.append(current)
+        return rollups
+
+    def keys(self) -> List[str]:
+        """The sensors that have rollups."""
+        return sorted({key for _, key in self._open})
+
+    def flush(self):
+        """
+        Write the open buckets to the rollup file. They are rewritten when they are sealed,
+        and a later line for the same bucket replaces the earlier one when loading.
+        With a writer that runs later, the write is only queued.
+        """
+        self._write(sorted(((key, rollup) for (_, key), rollup in self._open.items()),
+                           key=lambda item: (item[0], item[1].resolution)))
+
+    def clear(self):
+        self._sealed.clear()
+        self._starts.clear()
+        self._open.clear()
+        self._file_lines = 0
+        if self.file_path is not None:
+            self._writer(self._truncate)
+
+    def _seal(self, series: Tuple[float, str], rollup: Rollup):
+        sealed = self._sealed.setdefault(series, [])
+        starts = self._starts.setdefault(series, [])
+        sealed.append(rollup)
+        starts.append(rollup.start)
+
+        retention = self.retention.get(series[0])
+        if retention is not None and starts[0] < rollup.start - retention:
+            expired = bisect_left(starts, rollup.start - retention)
+            del sealed[:expired]
+            del starts[:expired]
+
+    def _write(self, rollups: List[Tuple[str, Rollup]]):
+        if self.file_path is None or not rollups:
+            return
+        self._file_lines += len(rollups)
+
+        kept = sum(len(sealed) for sealed in self._sealed.values()) + len(self._open)
+        if self._file_lines >= COMPACT_FACTOR * max(kept, COMPACT_MIN_LINES):
+            # The kept buckets include the ones just sealed, so the rewrite replaces the append
+            snapshot = [(key, rollup) for (_, key), sealed in sorted(self._sealed.items()) for rollup in sealed]
+            snapshot += sorted(((key, rollup) for (_, key), rollup in self._open.items()),
+                               key=lambda item: (item[0], item[1].resolution))
+            self._file_lines = len(snapshot)
+            self._writer(lambda: self._compact(snapshot))
+        else:
+            self._writer(lambda: self._append(rollups))
+
+    def _append(self, rollups: List[Tuple[str, Rollup]]):
+        """Append the rollups, first cutting off a line torn by a crash so they do not continue it."""
+        if not self._tail_checked:
+            trim_torn_tail(self.file_path)
+            self._tail_checked = True
+        try:
+            with open(self.file_path, 'a') as f:
+                f.write("".join(json.dumps(rollup.to_dict(key)) + "\n" for key, rollup in rollups))
+        except OSError:
+            # The write may have been torn, check the tail again before the next one
+            self._tail_checked = False
+            raise
+
+    def _compact(self, rollups: List[Tuple[str, Rollup]]):
+        """Rewrite the rollup file with only the kept buckets, replacing it in one step."""
+        temp = self.file_path + TEMP_SUFFIX
+        with open(temp, 'w') as f:
+            f.write("".join(json.dumps(rollup.to_dict(key)) + "\n" for key, rollup in rollups))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.file_path)
+        self._tail_checked = True
+
+    def _truncate(self):
+        with open(self.file_path, 'w') as f:
+            f.write("")
+        self._tail_checked = True
+
+    def _load(self):
+        """
+        Restore the buckets from the rollup file. The newest bucket of every series is reopened,
+        so readings after a restart continue to fold into it.
+        """
+        if self.file_path is None:
+            return
+        try:
+            with open(self.file_path, 'r') as f:
+                for line in f:
+                    self._file_lines += 1
+                    try:
+                        key, rollup = Rollup.from_dict(json.loads(line))
+                    except (ValueError, KeyError):
+                        continue  # Torn write at the end of the file
+                    if rollup.resolution not in self.resolutions:
+                        continue
+                    series = (rollup.resolution, key)
+                    current = self._open.get(series)
+                    if current is not None and rollup.start > current.start:
+                        self._seal(series, current)
+                    if current is None or rollup.start >= current.start:
+                        self._open[series] = rollup
+        except FileNotFoundError:
+            # If the file does not exist, there are no rollups yet
+            return
+
+
+def _run_now(write: Callable[[], None]):
+    write()
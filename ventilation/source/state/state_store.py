@@ -0,0 +1,193 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
+from state.system_state import SystemState
+
+TAIL_BLOCK_SIZE = 4096
+# SystemState.to_dict puts the timestamp last, so it is the last top level key of every line
+TIMESTAMP_KEY = b'"timestamp": '
+
+
+class StateStore(ABC):
+    """
+    Persistent storage for the history of SystemState written by the StateManager.
+    """
+
+    @abstractmethod
+    def append(self, state: SystemState):  # pragma: no cover
+        """Persist a new state at the end of the history."""
+        pass
+
+    def append_batch(self, states: List[SystemState], sync: bool = False):
+        """
+        Persist several states with a single write of whole records.
+        :param sync: fsync the file before returning, so the batch survives a power cut.
+        """
+        for state in states:
+            self.append(state)
+
+    @abstractmethod
+    def load(self, offset: int = 0) -> Iterator[SystemState]:  # pragma: no cover
+        """Yield every stored state, oldest first, starting at a byte offset taken from index()."""
+        pass
+
+    def latest(self) -> Optional[SystemState]:
+        """The most recently stored state. Stores override this to avoid reading the whole history."""
+        last = deque(self.load(), maxlen=1)
+        return last[0] if last else None
+
+    @abstractmethod
+    def index(self) -> List[Tuple[float, int]]:  # pragma: no cover
+        """(timestamp, byte offset) of every position load can resume from, in file order."""
+        pass
+
+    @abstractmethod
+    def clear(self):  # pragma: no cover
+        """Remove every stored state."""
+        pass
+
+    def close(self):
+        """Release any resources held by the store."""
+        pass
+
+
+class JsonLinesStateStore(StateStore):
+    """
+    Stores one full JSON dump of every state per line. Simple and human readable,
+    but every update writes the whole merged state.
+
+    A last line cut short by a crash is ignored on load, and removed before the next write so that
+    the new lines do not continue it.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._tail_checked = False
+
+    def append(self, state: SystemState):
+        self._write(json.dumps(state.to_dict()) + "\n")
+
+    def append_batch(self, states: List[SystemState], sync: bool = False):
+        self._write("".join(json.dumps(state.to_dict()) + "\n" for state in states), sync)
+
+    def _write(self, lines: str, sync: bool = False):
+        if not self._tail_checked:
+            self._trim_torn_tail()
+            self._tail_checked = True
+        try:
+            with open(self.file_path, 'a') as f:
+                f.write(lines)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError:
+            # The write may have been torn, check the tail again before the next one
+            self._tail_checked = False
+            raise
+
+    def _trim_torn_tail(self):
+        trim_torn_tail(self.file_path)
+
+    def load(self, offset: int = 0) -> Iterator[SystemState]:
+        try:
+            with open(self.file_path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        if f.read().strip():
+                            raise
+                        return  # Torn write at the end of the file
+                    yield SystemState.from_dict(data)
+        except FileNotFoundError:
+            # If the file does not exist, there is no history
+            return
+
+    def latest(self) -> Optional[SystemState]:
+        """Read backwards from the end of the file until the last complete line is found."""
+        try:
+            with open(self.file_path, 'rb') as f:
+                position = f.seek(0, os.SEEK_END)
+                data = b''
+                while True:
+                    lines = data.split(b'\n')
+                    # Unless the start of the file has been reached, the first line may be cut short
+                    complete = lines if position == 0 else lines[1:]
+                    for line in reversed(complete):
+                        if line.strip():
+                            try:
+                                return SystemState.from_dict(json.loads(line))
+                            except ValueError:
+                                pass  # Torn write at the end of the file
+                    if position == 0:
+                        return None
+                    step = min(TAIL_BLOCK_SIZE, position)
+                    position -= step
+                    f.seek(position)
+                    data = f.read(step) + data
+        except FileNotFoundError:
+            return None
+
+    def index(self) -> List[Tuple[float, int]]:
+        """
+        Every line is a full state, so load can resume from any of them. Only the timestamp at the end of
+        each line is parsed, the rest of the line is skipped.
+        """
+        entries = []
+        try:
+            with open(self.file_path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    if line.strip():
+                        timestamp = self._line_timestamp(line)
+                        if timestamp is not None:
+                            entries.append((timestamp, offset))
+                    offset += len(line)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    @staticmethod
+    def _line_timestamp(line: bytes) -> Optional[float]:
+        """The timestamp of a line, None if the line was torn by a crash."""
+        position = line.rfind(TIMESTAMP_KEY)
+        value = line[position + len(TIMESTAMP_KEY):].rstrip()
+        if position >= 0 and value.endswith(b'}'):
+            try:
+                return float(value[:-1])
+            except ValueError:
+                pass
+        # Not written by to_dict, or cut short
+        try:
+            return json.loads(line).get('timestamp')
+        except ValueError:
+            return None
+
+    def clear(self):
+        with open(self.file_path, 'w') as f:
+            f.write("")
+
+
+def trim_torn_tail(file_path: str):
+    """Cut a file of lines back to the end of its last complete line."""
+    try:
+        with open(file_path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            position = size
+            while position > 0:
+                step = min(TAIL_BLOCK_SIZE, position)
+                f.seek(position - step)
+                block = f.read(step)
+                newline = block.rfind(b'\n')
+                if newline >= 0:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            if position < size:
+                f.truncate(position)
+    except FileNotFoundError:
+        pass
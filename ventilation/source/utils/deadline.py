@@ -0,0 +1,37 @@
+import time
+from typing import Callable
+
+
+class Deadline:
+    """
+    The point in time a call has to be finished by.
+
+    One deadline is handed down to every request made on behalf of a call, so chunks and retries share
+    what is left of the budget instead of each being allowed a full timeout.
+    """
+    __slots__ = ('_expires', '_clock')
+
+    def __init__(self, budget: float, clock: Callable[[], float] = time.monotonic):
+        """
+        :param budget: Seconds from now until the deadline.
+        :param clock: Monotonic time source, replaceable for tests.
+        """
+        assert budget >= 0, "Budget must not be negative"
+        self._clock = clock
+        self._expires = clock() + budget
+
+    @property
+    def remaining(self) -> float:
+        """Seconds left until the deadline, 0 once it has passed."""
+        return max(0.0, self._expires - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self._clock() >= self._expires
+
+    def allows(self, seconds: float) -> bool:
+        """Whether something expected to take the given seconds can still finish in time."""
+        return seconds < self._expires - self._clock()
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining:.3f})"
@@ -1,37 +1,56 @@
 import re
-from utils.response import Response
-from utils.status import Status
-from utils.value import ValidatedValue, ValidationStrategy, StrictValidatedValue
+from functools import lru_cache
+from typing import Hashable, Optional
+
+from utils.value import ValidatedValue, StepValidationStrategy, StrictValidatedValue, invalid
+
+NAME_PATTERN = re.compile(r'[a-z_]+')
+# The number of distinct names sn() and ssn() each keep, the least recently used are dropped beyond it
+NAME_CACHE_SIZE = 1024
 
 
 class StandardName(ValidatedValue[str]):
+    """
+    A lowercase name. Instances are never changed after validation and hash by their value, so they can
+    be dict keys and sn() and ssn() can hand out the same instance for the same string.
+    """
     def get__strategies(self):
         return self._strategies
 
-    def __init__(self, value):
-        # Initialize the strategies for this subclass
-        self._strategies = [
+    @property
+    def _strategies(self):
+        return [
             StandardNameStrategy()
         ]
-        super().__init__(value)
 
+    def pipeline_key(self) -> Optional[Hashable]:
+        # The strategy holds no instance data, every StandardName shares one pipeline
+        return ()
+
+    def __hash__(self):
+        # Not hash(self._value): a StandardName never equals its string, so they must not collide as dict keys
+        return hash((StandardName, self._value))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._value!r})"
+
+
+class StandardNameStrategy(StepValidationStrategy):
+    success_details = "Lowercase validation successful"
 
-class StandardNameStrategy(ValidationStrategy):
-    def validate(self, value) -> Response:
-        if not re.fullmatch(r'[a-z_]+', value):
-            return Response(
-                status=Status.EXCEPTION,
-                details="Value must contain only lowercase letters 'a-z' and underscores ('_')",
-                value=None
-            )
-        return Response(status=Status.OK, details="Lowercase validation successful", value=value)
+    def apply(self, value):
+        if not NAME_PATTERN.fullmatch(value):
+            raise invalid("Value must contain only lowercase letters 'a-z' and underscores ('_')")
+        return value
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def sn(value: str) -> StandardName:
     return StandardName(value)
 
 class StrictStandardName(StandardName, StrictValidatedValue[str]):
     pass
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def ssn(value: str) -> StandardName:
-    return StrictStandardName(value)
\ No newline at end of file
+    return StrictStandardName(value)
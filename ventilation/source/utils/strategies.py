@@ -1,8 +1,9 @@
 from dataclasses import dataclass
+from typing import Any, Callable
 
 from utils.response import Response
 from utils.status import Status
-from utils.value import ValidationStrategy
+from utils.value import ValidationFailure, ValidationStrategy
 
 
 @dataclass(frozen=True)
@@ -22,3 +23,17 @@ class ExceptionCascadeStrategy(ValidationStrategy):
             )
         return self.response  # If there is an error, cascade the error response back immediately
 
+    def compile(self) -> Callable[[Any], Any]:
+        # The response is known when the pipeline is built, so the step either passes every value or fails
+        if self.response.status == Status.OK:
+            return _pass
+        response = self.response
+
+        def cascade(_):
+            raise ValidationFailure(response)
+        return cascade
+
+
+def _pass(value):
+    return value
+
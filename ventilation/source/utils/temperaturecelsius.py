@@ -1,6 +1,8 @@
 from utils.value import RangeValidatedValue, StrictValidatedValue
 
 TEMPERATURE_IN_CELSIUS = "Valid temperature in Celsius"
+MIN_CELSIUS = -20.0
+MAX_CELSIUS = 50.0
 
 class TemperatureInterface(RangeValidatedValue[float]):
     pass
@@ -12,7 +14,7 @@ class TemperatureCelsius(TemperatureInterface):
     """
     def __init__(self, value):
         # Initialize the strategies for type and range validation
-        super().__init__(value, (int, float), -20.0, 50.0, TEMPERATURE_IN_CELSIUS)
+        super().__init__(value, (int, float), MIN_CELSIUS, MAX_CELSIUS, TEMPERATURE_IN_CELSIUS)
 
 
 class StrictTemperatureCelsius(TemperatureCelsius, StrictValidatedValue):
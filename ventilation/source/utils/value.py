@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Generic, List
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, List, Optional, Tuple
 
 from utils.constants import DEFAULT_SUCCESS_MESSAGE
 from utils.response import Response, T
@@ -35,63 +35,136 @@ class Value(Generic[T]):
         return self._compare(other, lambda x, y: x <= y)
 
 
+class ValidationFailure(Exception):
+    """Raised by a compiled validation step to stop the pipeline with the failed Response."""
+
+    def __init__(self, response: Response):
+        super().__init__(response.details)
+        self.response = response
+
+
+def invalid(details: str) -> ValidationFailure:
+    """The failure for a value that did not pass, raise it from a step."""
+    return ValidationFailure(Response(status=Status.EXCEPTION, details=details, value=None))
+
+
 class ValidationStrategy(ABC):
     @abstractmethod
     def validate(self, value) -> Response:
         """Perform validation and return a Response."""
         pass
 
+    def compile(self) -> Callable[[Any], Any]:
+        """
+        This strategy as a step of a ValidationPipeline: a callable that returns the value for the next
+        strategy, or raises ValidationFailure. This default calls validate.
+        """
+        validate = self.validate
+
+        def step(value):
+            response = validate(value)
+            if response.status == Status.EXCEPTION:
+                raise ValidationFailure(response)
+            return response.value
+        return step
+
+
+class StepValidationStrategy(ValidationStrategy, ABC):
+    """
+    A strategy written as a step. apply returns the value for the next strategy or raises the failure,
+    validate wraps it in a Response, so a pipeline can call apply directly and allocate nothing while
+    the value passes.
+    """
+    success_details = DEFAULT_SUCCESS_MESSAGE
+
+    @abstractmethod
+    def apply(self, value):
+        """Return the validated, possibly converted, value or raise invalid(details)."""
+        pass
+
+    def validate(self, value) -> Response:
+        try:
+            return Response(status=Status.OK, details=self.success_details, value=self.apply(value))
+        except ValidationFailure as failure:
+            return failure.response
+
+    def compile(self) -> Callable[[Any], Any]:
+        return self.apply
+
+
+def compile_strategy(strategy) -> Callable[[Any], Any]:
+    """Compile a strategy, including objects that only provide validate."""
+    compile_step = getattr(strategy, 'compile', None)
+    if compile_step is not None:
+        return compile_step()
+    return ValidationStrategy.compile(strategy)
+
+
+class ValidationPipeline:
+    """
+    A chain of validation strategies fused into one call.
 
-class TypeValidationStrategy(ValidationStrategy):
+    Every strategy is compiled to a step once, when the pipeline is built. Running the pipeline passes the
+    value from step to step and allocates a single Response, for the failure or for the final value.
+    Pipelines can be built from other pipelines, whose steps are reused without compiling them again.
+    """
+    __slots__ = ('_steps',)
+
+    def __init__(self, strategies: Iterable):
+        steps = []
+        for strategy in strategies:
+            if isinstance(strategy, ValidationPipeline):
+                steps.extend(strategy._steps)
+            else:
+                steps.append(compile_strategy(strategy))
+        self._steps: Tuple[Callable[[Any], Any], ...] = tuple(steps)
+
+    def __len__(self) -> int:
+        return len(self._steps)
+
+    def __call__(self, value, success_details: str = DEFAULT_SUCCESS_MESSAGE) -> Response:
+        try:
+            for step in self._steps:
+                value = step(value)
+        except ValidationFailure as failure:
+            return failure.response
+        return Response(status=Status.OK, details=success_details, value=value)
+
+
+class TypeValidationStrategy(StepValidationStrategy):
     def __init__(self, valid_types):
         # If valid_types is a single type, convert it to a tuple
         if not isinstance(valid_types, (list, tuple)):
             valid_types = (valid_types,)
         self.valid_types = tuple(valid_types)  # Ensure it's always a tuple
 
-    def validate(self, value) -> Response:
+    def apply(self, value):
         if not isinstance(value, self.valid_types):
-            return Response(
-                status=Status.EXCEPTION,
-                details=f"Value must be one of {self.valid_types}, got {type(value).__name__}",
-                value=None
-            )
-        return Response(status=Status.OK, details=DEFAULT_SUCCESS_MESSAGE, value=value)
+            raise invalid(f"Value must be one of {self.valid_types}, got {type(value).__name__}")
+        return value
 
 
-class RangeValidationStrategy(ValidationStrategy):
+class RangeValidationStrategy(StepValidationStrategy):
     def __init__(self, low_value, high_value):
         self.low_value = low_value
         self.high_value = high_value
 
-    def validate(self, value) -> Response:
+    def apply(self, value):
         if value < self.low_value:
-            return Response(
-                status=Status.EXCEPTION,
-                details=f"Value must be greater than or equal to {self.low_value}, got {value}",
-                value=None
-            )
+            raise invalid(f"Value must be greater than or equal to {self.low_value}, got {value}")
         if value > self.high_value:
-            return Response(
-                status=Status.EXCEPTION,
-                details=f"Value must be less than or equal to {self.high_value}, got {value}",
-                value=None
-            )
-        return Response(status=Status.OK, details=DEFAULT_SUCCESS_MESSAGE, value=value)
+            raise invalid(f"Value must be less than or equal to {self.high_value}, got {value}")
+        return value
 
 
-class EnumValidationStrategy(ValidationStrategy):
+class EnumValidationStrategy(StepValidationStrategy):
     def __init__(self, valid_values):
         self.valid_values = valid_values
 
-    def validate(self, value) -> Response:
+    def apply(self, value):
         if value not in self.valid_values:
-            return Response(
-                status=Status.EXCEPTION,
-                details=f"Value must be one of {self.valid_values}, got {value}",
-                value=None
-            )
-        return Response(status=Status.OK, details=DEFAULT_SUCCESS_MESSAGE, value=value)
+            raise invalid(f"Value must be one of {self.valid_values}, got {value}")
+        return value
 
 
 class ValidatedValue(Value[T], ABC):
@@ -99,10 +172,18 @@ class ValidatedValue(Value[T], ABC):
     A base class that represents a value which must be validated. ValidationStrategy are required to implement
     the validate method to perform validation and return a ValidatedResult.
 
+    The strategies are run as a compiled ValidationPipeline. When pipeline_key() returns a key, the pipeline
+    is compiled once for the class and key and shared by every instance, otherwise it is compiled for each
+    instance. EnumValidatedValue and RangeValidatedValue only return a key while the strategies are their
+    own, so a subclass that adds strategies is compiled for each instance unless it opts in, with its own
+    pipeline_key or a get__pipeline that compiles only the part holding no instance data.
+
     Attributes:
         _status: The status of the validation.
         _details: Additional details regarding the validation status.
     """
+    # Pipelines compiled so far, by class and pipeline key
+    _pipelines: Dict[Tuple[type, Hashable], ValidationPipeline] = {}
 
     def __init__(self, value:T, success_details:str = DEFAULT_SUCCESS_MESSAGE):
         result = self._run_validations(value, success_details)
@@ -115,20 +196,30 @@ class ValidatedValue(Value[T], ABC):
         :value:
         :success_details: description the success details of the validation
         """
-        current_value = value  # Start with the initial value
-
-        for strategy in self.get__strategies():
-            response = strategy.validate(current_value)
-            if response.status == Status.EXCEPTION:
-                return response  # Stop if any strategy fails
-            # Update current_value with the value returned from the successful strategy
-            current_value = response.value
-        return Response(status=Status.OK, details=success_details, value=current_value)
+        return self.get__pipeline()(value, success_details)
 
     @abstractmethod
     def get__strategies(self) -> List[ValidationStrategy]:
         return []
 
+    def pipeline_key(self) -> Optional[Hashable]:
+        """What the strategies depend on besides the class, None when they depend on the instance."""
+        return None
+
+    def get__pipeline(self) -> ValidationPipeline:
+        key = self.pipeline_key()
+        if key is None:
+            return ValidationPipeline(self.get__strategies())
+        return self.compiled(key, self.get__strategies)
+
+    @classmethod
+    def compiled(cls, key: Hashable, strategies: Callable[[], Iterable]) -> ValidationPipeline:
+        """The pipeline of this class for the key, compiled from strategies() the first time it is asked for."""
+        pipeline = ValidatedValue._pipelines.get((cls, key))
+        if pipeline is None:
+            pipeline = ValidatedValue._pipelines[(cls, key)] = ValidationPipeline(strategies())
+        return pipeline
+
     @property
     def status(self) -> Status:
         """Returns the status of the validation."""
@@ -151,42 +242,87 @@ class ValidatedValue(Value[T], ABC):
 
     def __eq__(self, other):
         """Checks equality considering both validation status and value."""
+        if not isinstance(other, ValidatedValue):
+            return NotImplemented
         return self._same_status(other) and super().__eq__(other)
 
     def __lt__(self, other):
         """Checks if this value is less than another, considering validation status."""
+        if not isinstance(other, ValidatedValue):
+            return NotImplemented
         return self._same_status(other) and super().__lt__(other)
 
     def __le__(self, other):
         """Checks if this value is less than or equal to another, considering validation status."""
+        if not isinstance(other, ValidatedValue):
+            return NotImplemented
         return self._same_status(other) and super().__le__(other)
 
 
+def _hashable(value) -> Optional[Hashable]:
+    """The value as a pipeline key part, lists become tuples and sets frozensets, None if it cannot be hashed."""
+    if isinstance(value, list):
+        value = tuple(value)
+    elif isinstance(value, set):
+        value = frozenset(value)
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return value
+
+
 class EnumValidatedValue(ValidatedValue[T]):
     def get__strategies(self) -> List[ValidationStrategy]:
         return self._strategies
 
     def __init__(self, value, valid_types, valid_values, success_details:str = DEFAULT_SUCCESS_MESSAGE):
-        # Initialize the strategies for this subclass
-        self._strategies = [
-            EnumValidationStrategy(valid_values),
-            TypeValidationStrategy(valid_types)
-        ]
+        self._valid_types = valid_types
+        self._valid_values = valid_values
         super().__init__(value, success_details)
 
+    @property
+    def _strategies(self) -> List[ValidationStrategy]:
+        return [
+            EnumValidationStrategy(self._valid_values),
+            TypeValidationStrategy(self._valid_types)
+        ]
+
+    def pipeline_key(self) -> Optional[Hashable]:
+        if type(self).get__strategies is not EnumValidatedValue.get__strategies or \
+                type(self)._strategies is not EnumValidatedValue._strategies:
+            return None  # The strategies a subclass adds may hold instance data
+        valid_types, valid_values = _hashable(self._valid_types), _hashable(self._valid_values)
+        return None if valid_types is None or valid_values is None else (valid_types, valid_values)
+
 
 class RangeValidatedValue(ValidatedValue[T]):
     def get__strategies(self) -> List[ValidationStrategy]:
         return self._strategies
 
     def __init__(self, value, valid_types, low_value, high_value, success_details:str = DEFAULT_SUCCESS_MESSAGE):
-        # Initialize the strategies for this subclass
-        self._strategies = [
-            RangeValidationStrategy(low_value, high_value),
-            TypeValidationStrategy(valid_types)
-        ]
+        self._valid_types = valid_types
+        self._low_value = low_value
+        self._high_value = high_value
         super().__init__(value, success_details)
 
+    @property
+    def _strategies(self) -> List[ValidationStrategy]:
+        return [
+            RangeValidationStrategy(self._low_value, self._high_value),
+            TypeValidationStrategy(self._valid_types)
+        ]
+
+    def pipeline_key(self) -> Optional[Hashable]:
+        if type(self).get__strategies is not RangeValidatedValue.get__strategies or \
+                type(self)._strategies is not RangeValidatedValue._strategies:
+            return None  # The strategies a subclass adds may hold instance data
+        return self._range_key()
+
+    def _range_key(self) -> Optional[Hashable]:
+        """The range validation as a pipeline key part, for subclasses that compile their own pipelines."""
+        return _hashable((_hashable(self._valid_types), self._low_value, self._high_value))
+
 """
    StrictValidatedValue Notes
 
@@ -1,5 +1,5 @@
 from modbus.modbus_values import (InputRegisterSize, HoldingRegisterSize, Timeout, Retries, ReconnectDelay, ReconnectDelayMax)
-from modbus.modbus import ModbusInterface
+from modbus.modbus import ModbusInterface, ModbusWriter
 from modbus.modus_rtu_client_builder import ModbusRTUClientBuilder
 from utils.operation_response import OperationResponse
 from config.config_loader import ConfigLoader
@@ -41,16 +41,16 @@ class ModbusRTUAnalogInput8CH:
         # Assuming channels 0-7 are mapped to input registers starting from address 0x0000
         # return await self.modbus.read_input_registers(0x0000, 8)  # Read 8 registers for 8 channels
 
-    async def set_channel_mode(self, channel, mode):
+    async def set_channel_mode(self, channel, mode) -> OperationResponse:
         """
         Set the measurement mode for a specific channel.
         Modes can be 0-4 based on the documentation (0: 0-5V, 1: 1-5V, 2: 0-20mA, 3: 4-20mA, 4: scale code).
-
+        """
         if channel < 1 or channel > 8:
             raise ValueError("Channel number must be between 1 and 8")
         register_address = 0x1000 + (channel - 1)  # Each channel is mapped to 0x1000 to 0x1007
+        assert isinstance(self.modbus, ModbusWriter), "The Modbus client does not support writes"
         return await self.modbus.write_holding_register(register_address, mode)
-        """
 
     def close(self) -> OperationResponse:
         return self.modbus.disconnect()
@@ -0,0 +1,101 @@
+import unittest
+
+from blauberg.blauberg_channels import (ChannelStatus, HUMIDITY, HUMIDITY_REGISTERS, TEMPERATURE, TEMPERATURE_REGISTERS,
+                                        channel_spec, decode_channels, decode_temperatures)
+from blauberg.blauberg_schema import BLAUBERG_INPUT_REGISTERS, TEMPERATURE_FIELDS
+from blauberg.blauberg_temperature import BlaubergTemperature
+from modbus.modbus_arrays import RegisterArray
+from modbus.modbus_schema import RegisterField, RegisterType
+from utils.response import Response
+from utils.status import Status
+
+
+def read(registers) -> Response:
+    return Response(status=Status.OK, details="Read successful", value=registers)
+
+
+class TestDecodeTemperatures(unittest.TestCase):
+
+    def test_all_temperatures(self):
+        registers = [215, 100, 250, -32768, 32767, -250, 0, 0, 600]
+        decoded = decode_temperatures(read(registers))
+
+        self.assertEqual(decoded.registers, TEMPERATURE_REGISTERS)
+        self.assertEqual(list(decoded), [21.5, 10.0, 25.0, None, None, None, None])
+        self.assertEqual([decoded.status(index) for index in range(len(decoded))],
+                         [ChannelStatus.OK, ChannelStatus.OK, ChannelStatus.OK, ChannelStatus.NO_SENSOR,
+                          ChannelStatus.SHORT_CIRCUIT, ChannelStatus.TOO_LOW, ChannelStatus.TOO_HIGH])
+        self.assertFalse(decoded.all_ok)
+        self.assertEqual(decoded.by_register()[2], 25.0)
+
+    def test_register_array_sentinels_are_signed(self):
+        registers = RegisterArray.from_registers([0x8000, 0x7FFF, 0xFF9C])
+        decoded = decode_temperatures(read(registers), registers=[0, 1, 2])
+
+        self.assertEqual([decoded.status(index) for index in range(3)],
+                         [ChannelStatus.NO_SENSOR, ChannelStatus.SHORT_CIRCUIT, ChannelStatus.OK])
+        self.assertEqual(decoded[2], -10.0)
+
+    def test_unread_registers(self):
+        registers = RegisterArray.assemble(3, [(0, [250])])
+        decoded = decode_temperatures(read(registers), registers=[0, 1, 5])
+
+        self.assertEqual([decoded.status(index) for index in range(3)],
+                         [ChannelStatus.OK, ChannelStatus.NOT_READ, ChannelStatus.OUT_OF_BOUNDS])
+
+    def test_failed_read(self):
+        decoded = decode_temperatures(Response(status=Status.EXCEPTION, details="Timed out", value=None))
+
+        self.assertEqual(list(decoded), [None] * 7)
+        self.assertEqual(decoded.status(3), ChannelStatus.READ_FAILED)
+        self.assertEqual(decoded.details(3), "Timed out")
+
+    def test_matches_blauberg_temperature(self):
+        raw_values = [-32768, 32767, -201, -200, 0, 1, 215, 500, 501, None, 2.5]
+        for input_register in (read(raw_values + [0]),
+                               read(RegisterArray.from_registers([value & 0xFFFF for value in raw_values[:9]])),
+                               Response(status=Status.EXCEPTION, details="Modbus read failure", value=None)):
+            selected = list(range(12)) + [-1, 40]
+            decoded = decode_channels(input_register, selected, TEMPERATURE)
+            for index, register in enumerate(selected):
+                with self.subTest(register=register, values=input_register.value):
+                    expected = BlaubergTemperature(input_register, register)
+                    response = decoded.response(index)
+                    self.assertEqual((response.status, response.details, response.value),
+                                     (expected.status, expected.details, expected.value))
+
+
+class TestDecodeChannels(unittest.TestCase):
+
+    def test_humidity(self):
+        registers = [0] * 12
+        registers[10], registers[11] = 45, 0
+        decoded = decode_channels(read(registers), HUMIDITY_REGISTERS, HUMIDITY)
+
+        self.assertEqual(list(decoded), [45.0, None])
+        self.assertEqual(decoded.details(1), "No sensor detected")
+        self.assertEqual(decoded.response(0).details, "validation successful")
+
+
+
+class TestChannelSpec(unittest.TestCase):
+
+    def test_derived_from_schema(self):
+        field = BLAUBERG_INPUT_REGISTERS.field('curtemp_suair_in')
+        self.assertIn(field, TEMPERATURE_FIELDS)
+        self.assertEqual(TEMPERATURE.scale, field.scale)
+        self.assertTrue(TEMPERATURE.signed)
+        self.assertEqual({TEMPERATURE.no_sensor, TEMPERATURE.short_circuit}, field.sentinels)
+        self.assertEqual(TEMPERATURE.registers, frozenset(TEMPERATURE_REGISTERS))
+        self.assertEqual(HUMIDITY.no_sensor, 0)
+        self.assertIsNone(HUMIDITY.short_circuit)
+
+    def test_fields_must_agree(self):
+        fields = (RegisterField(name="a", address=0, type=RegisterType.INT16),
+                  RegisterField(name="b", address=1, type=RegisterType.UINT16))
+        with self.assertRaises(AssertionError):
+            channel_spec("mixed", fields)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
+import math
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from blauberg.blauberg_mvhr_state import BlaubergMVHRState
 from modbus.modbus import ModbusData
 from utils.status import Status
@@ -81,5 +82,34 @@ class TestBlaubergMVHRState(unittest.TestCase):
         self.assertEqual(mvhr_state.temp_supply_out.status, Status.EXCEPTION)
         self.assertEqual(mvhr_state.temp_supply_out.details,"Register selection out of bounds of input register")
 
+    def test_decodes_lazily_once(self):
+        """Test that a temperature is only decoded when it is first read, and only once."""
+        with patch('blauberg.blauberg_mvhr_state.BlaubergTemperature') as temperature:
+            mvhr_state = BlaubergMVHRState(data=self.mock_modbus_data)
+            temperature.assert_not_called()
+
+            self.assertIs(mvhr_state.temp_supply_in, mvhr_state.temp_supply_in)
+            temperature.assert_called_once_with(self.mock_modbus_data.input_register, 1)
+
+    def test_as_dict(self):
+        """Test that as_dict returns every temperature by name."""
+        mvhr_state = BlaubergMVHRState(data=self.mock_modbus_data)
+
+        self.assertEqual(mvhr_state.as_dict(), {'temp_supply_in': 25.0, 'temp_supply_out': 30.0})
+
+    def test_as_array(self):
+        """Test that as_array returns the temperatures in order with NaN for failed readings."""
+        self.mock_modbus_data.input_register = Response(
+            status=Status.OK,
+            details="Valid input register data",
+            value=[0,-32768,300]
+        )
+        mvhr_state = BlaubergMVHRState(data=self.mock_modbus_data)
+
+        values = mvhr_state.as_array()
+
+        self.assertTrue(math.isnan(values[0]))
+        self.assertEqual(values[1], 30.0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
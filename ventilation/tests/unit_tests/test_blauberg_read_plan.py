@@ -0,0 +1,37 @@
+import unittest
+
+from blauberg.blauberg_mvhr_state import BlaubergMVHRState
+from blauberg.blauberg_read_plan import blauberg_read_plan
+from blauberg.blauberg_registers import CoilRegister, InputRegisters, HoldingRegister
+from modbus.modbus_read_plan import ModbusReadPlanner
+
+
+class TestBlaubergReadPlan(unittest.TestCase):
+
+    def test_consumed_registers_plan(self):
+        # The state only decodes the two supply temperatures, which are adjacent input registers
+        plan = blauberg_read_plan(BlaubergMVHRState.CONSUMED_REGISTERS)
+        self.assertEqual(plan.input_register, ((1, 2),))
+        self.assertEqual(plan.coils, ())
+        self.assertEqual(plan.discrete_inputs, ())
+        self.assertEqual(plan.holding_register, ())
+
+    def test_registers_routed_to_their_table(self):
+        plan = blauberg_read_plan([CoilRegister.CL_POWER, HoldingRegister.HR_SETCO2,
+                                   InputRegisters.IR_CURTEMP_WATER])
+        self.assertEqual(plan.coils, ((CoilRegister.CL_POWER.value, 1),))
+        self.assertEqual(plan.holding_register, ((HoldingRegister.HR_SETCO2.value, 1),))
+        self.assertEqual(plan.input_register, ((InputRegisters.IR_CURTEMP_WATER.value, 1),))
+
+    def test_custom_planner(self):
+        plan = blauberg_read_plan([InputRegisters.IR_CURTEMP_SUAIR_IN, InputRegisters.IR_CURTEMP_WATER],
+                                  ModbusReadPlanner(gap=10))
+        self.assertEqual(plan.input_register, ((1, 8),))
+
+    def test_size_members_rejected(self):
+        with self.assertRaises(AssertionError):
+            blauberg_read_plan([InputRegisters.IR_SIZE])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from blauberg.blauberg_registers import InputRegisters
+from blauberg.blauberg_schema import BLAUBERG_INPUT_REGISTERS
+from modbus.modbus_arrays import RegisterArray
+
+
+class TestBlaubergSchema(unittest.TestCase):
+
+    def test_covers_the_input_registers(self):
+        self.assertEqual(BLAUBERG_INPUT_REGISTERS.length, InputRegisters.IR_WATER_STARTSETTEMP.value + 1)
+        self.assertEqual(BLAUBERG_INPUT_REGISTERS.field('curtemp_ext').address, InputRegisters.IR_CURTEMP_EXT.value)
+        self.assertEqual(BLAUBERG_INPUT_REGISTERS.unit('currh_int'), "%")
+
+    def test_decode(self):
+        registers = [0] * BLAUBERG_INPUT_REGISTERS.length
+        registers[InputRegisters.IR_CUR_SEL_TEMP.value] = 215
+        registers[InputRegisters.IR_CURTEMP_SUAIR_IN.value] = 0x8000  # no sensor
+        registers[InputRegisters.IR_CURTEMP_EXT.value] = 0xFFCE  # -5.0 °C
+        registers[InputRegisters.IR_CURRH_INT.value] = 48
+        registers[InputRegisters.IR_CURFILTER_TIMER.value] = 1
+        registers[InputRegisters.IR_CURFILTER_TIMER.value + 1] = 2
+
+        record = BLAUBERG_INPUT_REGISTERS.decode(RegisterArray.from_registers(registers))
+
+        self.assertEqual(record.cur_sel_temp, 21.5)
+        self.assertIsNone(record.curtemp_suair_in)
+        self.assertEqual(record.curtemp_ext, -5.0)
+        self.assertEqual(record.currh_int, 48)
+        self.assertIsNone(record.currh_ext)
+        self.assertEqual(record.curfilter_timer, 0x00010002)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
 from blauberg.blauberg_temperature import BlaubergTemperature
+from modbus.modbus_arrays import RegisterArray
 from utils.status import Status
 from utils.value import Response
 
@@ -86,6 +87,15 @@ class TestBlaubergTemperature(unittest.TestCase):
         self.assertEqual("Register selection out of bounds of input register", temp.details)
         self.assertIsNone(temp.value)
 
+    def test_register_not_read(self):
+        # A partial read leaves the registers of a failed chunk as None
+        partial_response = Response(status=Status.OK, details="Partial read", value=[None, 300])
+        temp = BlaubergTemperature(partial_response, 0)
+
+        self.assertEqual(temp.status, Status.EXCEPTION)
+        self.assertEqual("Register was not read", temp.details)
+        self.assertIsNone(temp.value)
+
     def test_chaining_of_strategies(self):
         # This tests the chaining between CustomSensorStrategy and ConversionStrategy
         valid_response = Response(status=Status.OK, details="Modbus read successful", value=[100, 400])  # Valid data for conversion
@@ -118,5 +128,22 @@ class TestBlaubergTemperature(unittest.TestCase):
         self.assertEqual(temp.value, 10.0)  # Conversion should happen successfully
         self.assertEqual(temp.details, "Valid temperature in Celsius")
 
+    def test_register_array_sentinels(self):
+        # A RegisterArray holds the registers unsigned, the sentinels must still be recognised
+        registers = RegisterArray.from_registers([0x8000, 0x7FFF, 0xFF9C])
+        response = Response(status=Status.OK, details="Read successful", value=registers)
+
+        self.assertEqual(BlaubergTemperature(response, 0).details, "No sensor detected")
+        self.assertEqual(BlaubergTemperature(response, 1).details, "Sensor short circuit detected")
+        self.assertEqual(BlaubergTemperature(response, 2).value, -10.0)
+
+    def test_unsigned_list_values_are_signed(self):
+        # pymodbus returns the registers as an unsigned list
+        response = Response(status=Status.OK, details="Read successful", value=[65486, 0x8000, 0x7FFF])
+
+        self.assertEqual(BlaubergTemperature(response, 0).value, -5.0)
+        self.assertEqual(BlaubergTemperature(response, 1).details, "No sensor detected")
+        self.assertEqual(BlaubergTemperature(response, 2).details, "Sensor short circuit detected")
+
 if __name__ == '__main__':
     unittest.main()
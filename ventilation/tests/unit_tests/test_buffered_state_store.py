@@ -0,0 +1,202 @@
+import os
+import threading
+import unittest
+from typing import List
+
+from state.buffered_state_store import BufferedStateStore, Durability
+from state.delta_state_store import DeltaStateStore
+from state.state_manager import StateManager
+from state.state_rollup import MINUTE, RollupEngine
+from state.state_store import JsonLinesStateStore, StateStore
+from state.system_state import SystemState
+
+
+class RecordingStateStore(StateStore):
+    def __init__(self):
+        self.batches = []
+        self.syncs = []
+        self.closed = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def append(self, state: SystemState):  # pragma: no cover
+        self.append_batch([state])
+
+    def append_batch(self, states: List[SystemState], sync: bool = False):
+        self.release.wait()
+        if states:
+            self.batches.append([state.timestamp for state in states])
+        self.syncs.append(sync)
+
+    def load(self, offset: int = 0):
+        return iter([SystemState(timestamp=timestamp) for batch in self.batches for timestamp in batch])
+
+    def index(self):
+        return []
+
+    def clear(self):
+        self.batches = []
+
+    def close(self):
+        self.closed = True
+
+
+def make_state(timestamp: float) -> SystemState:
+    return SystemState(sensor_data={'temp1': timestamp}, timestamp=timestamp)
+
+
+class TestBufferedStateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.inner = RecordingStateStore()
+
+    def test_batches_by_size(self):
+        store = BufferedStateStore(self.inner, batch_size=3, flush_interval=60, durability=Durability.NONE)
+        for timestamp in range(7):
+            store.append(make_state(float(timestamp)))
+        store.flush()
+
+        self.assertEqual(self.inner.batches, [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0], [6.0]])
+        self.assertEqual(store.metrics.written, 7)
+        self.assertEqual(store.metrics.batches, 3)
+        store.close()
+
+    def test_batches_by_interval(self):
+        store = BufferedStateStore(self.inner, batch_size=100, flush_interval=0.05, durability=Durability.NONE)
+        store.append(make_state(1.0))
+        store.append(make_state(2.0))
+
+        for _ in range(100):
+            if self.inner.batches:
+                break
+            threading.Event().wait(0.01)
+
+        self.assertEqual(self.inner.batches, [[1.0, 2.0]])
+        store.close()
+
+    def test_durability_every_write(self):
+        store = BufferedStateStore(self.inner, batch_size=1, durability=Durability.EVERY_WRITE)
+        store.append(make_state(1.0))
+        store.append(make_state(2.0))
+        store.flush()
+
+        self.assertTrue(all(self.inner.syncs))
+        self.assertGreaterEqual(store.metrics.fsyncs, 2)
+        store.close()
+
+    def test_durability_periodic_syncs_when_no_batch_follows(self):
+        store = BufferedStateStore(self.inner, batch_size=1, durability=Durability.PERIODIC, fsync_interval=0.05)
+        store.append(make_state(1.0))
+
+        for _ in range(100):
+            if store.metrics.fsyncs:
+                break
+            threading.Event().wait(0.01)
+
+        self.assertEqual(self.inner.syncs, [False, True])
+        self.assertEqual(store.metrics.batches, 1)
+        store.close()
+
+    def test_durability_none(self):
+        store = BufferedStateStore(self.inner, batch_size=1, durability=Durability.NONE)
+        store.append(make_state(1.0))
+        store.flush()
+
+        self.assertEqual(self.inner.syncs, [False])
+        store.close()
+
+    def test_full_queue_drops_states(self):
+        self.inner.release.clear()  # Stall the writer thread
+        store = BufferedStateStore(self.inner, batch_size=1, max_pending=2, durability=Durability.NONE)
+
+        store.append(make_state(0.0))
+        for _ in range(100):
+            if store.metrics.pending == 0:
+                break  # The writer is stalled writing the first state
+            threading.Event().wait(0.01)
+        for timestamp in range(1, 5):
+            store.append(make_state(float(timestamp)))  # Returns at once although the queue is full
+
+        self.assertEqual(store.metrics.dropped, 2)
+        self.inner.release.set()
+        store.flush()
+
+        metrics = store.metrics
+        self.assertEqual(metrics.max_pending, 2)
+        self.assertEqual(metrics.written, 3)
+        self.assertEqual(metrics.pending, 0)
+        self.assertEqual(self.inner.batches, [[0.0], [1.0], [2.0]])
+        store.close()
+
+    def test_reads_see_queued_states(self):
+        store = BufferedStateStore(self.inner, batch_size=100, flush_interval=60)
+        store.append(make_state(1.0))
+        self.assertEqual([state.timestamp for state in store.load()], [1.0])
+        store.close()
+
+    def test_close_flushes_and_closes_inner_store(self):
+        store = BufferedStateStore(self.inner, batch_size=100, flush_interval=60)
+        store.append(make_state(1.0))
+        store.close()
+
+        self.assertEqual(self.inner.batches, [[1.0]])
+        self.assertTrue(self.inner.closed)
+        with self.assertRaises(AssertionError):
+            store.append(make_state(2.0))
+
+    def test_write_errors_counted(self):
+        def fail(states, sync=False):
+            raise IOError("disk full")
+        self.inner.append_batch = fail
+        store = BufferedStateStore(self.inner, batch_size=1, durability=Durability.NONE)
+        store.append(make_state(1.0))
+        store.flush()
+
+        self.assertEqual(store.metrics.errors, 1)
+        self.assertEqual(store.metrics.written, 0)
+        store.close()
+
+    def test_submit_runs_on_writer_thread_after_queued_states(self):
+        store = BufferedStateStore(self.inner, batch_size=100, flush_interval=60)
+        store.append(make_state(1.0))
+        future = store.submit(lambda: (threading.current_thread().name, list(self.inner.batches)))
+
+        self.assertEqual(future.result(), ("state-writer", [[1.0]]))
+        store.close()
+
+    def test_state_manager_with_buffered_delta_store(self):
+        file_path = 'test_buffered_state_history.bin'
+        try:
+            manager = StateManager(file_path, store=BufferedStateStore(DeltaStateStore(file_path)))
+            manager.update_state(sensor_data={'temp1': 25.0}, timestamp=1.0)
+            manager.update_state(sensor_data={'temp2': 27.0}, timestamp=2.0)
+            manager.close()
+
+            history = list(DeltaStateStore(file_path).load())
+            self.assertEqual([state.timestamp for state in history], [1.0, 2.0])
+            self.assertEqual(history[1].get_sensor_value('temp1'), 25.0)
+        finally:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+
+    def test_state_manager_writes_rollups_on_writer_thread(self):
+        file_path = 'test_buffered_state_history.jsonl'
+        rollup_path = 'test_buffered_state_rollup.jsonl'
+        try:
+            store = BufferedStateStore(JsonLinesStateStore(file_path))
+            manager = StateManager(file_path, store=store, rollups=RollupEngine(rollup_path, writer=store.submit))
+            manager.update_state(sensor_data={'temp1': 20.0}, timestamp=0.0)
+            manager.update_state(sensor_data={'temp1': 30.0}, timestamp=60.0)
+            manager.close()
+
+            rollups = RollupEngine(rollup_path).query('temp1', MINUTE)
+            self.assertEqual([rollup.start for rollup in rollups], [0.0, 60.0])
+        finally:
+            for path in (file_path, rollup_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from utils.deadline import Deadline
+
+
+class TestDeadline(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.deadline = Deadline(2.0, clock=lambda: self.now)
+
+    def test_remaining(self):
+        self.assertEqual(self.deadline.remaining, 2.0)
+        self.now += 0.5
+        self.assertEqual(self.deadline.remaining, 1.5)
+        self.now += 5
+        self.assertEqual(self.deadline.remaining, 0.0)
+
+    def test_expired(self):
+        self.assertFalse(self.deadline.expired)
+        self.now += 2.0
+        self.assertTrue(self.deadline.expired)
+
+    def test_allows(self):
+        self.assertTrue(self.deadline.allows(1.9))
+        self.assertFalse(self.deadline.allows(2.0))
+
+    def test_negative_budget(self):
+        with self.assertRaises(AssertionError):
+            Deadline(-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from state.delta_state_store import DeltaStateStore, HEADER, FOOTER
+from state.state_manager import StateManager
+from state.system_state import SystemState
+
+
+class TestDeltaStateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = 'test_delta_state_history.bin'
+        self.store = DeltaStateStore(self.file_path, keyframe_interval=3)
+
+    def tearDown(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def append(self, timestamp, **sensor_data):
+        self.store.append(SystemState(sensor_data=sensor_data, operational_states={'mvhr_powered_on': True},
+                                      timestamp=timestamp))
+
+    def test_load_rebuilds_full_states(self):
+        self.append(1.0, temp1=25.0, temp2=20.0)
+        self.append(2.0, temp1=25.5, temp2=20.0)
+        self.append(3.0, temp1=25.5, temp2=21.0)
+
+        history = list(DeltaStateStore(self.file_path).load())
+
+        self.assertEqual(len(history), 3)
+        self.assertEqual([state.timestamp for state in history], [1.0, 2.0, 3.0])
+        self.assertEqual(dict(history[1].sensor_data), {'temp1': 25.5, 'temp2': 20.0})
+        self.assertEqual(dict(history[2].sensor_data), {'temp1': 25.5, 'temp2': 21.0})
+        self.assertTrue(history[2].get_operational_state('mvhr_powered_on'))
+
+    def test_deltas_only_hold_changed_keys(self):
+        self.append(1.0, temp1=25.0, temp2=20.0)
+        size_after_keyframe = os.path.getsize(self.file_path)
+        self.append(2.0, temp1=25.0, temp2=20.0)
+        unchanged_record = os.path.getsize(self.file_path) - size_after_keyframe
+
+        # Nothing changed, so the delta has an empty payload: {}
+        self.assertEqual(unchanged_record, HEADER.size + len(b'{}') + FOOTER.size)
+
+    def test_keyframe_interval(self):
+        for timestamp in range(7):
+            self.append(float(timestamp), temp1=float(timestamp))
+
+        with open(self.file_path, 'rb') as f:
+            kinds = [kind for kind, _, _ in DeltaStateStore.records(f)]
+
+        self.assertEqual(kinds, [0, 1, 1, 0, 1, 1, 0])
+
+    def test_reopened_store_starts_with_keyframe(self):
+        self.append(1.0, temp1=25.0)
+        reopened = DeltaStateStore(self.file_path)
+        reopened.append(SystemState(sensor_data={'temp1': 26.0}, timestamp=2.0))
+
+        with open(self.file_path, 'rb') as f:
+            kinds = [kind for kind, _, _ in DeltaStateStore.records(f)]
+
+        self.assertEqual(kinds, [0, 0])
+
+    def test_torn_record_ignored(self):
+        self.append(1.0, temp1=25.0)
+        self.append(2.0, temp1=26.0)
+        with open(self.file_path, 'ab') as f:
+            f.write(HEADER.pack(1, 3.0, 100) + b'{"s":')
+
+        history = list(DeltaStateStore(self.file_path).load())
+        self.assertEqual([state.get_sensor_value('temp1') for state in history], [25.0, 26.0])
+
+    def test_torn_record_removed_before_next_write(self):
+        self.append(1.0, temp1=25.0)
+        with open(self.file_path, 'ab') as f:
+            f.write(HEADER.pack(1, 2.0, 100) + b'{"s":')
+
+        store = DeltaStateStore(self.file_path)
+        store.append(SystemState(sensor_data={'temp1': 27.0}, timestamp=3.0))
+
+        history = list(DeltaStateStore(self.file_path).load())
+        self.assertEqual([state.get_sensor_value('temp1') for state in history], [25.0, 27.0])
+
+    def test_failed_write_is_followed_by_keyframe(self):
+        self.append(1.0, a=1, b=2)
+        with patch('state.delta_state_store.open', side_effect=OSError("disk full"), create=True):
+            with self.assertRaises(OSError):
+                self.append(2.0, a=2, b=2)
+        self.append(3.0, a=2, b=3)
+
+        history = list(DeltaStateStore(self.file_path).load())
+        self.assertEqual([dict(state.sensor_data) for state in history], [{'a': 1, 'b': 2}, {'a': 2, 'b': 3}])
+
+    def test_latest_replays_from_last_keyframe(self):
+        for timestamp in range(5):
+            self.append(float(timestamp), temp1=float(timestamp), fixed=1)
+
+        latest = DeltaStateStore(self.file_path).latest()
+
+        self.assertEqual(latest.timestamp, 4.0)
+        self.assertEqual(dict(latest.sensor_data), {'temp1': 4.0, 'fixed': 1})
+
+    def test_latest_with_torn_tail(self):
+        for timestamp in range(5):
+            self.append(float(timestamp), temp1=float(timestamp))
+        with open(self.file_path, 'ab') as f:
+            f.write(HEADER.pack(1, 5.0, 100) + b'{"s":')
+
+        self.assertEqual(DeltaStateStore(self.file_path).latest().timestamp, 4.0)
+
+    def test_latest_missing_file(self):
+        self.assertIsNone(self.store.latest())
+
+    def test_index_lists_keyframes(self):
+        for timestamp in range(7):
+            self.append(float(timestamp), temp1=float(timestamp))
+
+        index = self.store.index()
+
+        self.assertEqual([timestamp for timestamp, _ in index], [0.0, 3.0, 6.0])
+        self.assertEqual([state.timestamp for state in self.store.load(index[1][1])], [3.0, 4.0, 5.0, 6.0])
+
+    def test_missing_file_is_empty(self):
+        self.assertEqual(list(self.store.load()), [])
+
+    def test_clear(self):
+        self.append(1.0, temp1=25.0)
+        self.store.clear()
+        self.assertEqual(list(self.store.load()), [])
+        self.append(2.0, temp1=26.0)
+        self.assertEqual(len(list(self.store.load())), 1)
+
+    def test_state_manager_with_delta_store(self):
+        manager = StateManager(self.file_path, store=DeltaStateStore(self.file_path))
+        manager.update_state(sensor_data={'temp1': 25.0}, timestamp=1.0)
+        manager.update_state(sensor_data={'temp2': 27.0}, timestamp=2.0)
+
+        history = StateManager(self.file_path, store=DeltaStateStore(self.file_path)).get_state_history()
+
+        self.assertEqual(len(history), 2)
+        self.assertIsNone(history[0].get_sensor_value('temp2'))
+        self.assertEqual(history[1].get_sensor_value('temp1'), 25.0)
+        self.assertEqual(history[1].get_sensor_value('temp2'), 27.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from devices.device_factory import DeviceResponse, DeviceStatus
+from modbus.modbus import ModbusData, ModbusInterface
+from modbus.modbus_read_plan import ModbusReadPlan
+from polling.fleet_poller import FleetDevice, FleetPoller
+from utils.response import Response
+from utils.standard_name import StandardName
+from utils.status import Status
+
+
+def data(status: Status = Status.OK) -> ModbusData:
+    response = Response(status=status, details="", value=[1])
+    return ModbusData(input_register=response, holding_register=response, discrete_inputs=response, coils=response)
+
+
+class FakeModbus(ModbusInterface):
+    """Records how many reads were in flight at once across every fake device sharing the same tracker."""
+
+    def __init__(self, tracker: dict, name: str, delay: float = 0.01, error: Exception = None,
+                 bus: str = None):
+        self._tracker = tracker
+        self._name = name
+        self._delay = delay
+        self._error = error
+        self._bus = bus
+        self.plans = []
+
+    @property
+    def shared_bus(self):
+        return self._bus
+
+    async def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    async def read(self, plan: ModbusReadPlan = None) -> ModbusData:
+        self.plans.append(plan)
+        self._tracker['in_flight'] += 1
+        self._tracker['max_in_flight'] = max(self._tracker['max_in_flight'], self._tracker['in_flight'])
+        self._tracker['order'].append(self._name)
+        try:
+            await asyncio.sleep(self._delay)
+            if self._error is not None:
+                raise self._error
+            return data()
+        finally:
+            self._tracker['in_flight'] -= 1
+
+
+class TestFleetPoller(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tracker = {'in_flight': 0, 'max_in_flight': 0, 'order': []}
+
+    def device(self, name: str, bus: str = None, **kwargs) -> FleetDevice:
+        return FleetDevice(name=name, modbus=FakeModbus(self.tracker, name, **kwargs), bus=bus)
+
+    async def test_tcp_devices_are_read_concurrently_within_the_limit(self):
+        poller = FleetPoller([self.device(f"mvhr{index}") for index in range(10)], max_concurrency=4)
+
+        cycle = await poller.poll_cycle()
+
+        self.assertEqual(len(cycle.readings), 10)
+        self.assertEqual(cycle.failed, [])
+        self.assertEqual(self.tracker['max_in_flight'], 4)
+        # Ten reads of 10ms, four at a time, take three rounds rather than ten
+        self.assertLess(cycle.duration, 0.08)
+
+    async def test_bus_devices_are_read_one_at_a_time(self):
+        devices = [self.device(f"rtu{index}", bus="/dev/ttyUSB0") for index in range(3)]
+        poller = FleetPoller(devices, max_concurrency=8)
+
+        await poller.poll_cycle()
+
+        self.assertEqual(self.tracker['max_in_flight'], 1)
+
+    async def test_buses_run_in_parallel(self):
+        devices = [self.device("a0", bus="/dev/ttyUSB0"), self.device("a1", bus="/dev/ttyUSB0"),
+                   self.device("b0", bus="/dev/ttyUSB1"), self.device("b1", bus="/dev/ttyUSB1")]
+        poller = FleetPoller(devices)
+
+        await poller.poll_cycle()
+
+        self.assertEqual(self.tracker['max_in_flight'], 2)
+
+    async def test_bus_order_rotates_each_cycle(self):
+        devices = [self.device(f"rtu{index}", bus="/dev/ttyUSB0") for index in range(3)]
+        poller = FleetPoller(devices)
+
+        for _ in range(3):
+            await poller.poll_cycle()
+
+        self.assertEqual(self.tracker['order'], ["rtu0", "rtu1", "rtu2",
+                                                 "rtu1", "rtu2", "rtu0",
+                                                 "rtu2", "rtu0", "rtu1"])
+
+    async def test_failed_device_does_not_stop_the_cycle(self):
+        poller = FleetPoller([self.device("good"), self.device("bad", error=ConnectionError("lost"))])
+
+        cycle = await poller.poll_cycle()
+
+        self.assertEqual(cycle.failed, ["bad"])
+        self.assertEqual(cycle["bad"].error, "ConnectionError: lost")
+        self.assertTrue(cycle["good"].ok)
+
+    async def test_timing_statistics(self):
+        devices = [self.device("slow", bus="bus", delay=0.02), self.device("fast", bus="bus", delay=0.0)]
+        poller = FleetPoller(devices)
+
+        cycle = await poller.poll_cycle()
+
+        self.assertGreaterEqual(cycle.max_latency, 0.02)
+        self.assertGreaterEqual(cycle.max_wait, 0.02)
+        self.assertGreater(cycle.mean_latency, 0)
+        self.assertGreaterEqual(cycle.duration, cycle.max_latency)
+
+    async def test_plan_is_passed_to_read(self):
+        plan = ModbusReadPlan(input_register=((1, 2),))
+        modbus = FakeModbus(self.tracker, "mvhr")
+        poller = FleetPoller([FleetDevice(name="mvhr", modbus=modbus, plan=plan)])
+
+        await poller.poll_cycle()
+
+        self.assertEqual(modbus.plans, [plan])
+
+    async def test_run_until_stopped(self):
+        poller = FleetPoller([self.device("mvhr")])
+        cycles = []
+
+        def on_cycle(cycle):
+            cycles.append(cycle)
+            if len(cycles) == 2:
+                poller.stop()
+
+        await asyncio.wait_for(poller.run(on_cycle, period=0.01), timeout=1)
+        self.assertEqual(len(cycles), 2)
+
+    async def test_from_factory(self):
+        device = MagicMock()
+        device.modbus = FakeModbus(self.tracker, "rtu", bus="/dev/ttyUSB0")
+        response = DeviceResponse(status=DeviceStatus.VALID, details="", device=device)
+
+        with patch('devices.device_factory.DeviceFactory.get_device', return_value=response):
+            poller = FleetPoller.from_factory([StandardName("analog_input")])
+
+        cycle = await poller.poll_cycle()
+        self.assertEqual([reading.name for reading in cycle.readings], ["analog_input"])
+
+    def test_invalid_devices(self):
+        with self.assertRaises(AssertionError):
+            FleetPoller([])
+        with self.assertRaises(AssertionError):
+            FleetPoller([self.device("same"), self.device("same")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,17 @@
 import unittest
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 from pymodbus.client import ModbusBaseClient
+from pymodbus.exceptions import ModbusIOException
 from modbus.modbus_client_builder import ModbusClientBuilder
+from modbus.modbus_metrics import ModbusInstrumentation
+from modbus.modbus_read_plan import ModbusReadPlan
+from modbus.modbus_reader import ChunkRetryPolicy
 from py_modbus.modbus_connection_manager import ModbusConnectionManager
 from py_modbus.modus_py_client import ModbusPYClient
+from utils.deadline import Deadline
 from utils.operation_response import OperationStatus, OperationResponse
+from utils.response import Response
+from utils.status import Status
 
 class TestModbusClient(unittest.IsolatedAsyncioTestCase):
 
@@ -112,5 +119,205 @@ class TestModbusClient(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.holding_register, mock_holding_result)
 
 
+    async def test_read_plan(self):
+        # With a plan only the planned ranges of each table are read
+        plan = ModbusReadPlan(input_register=((1, 2),))
+        for reader in (self.modbus_client._coils_reader, self.modbus_client._discrete_inputs,
+                       self.modbus_client._input_registers, self.modbus_client._holding_registers):
+            reader.read = AsyncMock()
+            reader.read_ranges = AsyncMock()
+
+        result = await self.modbus_client.read(plan)
+
+        self.modbus_client._input_registers.read_ranges.assert_called_once_with(((1, 2),))
+        self.modbus_client._coils_reader.read_ranges.assert_called_once_with(())
+        self.modbus_client._input_registers.read.assert_not_called()
+        self.assertEqual(result.input_register, self.modbus_client._input_registers.read_ranges.return_value)
+    def mock_table_reads(self):
+        """Every table reads OK with a response naming the table and the read number."""
+        self.reads = []
+        readers = {'coils': self.modbus_client._coils_reader,
+                   'discrete_inputs': self.modbus_client._discrete_inputs,
+                   'input_register': self.modbus_client._input_registers,
+                   'holding_register': self.modbus_client._holding_registers}
+        for table, reader in readers.items():
+            async def read_ranges(ranges, deadline=None, table=table):
+                self.reads.append(table)
+                return Response(status=Status.OK, details="Read successful", value=f"{table}{len(self.reads)}")
+            reader.read_ranges = AsyncMock(side_effect=read_ranges)
+            reader.estimated_duration = MagicMock(return_value=0.1)
+        return readers
+
+    async def test_read_with_deadline_reads_low_priority_tables_last(self):
+        self.mock_table_reads()
+
+        result = await self.modbus_client.read(deadline=Deadline(1))
+
+        self.assertEqual(self.reads, ['coils', 'discrete_inputs', 'input_register', 'holding_register'])
+        self.assertEqual(result.stale, frozenset())
+        self.modbus_client._input_registers.read_ranges.assert_called_once_with(
+            ((0, self.modbus_client.input_register_size.value),), deadline=ANY)
+
+    async def test_low_priority_table_is_skipped_when_the_budget_is_short(self):
+        readers = self.mock_table_reads()
+        first = await self.modbus_client.read(deadline=Deadline(1))
+        readers['holding_register'].estimated_duration.return_value = 5
+
+        result = await self.modbus_client.read(deadline=Deadline(1))
+
+        self.assertEqual(readers['holding_register'].read_ranges.call_count, 1)
+        self.assertEqual(result.holding_register, first.holding_register)
+        self.assertEqual(result.stale, frozenset({'holding_register'}))
+        self.assertNotEqual(result.input_register, first.input_register)
+
+    async def test_low_priority_table_without_earlier_response_is_read(self):
+        readers = self.mock_table_reads()
+        readers['holding_register'].estimated_duration.return_value = 5
+
+        result = await self.modbus_client.read(deadline=Deadline(1))
+
+        self.assertEqual(readers['holding_register'].read_ranges.call_count, 1)
+        self.assertEqual(result.stale, frozenset())
+
+    async def test_table_cut_short_by_the_deadline_is_stale(self):
+        readers = self.mock_table_reads()
+        plan = ModbusReadPlan(input_register=((1, 2),))
+        first = await self.modbus_client.read(plan, deadline=Deadline(1))
+
+        now = [0.0]
+        expired = Response(status=Status.EXCEPTION, details="Deadline exceeded", value=None)
+
+        async def overrun(ranges, deadline=None):
+            now[0] += 2
+            return expired
+
+        readers['input_register'].read_ranges = AsyncMock(side_effect=overrun)
+        result = await self.modbus_client.read(plan, deadline=Deadline(1, clock=lambda: now[0]))
+
+        self.assertEqual(result.input_register, first.input_register)
+        self.assertIn('input_register', result.stale)
+
+    async def test_partial_read_is_stale_and_not_kept(self):
+        readers = self.mock_table_reads()
+        first = await self.modbus_client.read(deadline=Deadline(1))
+        partial = Response(status=Status.OK, details="Partial read, chunks 20+10 failed: Deadline exceeded",
+                           value=[1, None])
+        readers['input_register'].read_ranges = AsyncMock(return_value=partial)
+
+        result = await self.modbus_client.read(deadline=Deadline(1))
+        self.assertEqual(result.input_register, first.input_register)
+        self.assertEqual(result.stale, frozenset({'input_register'}))
+
+        self.modbus_client._last_good.clear()
+        result = await self.modbus_client.read(deadline=Deadline(1))
+        self.assertEqual(result.input_register, partial)
+        self.assertEqual(result.stale, frozenset({'input_register'}))
+        self.assertNotIn(('input_register', None), self.modbus_client._last_good)
+
+    async def test_failure_within_the_deadline_is_not_hidden(self):
+        readers = self.mock_table_reads()
+        await self.modbus_client.read(deadline=Deadline(1))
+        failed = Response(status=Status.EXCEPTION, details="Illegal address", value=None)
+        readers['coils'].read_ranges = AsyncMock(return_value=failed)
+
+        result = await self.modbus_client.read(deadline=Deadline(1))
+
+        self.assertEqual(result.coils, failed)
+        self.assertEqual(result.stale, frozenset())
+
+    async def test_write_registers_is_split_into_requests(self):
+        self.mock_client.write_registers = AsyncMock(return_value=MagicMock(isError=MagicMock(return_value=False)))
+
+        response = await self.modbus_client.write_registers(10, range(200))
+
+        self.assertEqual(response.status, OperationStatus.OK)
+        self.assertEqual([call.args for call in self.mock_client.write_registers.call_args_list],
+                         [(10, list(range(123))), (133, list(range(123, 200)))])
+
+    async def test_write_stops_at_the_first_failure(self):
+        self.mock_client.write_coils = AsyncMock(return_value=MagicMock(isError=MagicMock(return_value=True)))
+
+        response = await self.modbus_client.write_coils(0, [True] * 2000)
+
+        self.assertEqual(response.status, OperationStatus.FAILED)
+        self.mock_client.write_coils.assert_awaited_once()
+
+    async def test_write_single_values(self):
+        self.mock_client.write_register = AsyncMock(return_value=MagicMock(isError=MagicMock(return_value=False)))
+        self.mock_client.write_coil = AsyncMock(return_value=MagicMock(isError=MagicMock(return_value=False)))
+
+        self.assertEqual((await self.modbus_client.write_holding_register(3, 42)).status, OperationStatus.OK)
+        self.assertEqual((await self.modbus_client.write_coil(4, True)).status, OperationStatus.OK)
+
+        self.mock_client.write_register.assert_awaited_once_with(3, 42, slave=ANY)
+        self.mock_client.write_coil.assert_awaited_once_with(4, True, slave=ANY)
+
+    async def test_write_queue(self):
+        self.mock_client.write_registers = AsyncMock(return_value=MagicMock(isError=MagicMock(return_value=False)))
+        self.modbus_client.writes.set_register(1, 5)
+        self.modbus_client.writes.set_register(2, 6)
+
+        response = await self.modbus_client.writes.flush()
+
+        self.assertEqual(response.status, OperationStatus.OK)
+        self.mock_client.write_registers.assert_awaited_once_with(1, [5, 6], slave=ANY)
+
+    async def test_requests_are_recorded_when_instrumented(self):
+        instrumentation = ModbusInstrumentation(pdu_history=10)
+        self.mock_client.read_input_registers = AsyncMock(
+            return_value=MagicMock(isError=MagicMock(return_value=False), registers=[1, 2]))
+        self.mock_client.write_registers = AsyncMock(side_effect=ModbusIOException("No response received"))
+
+        with patch.object(ModbusPYClient, 'instrumentation', instrumentation):
+            await self.modbus_client._input_registers.read(0, 2)
+            await self.modbus_client.write_registers(8, [1, 2, 3])
+
+        device = self.modbus_client.device
+        read = instrumentation.stats(device, 4)
+        self.assertEqual((read.requests, read.errors, read.timeouts, read.bytes_received), (1, 0, 0, 6))
+        write = instrumentation.stats(device, 16)
+        self.assertEqual((write.requests, write.timeouts, write.bytes_sent), (1, 1, 12))
+        self.assertEqual([(record.function_code, record.address, record.count) for record in instrumentation.recent()],
+                         [(4, 0, 2), (16, 8, 3)])
+
+    async def test_latency_excludes_waiting_for_the_transport(self):
+        ticks = iter(range(100))
+        instrumentation = ModbusInstrumentation(clock=lambda: next(ticks))
+        self.mock_client.read_coils = AsyncMock(
+            return_value=MagicMock(isError=MagicMock(return_value=False), bits=[True]))
+
+        async def queued(request):
+            instrumentation.clock()  # Time passes while the request waits for the line
+            instrumentation.clock()
+            return await request(self.mock_client)
+
+        with patch.object(ModbusPYClient, 'instrumentation', instrumentation), \
+                patch.object(self.modbus_client, '_send', queued):
+            await self.modbus_client._coils_reader.read(0, 1)
+
+        stats = instrumentation.stats(self.modbus_client.device, 1)
+        self.assertEqual(stats.latency.max, 1)
+
+    async def test_retried_chunks_are_counted(self):
+        instrumentation = ModbusInstrumentation()
+        with patch.object(ModbusPYClient, 'instrumentation', instrumentation), \
+                patch.object(ModbusPYClient, 'chunk_retry_policy', ChunkRetryPolicy(retries=2, backoff=0)):
+            client = ModbusPYClient(client=self.mock_client, builder=self.mock_builder)
+            self.mock_client.read_coils = AsyncMock(side_effect=[
+                ModbusIOException("No response received"),
+                MagicMock(isError=MagicMock(return_value=False), bits=[True])])
+
+            await client._coils_reader.read(0, 1)
+
+        stats = instrumentation.stats(client.device, 1)
+        self.assertEqual((stats.requests, stats.timeouts, stats.retries), (2, 1, 1))
+
+    async def test_requests_are_not_recorded_by_default(self):
+        self.mock_client.read_coils = AsyncMock(
+            return_value=MagicMock(isError=MagicMock(return_value=False), bits=[True]))
+        await self.modbus_client._coils_reader.read(0, 1)
+        self.assertIsNone(self.modbus_client.instrumentation)
+
+
 if __name__ == '__main__':
     unittest.main()
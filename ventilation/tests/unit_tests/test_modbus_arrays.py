@@ -0,0 +1,76 @@
+import struct
+import unittest
+from array import array
+
+from modbus.modbus_arrays import BitArray, RegisterArray, WordOrder
+
+
+class TestBitArray(unittest.TestCase):
+
+    def test_from_bits(self):
+        bits = BitArray.from_bits([True, False, True, True, False, False, False, False, True])
+        self.assertEqual(len(bits), 9)
+        self.assertEqual(bytes(bits.packed), bytes([0b00001101, 0b00000001]))
+        self.assertEqual(bits, [True, False, True, True, False, False, False, False, True])
+
+    def test_from_payload_is_lsb_first(self):
+        bits = BitArray.from_payload(bytes([0b00000110]), 3)
+        self.assertEqual(list(bits), [False, True, True])
+
+    def test_assemble_marks_unread(self):
+        bits = BitArray.assemble(5, [(1, [True, False]), (4, [True])])
+        self.assertEqual(list(bits), [None, True, False, None, True])
+        self.assertFalse(bits.is_valid(0))
+        self.assertTrue(bits.is_valid(2))
+
+    def test_indexing(self):
+        bits = BitArray.from_bits([True, False, True])
+        self.assertTrue(bits[-1])
+        self.assertEqual(bits[1:], [False, True])
+        with self.assertRaises(IndexError):
+            _ = bits[3]
+
+
+class TestRegisterArray(unittest.TestCase):
+
+    def test_from_registers(self):
+        registers = RegisterArray.from_registers([1, 2, 65535])
+        self.assertEqual(registers, [1, 2, 65535])
+        self.assertEqual(registers[1:], [2, 65535])
+        self.assertEqual(registers.words.tolist(), [1, 2, 65535])
+
+    def test_from_payload_is_big_endian(self):
+        registers = RegisterArray.from_payload(bytes([0x01, 0x02, 0xff, 0xfe]))
+        self.assertEqual(list(registers), [0x0102, 0xfffe])
+
+    def test_int16(self):
+        registers = RegisterArray.from_registers([0xffff, 0x8000, 250])
+        self.assertEqual(registers.int16(0), -1)
+        self.assertEqual(registers.int16(1), -32768)
+        self.assertEqual(registers.int16(2), 250)
+        self.assertEqual(registers.int16_view().tolist(), [-1, -32768, 250])
+
+    def test_32_bit_values(self):
+        high, low = struct.unpack('>HH', struct.pack('>f', 21.5))
+        registers = RegisterArray.from_registers([high, low, 0x0001, 0x0002])
+
+        self.assertEqual(registers.float32(0), 21.5)
+        self.assertEqual(registers.float32(0, WordOrder.LITTLE), struct.unpack('>f', struct.pack('>HH', low, high))[0])
+        self.assertEqual(registers.uint32(2), 0x00010002)
+        self.assertEqual(registers.uint32(2, WordOrder.LITTLE), 0x00020001)
+        self.assertEqual(RegisterArray.from_registers([0xffff, 0xfffe]).int32(0), -2)
+
+    def test_assemble_marks_unread(self):
+        registers = RegisterArray.assemble(6, [(1, [10, 20]), (5, array('H', [50]))])
+        self.assertEqual(registers, [None, 10, 20, None, None, 50])
+        self.assertIsNone(registers.uint32(2))
+        self.assertEqual(registers.uint32(1), (10 << 16) | 20)
+
+    def test_words_are_read_only(self):
+        registers = RegisterArray.from_registers([1])
+        with self.assertRaises(TypeError):
+            registers.words[0] = 2
+
+
+if __name__ == '__main__':
+    unittest.main()
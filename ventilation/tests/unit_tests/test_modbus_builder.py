@@ -3,7 +3,7 @@ from unittest.mock import Mock
 
 from modbus.modbus_client_builder import ModbusClientBuilder
 from modbus.modbus_builder_client import ModbusBuilderClient
-from modbus.modbus_values import CoilSize, DiscreteInputSize, InputRegisterSize, HoldingRegisterSize, Timeout, Retries, ReconnectDelay, ReconnectDelayMax
+from modbus.modbus_values import CoilSize, DiscreteInputSize, InputRegisterSize, HoldingRegisterSize, Timeout, Retries, ReconnectDelay, ReconnectDelayMax, UnitId
 from utils.status import Status
 
 class TestModbusBuilder(unittest.TestCase):
@@ -25,6 +25,7 @@ class TestModbusBuilder(unittest.TestCase):
         self.assertIsNone(builder.retries)
         self.assertIsNone(builder.reconnect_delay)
         self.assertIsNone(builder.reconnect_delay_max)
+        self.assertIsNone(builder.unit_id)
 
     def test_builder_with_valid_values(self):
         builder = ModbusClientBuilder()
@@ -36,6 +37,7 @@ class TestModbusBuilder(unittest.TestCase):
         builder.set_retries(Retries(5))
         builder.set_reconnect_delay(ReconnectDelay(2.0))
         builder.set_reconnect_delay_max(ReconnectDelayMax(10.0))
+        builder.set_unit_id(UnitId(3))
 
         self.assertEqual(builder.coil_size.value, 10)
         self.assertEqual(builder.discrete_input_size.value, 20)
@@ -45,6 +47,7 @@ class TestModbusBuilder(unittest.TestCase):
         self.assertEqual(builder.retries.value, 5)
         self.assertEqual(builder.reconnect_delay.value, 2.0)
         self.assertEqual(builder.reconnect_delay_max.value, 10.0)
+        self.assertEqual(builder.unit_id.value, 3)
 
     def test_builder_with_invalid_values(self):
         # Testing invalid values for each setter
@@ -56,6 +59,7 @@ class TestModbusBuilder(unittest.TestCase):
         self.assertEqual(Retries(-1).status, Status.EXCEPTION)
         self.assertEqual(ReconnectDelay(-1).status, Status.EXCEPTION)
         self.assertEqual(ReconnectDelayMax(-1).status, Status.EXCEPTION)
+        self.assertEqual(UnitId(256).status, Status.EXCEPTION)
 
     def test_builder_with_edge_values(self):
         builder = ModbusClientBuilder()
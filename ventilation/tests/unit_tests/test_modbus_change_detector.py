@@ -0,0 +1,127 @@
+import unittest
+
+from modbus.modbus import ModbusData
+from modbus.modbus_arrays import BitArray, RegisterArray
+from modbus.modbus_change_detector import ModbusChangeDetector, ModbusChanges
+from utils.response import Response
+from utils.status import Status
+
+
+def ok(value):
+    return Response(status=Status.OK, details="Read successful", value=value)
+
+
+def snapshot(input_register=(), coils=()) -> ModbusData:
+    return ModbusData(
+        input_register=ok(RegisterArray.from_registers(input_register)),
+        holding_register=ok(RegisterArray()),
+        discrete_inputs=ok(BitArray()),
+        coils=ok(BitArray.from_bits(coils))
+    )
+
+
+class TestModbusChangeDetector(unittest.TestCase):
+
+    def test_first_snapshot_reports_everything(self):
+        detector = ModbusChangeDetector()
+        changes = detector.update(snapshot([1, 2], [True]))
+
+        self.assertEqual(changes.version, 1)
+        self.assertEqual(changes.input_register, {0: 1, 1: 2})
+        self.assertEqual(changes.coils, {0: True})
+
+    def test_unchanged_snapshot_is_empty(self):
+        detector = ModbusChangeDetector()
+        detector.update(snapshot([1, 2], [True]))
+        changes = detector.update(snapshot([1, 2], [True]))
+
+        self.assertTrue(changes.empty)
+        self.assertEqual(changes.version, 1)
+
+    def test_only_changed_addresses(self):
+        detector = ModbusChangeDetector()
+        registers = list(range(300))
+        bits = [False] * 20
+        detector.update(snapshot(registers, bits))
+
+        registers[7], registers[250] = 1000, 2000
+        bits[12] = True
+        changes = detector.update(snapshot(registers, bits))
+
+        self.assertEqual(changes.input_register, {7: 1000, 250: 2000})
+        self.assertEqual(changes.coils, {12: True})
+
+    def test_deadband_against_last_reported_value(self):
+        detector = ModbusChangeDetector(deadbands={'input_register': {0: 2}})
+        detector.update(snapshot([100]))
+
+        self.assertTrue(detector.update(snapshot([101])).empty)
+        self.assertTrue(detector.update(snapshot([102])).empty)
+        # The drift adds up past the deadband of the value last reported
+        self.assertEqual(detector.update(snapshot([103])).input_register, {0: 103})
+
+    def test_unread_addresses_are_skipped(self):
+        detector = ModbusChangeDetector()
+        detector.update(snapshot([1, 2, 3]))
+        sparse = RegisterArray.assemble(3, [(0, [5])])
+        changes = detector.update(ModbusData(input_register=ok(sparse), holding_register=ok(RegisterArray()),
+                                             discrete_inputs=ok(BitArray()), coils=ok(BitArray())))
+
+        self.assertEqual(changes.input_register, {0: 5})
+
+    def test_failed_table_is_skipped(self):
+        detector = ModbusChangeDetector()
+        detector.update(snapshot([1]))
+        failed = Response(status=Status.EXCEPTION, details="timeout", value=None)
+        changes = detector.update(ModbusData(input_register=failed, holding_register=failed,
+                                             discrete_inputs=failed, coils=failed))
+
+        self.assertTrue(changes.empty)
+        self.assertTrue(detector.update(snapshot([1])).empty)
+
+    def test_plain_lists(self):
+        detector = ModbusChangeDetector()
+        detector.update(ModbusData(ok([1, 2]), ok([]), ok([]), ok([])))
+        changes = detector.update(ModbusData(ok([1, 3]), ok([]), ok([]), ok([])))
+        self.assertEqual(changes.input_register, {1: 3})
+
+    def test_changed_since(self):
+        detector = ModbusChangeDetector()
+        detector.update(snapshot([1, 2, 3]))
+        version = detector.version
+        detector.update(snapshot([1, 5, 3]))
+        detector.update(snapshot([1, 6, 4]))
+
+        changes = detector.changed_since(version)
+        self.assertEqual(changes.input_register, {1: 6, 2: 4})
+        self.assertTrue(detector.changed_since(detector.version).empty)
+
+    def test_subscribe(self):
+        detector = ModbusChangeDetector()
+        everything, selected = [], []
+        detector.subscribe(everything.append)
+        detector.subscribe(selected.append, table='input_register', addresses=[1])
+
+        detector.update(snapshot([1, 2]))
+        detector.update(snapshot([9, 2]))
+
+        self.assertEqual(len(everything), 2)
+        self.assertEqual(selected, [ModbusChanges(version=1, input_register={1: 2})])
+
+        detector.unsubscribe(everything.append)
+        detector.update(snapshot([9, 3]))
+        self.assertEqual(len(everything), 2)
+
+    def test_reset(self):
+        detector = ModbusChangeDetector()
+        detector.update(snapshot([1]))
+        detector.reset()
+        self.assertEqual(detector.update(snapshot([1])).input_register, {0: 1})
+
+    def test_invalid_deadband_table(self):
+        with self.assertRaises(AssertionError):
+            ModbusChangeDetector(deadbands={'coils': {0: 1}})
+
+
+if __name__ == '__main__':
+    unittest.main()
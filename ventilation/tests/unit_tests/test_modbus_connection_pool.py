@@ -0,0 +1,246 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+from py_modbus.modbus_connection_pool import (ModbusConnectionPool, PooledConnection, ReconnectBackoff,
+                                              default_probe)
+from utils.operation_response import OperationStatus
+
+
+class FakeClient:
+    """A client whose link can be cut, reconnecting succeeds once the link is restored."""
+
+    def __init__(self):
+        self.connected = False
+        self.link_up = True
+        self.connects = 0
+        self.closes = 0
+
+    async def connect(self):
+        self.connects += 1
+        self.connected = self.link_up
+
+    def close(self):
+        self.closes += 1
+        self.connected = False
+
+
+class TestReconnectBackoff(unittest.TestCase):
+
+    def test_exponential_and_capped(self):
+        backoff = ReconnectBackoff(delay=0.1, delay_max=1.0, jitter=0)
+        self.assertEqual([backoff.delay_for(attempt) for attempt in range(5)], [0.1, 0.2, 0.4, 0.8, 1.0])
+
+    def test_jitter_scales_down(self):
+        backoff = ReconnectBackoff(delay=1.0, delay_max=1.0, jitter=0.5)
+        self.assertEqual(backoff.delay_for(0, rand=lambda: 0.0), 1.0)
+        self.assertEqual(backoff.delay_for(0, rand=lambda: 1.0), 0.5)
+
+    def test_invalid(self):
+        with self.assertRaises(AssertionError):
+            ReconnectBackoff(delay=2.0, delay_max=1.0)
+        with self.assertRaises(AssertionError):
+            ReconnectBackoff(delay=0.1, delay_max=1.0, jitter=1.5)
+
+
+class TestPooledConnection(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.client = FakeClient()
+        self.probe = AsyncMock()
+        self.connection = PooledConnection("192.168.1.100:502", self.client,
+                                           ReconnectBackoff(delay=0.01, delay_max=0.02, jitter=0),
+                                           probe=self.probe, probe_interval=0.01, probe_timeout=0.05,
+                                           drain_timeout=0.5)
+
+    async def asyncTearDown(self):
+        await self.connection.close()
+
+    async def wait_until(self, condition, timeout: float = 1.0):
+        async def poll():
+            while not condition():
+                await asyncio.sleep(0.005)
+        await asyncio.wait_for(poll(), timeout)
+
+    async def test_opened_once_for_every_client(self):
+        first, second = object(), object()
+        self.assertEqual((await self.connection.connect(first)).status, OperationStatus.OK)
+        self.assertEqual((await self.connection.connect(second)).status, OperationStatus.OK)
+
+        self.assertEqual(self.client.connects, 1)
+        self.assertEqual(self.connection.metrics().consumers, 2)
+
+        self.connection.disconnect(first)
+        self.assertEqual(self.client.closes, 0)
+        self.connection.disconnect(second)
+        self.assertEqual(self.client.closes, 1)
+
+    async def test_repeated_disconnect_keeps_connection_for_others(self):
+        first, second = object(), object()
+        await self.connection.connect(first)
+        await self.connection.connect(first)
+        await self.connection.connect(second)
+        self.assertEqual(self.connection.metrics().consumers, 2)
+
+        self.connection.disconnect(first)
+        self.connection.disconnect(first)
+
+        self.assertEqual(self.client.closes, 0)
+        self.assertTrue(self.connection.connected)
+        self.assertEqual(self.connection.metrics().consumers, 1)
+
+    async def test_failed_connect(self):
+        self.client.link_up = False
+
+        response = await self.connection.connect(self)
+
+        self.assertEqual(response.status, OperationStatus.FAILED)
+        self.assertEqual(self.connection.metrics().consumers, 0)
+
+    async def test_idle_connection_is_probed(self):
+        await self.connection.connect(self)
+        await self.wait_until(lambda: self.probe.await_count >= 2)
+        self.assertTrue(self.connection.connected)
+
+    async def test_busy_connection_is_not_probed(self):
+        await self.connection.connect(self)
+
+        async def request(_):
+            await asyncio.sleep(0.05)
+
+        await self.connection.execute(request)
+        self.probe.assert_not_awaited()
+
+    async def test_failed_probe_reconnects(self):
+        self.probe.side_effect = [ModbusIOException("no response"), None, None, None, None, None]
+        await self.connection.connect(self)
+
+        await self.wait_until(lambda: self.connection.metrics().reconnects == 1)
+
+        metrics = self.connection.metrics()
+        self.assertEqual(metrics.failed_probes, 1)
+        self.assertEqual(metrics.connection_losses, 1)
+        self.assertIn("no response", metrics.last_error)
+        self.assertTrue(self.connection.connected)
+
+    async def test_hung_probe_counts_as_lost(self):
+        async def hang(_):
+            await asyncio.sleep(1)
+
+        self.probe.side_effect = hang
+        await self.connection.connect(self)
+
+        await self.wait_until(lambda: self.connection.metrics().failed_probes >= 1)
+
+    async def test_requests_fail_fast_while_down_and_reconnect_with_backoff(self):
+        await self.connection.connect(self)
+        self.client.link_up = False
+
+        async def lose(_):
+            raise ConnectionException("reset by peer")
+
+        with self.assertRaises(ConnectionException):
+            await self.connection.execute(lose)
+        with self.assertRaises(ConnectionException):
+            await self.connection.execute(AsyncMock())
+        self.assertEqual(self.connection.metrics().rejected, 1)
+
+        await self.wait_until(lambda: self.connection.metrics().failed_reconnects >= 2)
+        self.client.link_up = True
+        await self.wait_until(lambda: self.connection.connected)
+
+        self.assertEqual(await self.connection.execute(AsyncMock(return_value="answer")), "answer")
+        self.assertEqual(self.connection.metrics().reconnects, 1)
+
+    async def test_io_error_counts_as_lost(self):
+        await self.connection.connect(self)
+
+        async def no_response(_):
+            raise ModbusIOException("no response after retries")
+
+        with self.assertRaises(ModbusIOException):
+            await self.connection.execute(no_response)
+        self.assertFalse(self.connection.connected)
+        self.assertEqual(self.connection.metrics().connection_losses, 1)
+        await self.wait_until(lambda: self.connection.connected)
+        self.assertEqual(self.connection.metrics().reconnects, 1)
+
+    async def test_request_that_closed_the_client_counts_as_lost(self):
+        await self.connection.connect(self)
+
+        async def closed(client):
+            client.connected = False
+            return "answer"
+
+        self.assertEqual(await self.connection.execute(closed), "answer")
+        self.assertEqual(self.connection.metrics().connection_losses, 1)
+        self.assertEqual(self.connection.metrics().last_error,
+                         "ConnectionException: Modbus Error: [Connection] 192.168.1.100:502 closed during a request")
+        await self.wait_until(lambda: self.connection.connected)
+
+    async def test_last_disconnect_drains_requests_in_flight(self):
+        await self.connection.connect(self)
+        released = asyncio.Event()
+
+        async def slow(_):
+            await released.wait()
+            return "done"
+
+        request = asyncio.create_task(self.connection.execute(slow))
+        await asyncio.sleep(0)
+        self.assertEqual(self.connection.metrics().in_flight, 1)
+
+        self.connection.disconnect(self)
+        self.assertEqual(self.client.closes, 0)
+
+        released.set()
+        self.assertEqual(await request, "done")
+        await self.wait_until(lambda: self.client.closes == 1)
+
+    async def test_metrics(self):
+        await self.connection.connect(self)
+        await self.connection.execute(AsyncMock())
+
+        metrics = self.connection.metrics()
+        self.assertEqual(metrics.endpoint, "192.168.1.100:502")
+        self.assertTrue(metrics.connected)
+        self.assertEqual(metrics.requests, 1)
+        self.assertEqual(metrics.in_flight, 0)
+
+
+class TestDefaultProbe(unittest.IsolatedAsyncioTestCase):
+
+    async def test_reads_one_register(self):
+        client = MagicMock()
+        client.read_holding_registers = AsyncMock()
+        await default_probe(client)
+        client.read_holding_registers.assert_awaited_once_with(0, 1, slave=1)
+
+
+class TestModbusConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = patch.dict(ModbusConnectionPool._connections, clear=True)
+        self.pool.start()
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def test_one_connection_per_endpoint(self):
+        factory = MagicMock(side_effect=lambda: FakeClient())
+        backoff = ReconnectBackoff(delay=0.1, delay_max=1.0)
+
+        first = ModbusConnectionPool.connection("10.0.0.1:502", factory, backoff)
+        second = ModbusConnectionPool.connection("10.0.0.1:502", factory, backoff)
+        other = ModbusConnectionPool.connection("10.0.0.2:502", factory, backoff)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(factory.call_count, 2)
+        self.assertEqual(set(ModbusConnectionPool.metrics()), {"10.0.0.1:502", "10.0.0.2:502"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+import unittest
+
+from modbus.modbus_metrics import LatencyHistogram, ModbusInstrumentation, RequestOutcome, pdu_sizes
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentiles_within_precision(self):
+        histogram = LatencyHistogram()
+        for millis in range(1, 1001):
+            histogram.record(millis / 1000)
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.percentile(50), 0.5, delta=0.5 * 0.032)
+        self.assertAlmostEqual(histogram.percentile(99), 0.99, delta=0.99 * 0.032)
+        self.assertEqual(histogram.percentile(100), 1.0)
+        self.assertEqual(histogram.min, 0.001)
+        self.assertEqual(histogram.max, 1.0)
+        self.assertAlmostEqual(histogram.mean, 0.5005)
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for micros in (3, 7, 7, 40):
+            histogram.record(micros / 1_000_000)
+        self.assertEqual(histogram.percentile(50), 7 / 1_000_000)
+        self.assertEqual(histogram.count_at_or_below(7 / 1_000_000), 3)
+
+    def test_bucket_bounds_hold_their_values(self):
+        histogram = LatencyHistogram(precision_bits=4)
+        for micros in range(16, 5000):
+            index = histogram._index(micros)
+            self.assertLessEqual(micros, histogram._upper(index))
+            self.assertGreater(micros, histogram._upper(index - 1))
+
+    def test_count_at_or_below(self):
+        histogram = LatencyHistogram()
+        for seconds in (0.002, 0.004, 0.02, 0.3):
+            histogram.record(seconds)
+        self.assertEqual(histogram.count_at_or_below(0.001), 0)
+        self.assertEqual(histogram.count_at_or_below(0.005), 2)
+        self.assertEqual(histogram.count_at_or_below(1.0), 4)
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(99), 0.0)
+        self.assertEqual(histogram.mean, 0.0)
+
+
+class TestPduSizes(unittest.TestCase):
+
+    def test_sizes(self):
+        self.assertEqual(pdu_sizes(1, 10), (5, 4))
+        self.assertEqual(pdu_sizes(3, 10), (5, 22))
+        self.assertEqual(pdu_sizes(6, 1), (5, 5))
+        self.assertEqual(pdu_sizes(15, 9), (8, 5))
+        self.assertEqual(pdu_sizes(16, 3), (12, 5))
+        with self.assertRaises(ValueError):
+            pdu_sizes(43, 1)
+
+
+class TestModbusInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.instrumentation = ModbusInstrumentation(pdu_history=2, wall_clock=lambda: 1000.0)
+
+    def test_counters(self):
+        self.instrumentation.record("10.0.0.1:502/1", 3, 0, 10, 0.01, RequestOutcome.OK)
+        self.instrumentation.record("10.0.0.1:502/1", 3, 0, 10, 0.5, RequestOutcome.TIMEOUT, "no response")
+        self.instrumentation.record("10.0.0.1:502/1", 3, 0, 10, 0.02, RequestOutcome.ERROR, "illegal address")
+        self.instrumentation.record_retries("10.0.0.1:502/1", 3, 2)
+
+        stats = self.instrumentation.stats("10.0.0.1:502/1", 3)
+        self.assertEqual((stats.requests, stats.errors, stats.timeouts, stats.retries), (3, 1, 1, 2))
+        self.assertEqual(stats.bytes_sent, 15)
+        self.assertEqual(stats.bytes_received, 22 + 2)
+        self.assertEqual(stats.latency.count, 3)
+
+    def test_recent_requests_are_bounded(self):
+        for address in range(3):
+            self.instrumentation.record("/dev/ttyUSB0/2", 4, address, 1, 0.01, RequestOutcome.OK)
+
+        recent = self.instrumentation.recent()
+        self.assertEqual([record.address for record in recent], [1, 2])
+        self.assertEqual(recent[0].timestamp, 1000.0)
+
+    def test_no_history_by_default(self):
+        instrumentation = ModbusInstrumentation()
+        instrumentation.record("a", 1, 0, 1, 0.01, RequestOutcome.OK)
+        self.assertEqual(instrumentation.recent(), [])
+
+    def test_time_by_device(self):
+        self.instrumentation.record("fast", 3, 0, 1, 0.01, RequestOutcome.OK)
+        self.instrumentation.record("slow", 3, 0, 1, 0.2, RequestOutcome.OK)
+        self.instrumentation.record("slow", 1, 0, 1, 0.3, RequestOutcome.OK)
+
+        ranking = self.instrumentation.time_by_device()
+
+        self.assertEqual([device for device, _ in ranking], ["slow", "fast"])
+        self.assertAlmostEqual(ranking[0][1], 0.5)
+
+    def test_json_snapshot(self):
+        self.instrumentation.record("unit_1", 16, 5, 2, 0.01, RequestOutcome.OK)
+
+        snapshot = json.loads(self.instrumentation.to_json())
+
+        request = snapshot['requests'][0]
+        self.assertEqual((request['device'], request['function'], request['function_code']),
+                         ("unit_1", "write_registers", 16))
+        self.assertEqual(request['latency']['count'], 1)
+        self.assertEqual(snapshot['recent'][0]['outcome'], "ok")
+
+    def test_prometheus(self):
+        self.instrumentation.record('bus "a"', 4, 0, 1, 0.003, RequestOutcome.OK)
+        self.instrumentation.record('bus "a"', 4, 0, 1, 0.2, RequestOutcome.ERROR)
+
+        text = self.instrumentation.to_prometheus()
+
+        labels = 'device="bus \\"a\\"",function="read_input_registers"'
+        self.assertIn("# TYPE modbus_requests_total counter", text)
+        self.assertIn(f"modbus_requests_total{{{labels}}} 2", text)
+        self.assertIn(f"modbus_request_errors_total{{{labels}}} 1", text)
+        self.assertIn(f'modbus_request_duration_seconds_bucket{{{labels},le="0.005"}} 1', text)
+        self.assertIn(f'modbus_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn(f"modbus_request_duration_seconds_count{{{labels}}} 2", text)
+
+    def test_write_files(self):
+        self.instrumentation.record("unit_1", 3, 0, 1, 0.01, RequestOutcome.OK)
+        with tempfile.TemporaryDirectory() as directory:
+            prometheus = os.path.join(directory, "modbus.prom")
+            snapshot = os.path.join(directory, "modbus.json")
+
+            self.instrumentation.write_prometheus(prometheus)
+            self.instrumentation.write_json(snapshot)
+
+            with open(prometheus) as f:
+                self.assertEqual(f.read(), self.instrumentation.to_prometheus())
+            with open(snapshot) as f:
+                self.assertEqual(json.load(f), self.instrumentation.snapshot())
+            self.assertEqual(sorted(os.listdir(directory)), ["modbus.json", "modbus.prom"])
+
+    def test_reset(self):
+        self.instrumentation.record("unit_1", 3, 0, 1, 0.01, RequestOutcome.OK)
+        self.instrumentation.reset()
+        self.assertEqual(self.instrumentation.snapshot(), {'requests': [], 'recent': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
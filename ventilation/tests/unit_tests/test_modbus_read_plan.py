@@ -0,0 +1,57 @@
+import unittest
+
+from modbus.modbus_read_plan import ModbusReadPlanner, ModbusReadPlan
+
+
+class TestModbusReadPlanner(unittest.TestCase):
+
+    def test_empty_plan(self):
+        plan = ModbusReadPlanner().plan()
+        self.assertEqual(plan, ModbusReadPlan())
+        self.assertEqual(plan.request_count, 0)
+
+    def test_contiguous_addresses_become_one_request(self):
+        plan = ModbusReadPlanner().plan(input_register=[3, 1, 2, 2])
+        self.assertEqual(plan.input_register, ((1, 3),))
+
+    def test_gap_splits_requests_without_threshold(self):
+        plan = ModbusReadPlanner().plan(input_register=[1, 2, 8])
+        self.assertEqual(plan.input_register, ((1, 2), (8, 1)))
+
+    def test_gap_merged_within_threshold(self):
+        # 5 unused registers between 2 and 8 are cheaper to read than a second round trip
+        plan = ModbusReadPlanner(gap=5).plan(input_register=[1, 2, 8])
+        self.assertEqual(plan.input_register, ((1, 8),))
+
+    def test_gap_not_merged_beyond_threshold(self):
+        plan = ModbusReadPlanner(gap=4).plan(input_register=[1, 2, 8])
+        self.assertEqual(plan.input_register, ((1, 2), (8, 1)))
+
+    def test_max_count_limits_each_request(self):
+        plan = ModbusReadPlanner(gap=10, holding_register_max_count=3).plan(holding_register=[0, 1, 2, 3, 4])
+        self.assertEqual(plan.holding_register, ((0, 3), (3, 2)))
+
+    def test_tables_are_planned_independently(self):
+        plan = ModbusReadPlanner().plan(coils=[0], discrete_inputs=[4], input_register=[1, 2],
+                                        holding_register=[7])
+        self.assertEqual(plan.coils, ((0, 1),))
+        self.assertEqual(plan.discrete_inputs, ((4, 1),))
+        self.assertEqual(plan.input_register, ((1, 2),))
+        self.assertEqual(plan.holding_register, ((7, 1),))
+        self.assertEqual(plan.request_count, 4)
+
+    def test_merge_plans(self):
+        planner = ModbusReadPlanner()
+        merged = planner.merge(ModbusReadPlan(input_register=((1, 2),)),
+                               ModbusReadPlan(input_register=((3, 1),), coils=((0, 1),)))
+        self.assertEqual(merged, ModbusReadPlan(coils=((0, 1),), input_register=((1, 3),)))
+
+    def test_invalid_settings(self):
+        with self.assertRaises(AssertionError):
+            ModbusReadPlanner(gap=-1)
+        with self.assertRaises(AssertionError):
+            ModbusReadPlanner(coil_max_count=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
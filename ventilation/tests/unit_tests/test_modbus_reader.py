@@ -1,7 +1,11 @@
+import asyncio
 import unittest
-from typing import List
+from typing import List, Optional
 from unittest.mock import AsyncMock
-from modbus.modbus_reader import ModbusBitReader, ModbusWordReader, ModbusResultAdapter
+from modbus.modbus_arrays import BitArray, RegisterArray
+from modbus.modbus_reader import (ModbusBitReader, ModbusWordReader, ModbusResultAdapter, AdaptiveMaxCount,
+                                  ChunkRetryPolicy)
+from utils.deadline import Deadline
 from utils.response import Response
 from utils.status import Status
 
@@ -50,6 +54,16 @@ class TestModbusBitReader(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.status, Status.OK)
         self.assertEqual(result.value, [True, False, True, False])
 
+    async def test_read_bits_trims_padding(self):
+        # Bits come back padded to a whole byte, only the requested count is kept
+        mock_read_function = AsyncMock(return_value=MockModbusResultAdapter(data=[True, False, True] + [False] * 5))
+
+        reader = ModbusBitReader(read_function=mock_read_function)
+        result = await reader.read(0, 3)
+
+        self.assertIsInstance(result.value, BitArray)
+        self.assertEqual(result.value, [True, False, True])
+
     async def test_read_bits_multiple_chunks(self):
         # Mock the read function to simulate successful reads in chunks
         # side_effect: This is an argument to AsyncMock that defines what the mocked function
@@ -129,6 +143,7 @@ class TestModbusWordReader(unittest.IsolatedAsyncioTestCase):
         # Verify the result
         self.assertEqual(result.status, Status.OK)
         self.assertEqual(result.value, [100, 200, 300, 400])
+        self.assertIsInstance(result.value, RegisterArray)
 
     async def test_read_words_multiple_chunks(self):
         # Mock the read function to simulate successful reads in chunks
@@ -165,5 +180,317 @@ class TestModbusWordReader(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(result.value)
 
 
+    async def test_read_ranges_sparse(self):
+        # Only the planned ranges are requested, the result is indexed by address
+        mock_read_function = AsyncMock(side_effect=[
+            MockModbusWordResultAdapter(data=[10, 20]),
+            MockModbusWordResultAdapter(data=[50])
+        ])
+
+        reader = ModbusWordReader(read_function=mock_read_function)
+        result = await reader.read_ranges([(1, 2), (5, 1)])
+
+        self.assertEqual(result.status, Status.OK)
+        self.assertEqual(result.value, [None, 10, 20, None, None, 50])
+        self.assertEqual(mock_read_function.call_count, 2)
+        mock_read_function.assert_any_call(1, 2)
+        mock_read_function.assert_any_call(5, 1)
+
+    async def test_read_ranges_error(self):
+        mock_read_function = AsyncMock(side_effect=[
+            MockModbusWordResultAdapter(error=True),
+            MockModbusWordResultAdapter(data=[50])
+        ])
+
+        reader = ModbusWordReader(read_function=mock_read_function)
+        result = await reader.read_ranges([(1, 2), (5, 1)])
+
+        self.assertEqual(result.status, Status.EXCEPTION)
+        # No further requests once a chunk has failed
+        self.assertEqual(mock_read_function.call_count, 1)
+
+    async def test_read_ranges_empty(self):
+        mock_read_function = AsyncMock()
+
+        reader = ModbusWordReader(read_function=mock_read_function)
+        result = await reader.read_ranges([])
+
+        self.assertEqual(result.status, Status.OK)
+        self.assertEqual(result.value, [])
+        mock_read_function.assert_not_called()
+
+
+class RejectingDevice:
+    """Answers like a device that rejects any request larger than max_count with an illegal address exception."""
+    def __init__(self, max_count: int):
+        self.max_count = max_count
+        self.fail_at = None
+        self.requests = []
+
+    def rejects(self, address: int, count: int) -> bool:
+        return count > self.max_count
+
+    async def __call__(self, address: int, count: int):
+        self.requests.append((address, count))
+        if self.rejects(address, count):
+            adapter = MockModbusWordResultAdapter(error=True)
+            adapter.is_rejected = lambda: True
+            return adapter
+        if self.fail_at is not None and address <= self.fail_at < address + count:
+            return MockModbusWordResultAdapter(error=True)
+        return MockModbusWordResultAdapter(data=list(range(address, address + count)))
+
+
+class HoleDevice(RejectingDevice):
+    """Answers like a device that rejects any request covering one unmapped address."""
+    def __init__(self, hole: Optional[int]):
+        super().__init__(max_count=125)
+        self.hole = hole
+
+    def rejects(self, address: int, count: int) -> bool:
+        return self.hole is not None and address <= self.hole < address + count
+
+
+class TestAdaptiveMaxCount(unittest.IsolatedAsyncioTestCase):
+
+    async def test_rejected_chunk_is_split(self):
+        device = RejectingDevice(max_count=40)
+        reader = ModbusWordReader(read_function=device, adaptive=True)
+
+        result = await reader.read(0, 100)
+
+        self.assertEqual(result.status, Status.OK)
+        self.assertEqual(result.value, list(range(100)))
+        self.assertEqual(reader.adaptive_max_count.count, 25)
+
+    async def test_learnt_count_is_reused(self):
+        device = RejectingDevice(max_count=40)
+        reader = ModbusWordReader(read_function=device, adaptive=True)
+        await reader.read(0, 100)
+        device.requests.clear()
+
+        await reader.read(0, 100)
+        self.assertEqual(device.requests, [(0, 25), (25, 25), (50, 25), (75, 25)])
+
+    async def test_fixed_reader_does_not_retry(self):
+        device = RejectingDevice(max_count=40)
+        reader = ModbusWordReader(read_function=device)
+
+        result = await reader.read(0, 100)
+
+        self.assertEqual(result.status, Status.EXCEPTION)
+        self.assertEqual(device.requests, [(0, 100)])
+
+    async def test_every_address_rejected_is_an_error(self):
+        device = RejectingDevice(max_count=0)
+        reader = ModbusWordReader(read_function=device, adaptive=True, max_count=4)
+
+        result = await reader.read(0, 4)
+
+        self.assertEqual(result.status, Status.EXCEPTION)
+        self.assertEqual(device.requests, [(0, 4), (0, 2), (0, 1), (1, 1), (2, 2), (2, 1), (3, 1)])
+        self.assertEqual(reader.adaptive_max_count.count, 4)
+
+    async def test_refused_address_is_pinned_as_hole(self):
+        device = HoleDevice(hole=20)
+        reader = ModbusWordReader(read_function=device, adaptive=True)
+
+        result = await reader.read(0, 51)
+
+        self.assertEqual(result.status, Status.OK)
+        self.assertIsNone(result.value[20])
+        self.assertEqual(result.value[:20], list(range(20)))
+        self.assertEqual(result.value[21:], list(range(21, 51)))
+        self.assertEqual(reader.adaptive_max_count.count, 125)
+        self.assertEqual(reader.adaptive_max_count.holes, {20})
+
+        device.requests.clear()
+        await reader.read(0, 51)
+        self.assertEqual(device.requests, [(0, 20), (21, 30)])
+
+    async def test_holes_are_reprobed(self):
+        device = HoleDevice(hole=2)
+        reader = ModbusWordReader(read_function=device, adaptive=True)
+        reader.adaptive_max_count = AdaptiveMaxCount(125, reprobe_after=2)
+        await reader.read(0, 4)
+        device.hole = None
+
+        await reader.read(0, 4)
+        await reader.read(0, 4)
+        device.requests.clear()
+        result = await reader.read(0, 4)
+
+        self.assertEqual(device.requests, [(0, 4)])
+        self.assertEqual(result.value, [0, 1, 2, 3])
+
+    async def test_partial_read_keeps_pieces_of_split_chunk(self):
+        device = RejectingDevice(max_count=40)
+        device.fail_at = 60
+        reader = ModbusWordReader(read_function=device, adaptive=True, partial=True)
+
+        result = await reader.read(0, 100)
+
+        self.assertEqual(result.status, Status.OK)
+        self.assertEqual(result.value[:50], list(range(50)))
+        self.assertEqual(result.value[75:], list(range(75, 100)))
+        self.assertEqual(result.value[50:75], [None] * 25)
+        self.assertIn("50+25", result.details)
+
+    def test_grows_back_towards_ceiling(self):
+        max_count = AdaptiveMaxCount(125, grow_after=2, reprobe_after=3)
+        max_count.rejected(125)
+        self.assertEqual(max_count.count, 62)
+
+        max_count.accepted(62)
+        max_count.accepted(62)
+        self.assertEqual(max_count.count, 93)
+
+        # Short remainder chunks do not count as successes
+        max_count.accepted(10)
+        max_count.accepted(10)
+        self.assertEqual(max_count.count, 93)
+
+    def test_reprobes_after_converging(self):
+        max_count = AdaptiveMaxCount(10, grow_after=1, reprobe_after=2)
+        max_count.rejected(10)
+        for _ in range(4):
+            max_count.accepted(max_count.count)
+        self.assertEqual(max_count.count, 9)
+
+        # The ceiling has been forgotten, the next growth probes the full limit
+        max_count.accepted(9)
+        max_count.accepted(9)
+        max_count.accepted(9)
+        self.assertEqual(max_count.count, 10)
+
+
+class TestPartialReads(unittest.IsolatedAsyncioTestCase):
+
+    async def test_failed_chunk_is_retried_alone(self):
+        mock_read_function = AsyncMock(side_effect=[
+            MockModbusWordResultAdapter(data=[1] * 125),
+            MockModbusWordResultAdapter(error=True),
+            MockModbusWordResultAdapter(data=[2] * 75)
+        ])
+        reader = ModbusWordReader(read_function=mock_read_function,
+                                  retry_policy=ChunkRetryPolicy(retries=2, backoff=0))
+
+        result = await reader.read(0, 200)
+
+        self.assertEqual(result.status, Status.OK)
+        self.assertEqual(result.value[125:], [2] * 75)
+        self.assertEqual([call.args for call in mock_read_function.call_args_list],
+                         [(0, 125), (125, 75), (125, 75)])
+
+    async def test_retries_are_bounded(self):
+        mock_read_function = AsyncMock(return_value=MockModbusWordResultAdapter(error=True))
+        reader = ModbusWordReader(read_function=mock_read_function,
+                                  retry_policy=ChunkRetryPolicy(retries=2, backoff=0))
+
+        result = await reader.read(0, 10)
+
+        self.assertEqual(result.status, Status.EXCEPTION)
+        self.assertEqual(mock_read_function.call_count, 3)
+
+    async def test_partial_result_marks_failed_chunk(self):
+        mock_read_function = AsyncMock(side_effect=[
+            MockModbusWordResultAdapter(data=[1] * 125),
+            MockModbusWordResultAdapter(error=True),
+            MockModbusWordResultAdapter(data=[3] * 50)
+        ])
+        reader = ModbusWordReader(read_function=mock_read_function, partial=True)
+
+        result = await reader.read(0, 300)
+
+        self.assertEqual(result.status, Status.OK)
+        self.assertIn("Partial read, chunks 125+125 failed", result.details)
+        self.assertEqual(len(result.value), 300)
+        self.assertEqual(result.value[124], 1)
+        self.assertFalse(result.value.is_valid(125))
+        self.assertIsNone(result.value[249])
+        self.assertEqual(result.value[250], 3)
+
+    async def test_partial_read_fails_when_every_chunk_fails(self):
+        mock_read_function = AsyncMock(return_value=MockModbusWordResultAdapter(error=True))
+        reader = ModbusWordReader(read_function=mock_read_function, partial=True)
+
+        result = await reader.read_ranges([(0, 2), (10, 2)])
+
+        self.assertEqual(result.status, Status.EXCEPTION)
+        self.assertEqual(mock_read_function.call_count, 2)
+
+    async def test_chunk_stats(self):
+        stats = []
+        mock_read_function = AsyncMock(side_effect=[
+            MockModbusWordResultAdapter(error=True),
+            MockModbusWordResultAdapter(data=[1, 2])
+        ])
+        reader = ModbusWordReader(read_function=mock_read_function, on_chunk=stats.append,
+                                  retry_policy=ChunkRetryPolicy(retries=1, backoff=0))
+
+        await reader.read(4, 2)
+
+        self.assertEqual(len(stats), 1)
+        self.assertEqual((stats[0].address, stats[0].count, stats[0].attempts, stats[0].status), (4, 2, 2, Status.OK))
+        self.assertGreaterEqual(stats[0].latency, 0)
+
+    def test_retry_delay_is_capped(self):
+        policy = ChunkRetryPolicy(retries=5, backoff=0.1, max_backoff=0.3)
+        self.assertEqual([policy.delay(attempt) for attempt in range(4)], [0.1, 0.2, 0.3, 0.3])
+
+
+class TestDeadlines(unittest.IsolatedAsyncioTestCase):
+
+    async def test_chunks_are_not_sent_after_the_deadline(self):
+        now = [0.0]
+
+        async def device(address: int, count: int):
+            now[0] += 1.0  # Each request takes a second
+            return MockModbusWordResultAdapter(data=[address] * count)
+
+        mock_read_function = AsyncMock(side_effect=device)
+        reader = ModbusWordReader(read_function=mock_read_function, max_count=10, partial=True)
+
+        result = await reader.read(0, 40, deadline=Deadline(1.5, clock=lambda: now[0]))
+
+        self.assertEqual(mock_read_function.call_count, 2)
+        self.assertEqual(result.status, Status.OK)
+        self.assertIn("Partial read, chunks 20+10, 30+10 failed: Deadline exceeded", result.details)
+        self.assertEqual(result.value[10], 10)
+        self.assertIsNone(result.value[20])
+
+    async def test_slow_request_is_abandoned(self):
+        async def hang(address: int, count: int):
+            await asyncio.sleep(1)
+
+        reader = ModbusWordReader(read_function=hang)
+
+        result = await asyncio.wait_for(reader.read(0, 10, deadline=Deadline(0.01)), timeout=0.5)
+
+        self.assertEqual(result.status, Status.EXCEPTION)
+        self.assertEqual(result.details, "Deadline exceeded")
+
+    async def test_no_retry_when_backoff_overruns_the_deadline(self):
+        mock_read_function = AsyncMock(return_value=MockModbusWordResultAdapter(error=True))
+        reader = ModbusWordReader(read_function=mock_read_function,
+                                  retry_policy=ChunkRetryPolicy(retries=3, backoff=10))
+
+        result = await reader.read_ranges([(0, 2)], deadline=Deadline(1))
+
+        self.assertEqual(result.status, Status.EXCEPTION)
+        self.assertEqual(mock_read_function.call_count, 1)
+
+    async def test_estimated_duration(self):
+        mock_read_function = AsyncMock(return_value=MockModbusWordResultAdapter(data=[0] * 125))
+        reader = ModbusWordReader(read_function=mock_read_function)
+        self.assertIsNone(reader.latency)
+        self.assertEqual(reader.estimated_duration([(0, 250)]), 0)
+
+        await reader.read(0, 125)
+
+        self.assertIsNotNone(reader.latency)
+        self.assertAlmostEqual(reader.estimated_duration([(0, 250), (300, 1)]), 3 * reader.latency)
+
+
 if __name__ == '__main__':
     unittest.main()
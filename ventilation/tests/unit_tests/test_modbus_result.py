@@ -1,13 +1,18 @@
 import unittest
 from unittest.mock import AsyncMock, create_autospec
 from pymodbus import ModbusException
-from pymodbus.pdu import ModbusResponse, ExceptionResponse
+from pymodbus.pdu import ModbusResponse, ExceptionResponse, ModbusExceptions
 from py_modbus.modbus_result import (
     PyModbusCoilResult,
     PyModbusDiscreteInputResult,
     PyModbusInputRegisterResult,
-    PyModbusHoldingRegisterResult
+    PyModbusHoldingRegisterResult,
+    PyModbusRegisterWriteResult,
+    PyModbusRegistersWriteResult,
+    PyModbusCoilWriteResult,
+    PyModbusCoilsWriteResult
 )
+from utils.operation_response import OperationStatus
 from utils.status import Status
 
 
@@ -36,6 +41,19 @@ class TestPyModbusCoilResult(unittest.IsolatedAsyncioTestCase):
         self.assertTrue(result.is_error())
         self.assertEqual(result.to_response().status, Status.EXCEPTION)  # Updated to ResponseStatus
 
+    async def test_is_rejected(self):
+        mock_client = AsyncMock()
+        mock_exception_response = create_autospec(ExceptionResponse, instance=True)
+        mock_exception_response.exception_code = ModbusExceptions.IllegalAddress
+        mock_client.read_coils.return_value = mock_exception_response
+
+        result = await PyModbusCoilResult.create(mock_client, address=1, count=3)
+        self.assertTrue(result.is_rejected())
+
+        mock_exception_response.exception_code = ModbusExceptions.SlaveFailure
+        result = await PyModbusCoilResult.create(mock_client, address=1, count=3)
+        self.assertFalse(result.is_rejected())
+
     async def test_get_error_message_modbus_exception(self):
         mock_client = AsyncMock()
         mock_exception = create_autospec(ModbusException, instance=True)
@@ -149,5 +167,43 @@ class TestPyModbusHoldingRegisterResult(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.to_response().status, Status.EXCEPTION)
 
 
+class TestPyModbusWriteResult(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.mock_client = AsyncMock()
+        self.mock_response = create_autospec(ModbusResponse, instance=True)
+        self.mock_response.isError.return_value = False
+
+    async def test_write_functions(self):
+        for result_class, method, value in [(PyModbusRegisterWriteResult, 'write_register', 7),
+                                            (PyModbusRegistersWriteResult, 'write_registers', [7, 8]),
+                                            (PyModbusCoilWriteResult, 'write_coil', True),
+                                            (PyModbusCoilsWriteResult, 'write_coils', [True, False])]:
+            with self.subTest(method=method):
+                getattr(self.mock_client, method).return_value = self.mock_response
+
+                result = await result_class.create(self.mock_client, address=4, value=value, slave=3)
+
+                getattr(self.mock_client, method).assert_awaited_once_with(4, value, slave=3)
+                self.assertFalse(result.is_error())
+                self.assertEqual(result.to_operation_response().status, OperationStatus.OK)
+
+    async def test_write_error(self):
+        mock_exception_response = create_autospec(ExceptionResponse, instance=True)
+        mock_exception_response.isError.return_value = True
+        mock_exception_response.exception_code = ModbusExceptions.IllegalValue
+        self.mock_client.write_register.return_value = mock_exception_response
+
+        result = await PyModbusRegisterWriteResult.create(self.mock_client, address=4, value=7)
+
+        self.assertTrue(result.is_error())
+        self.assertEqual(result.to_operation_response().status, OperationStatus.FAILED)
+
+    def test_failed(self):
+        response = PyModbusCoilsWriteResult.failed(ModbusException("No response")).to_operation_response()
+        self.assertEqual(response.status, OperationStatus.FAILED)
+        self.assertIn("No response", response.details)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,13 @@
 import unittest
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from modbus.modus_rtu_client_builder import ModbusRTUClientBuilder
 from modbus.rtu_values import BaudRate, StopBits, SerialPort, ParityType
 from modbus.modbus_values import Timeout, Retries, ReconnectDelay, ReconnectDelayMax
+from modbus.modbus_values import UnitId
+from modbus.rtu_values import BusPriority
+from py_modbus.modbus_rtu_bus import ModbusRTUBus
 from py_modbus.modbus_rtu_client import ModbusRTUClient
+from utils.operation_response import OperationResponse, OperationStatus
 
 
 class TestModbusRTU(unittest.IsolatedAsyncioTestCase):
@@ -20,8 +24,15 @@ class TestModbusRTU(unittest.IsolatedAsyncioTestCase):
             .set_reconnect_delay(ReconnectDelay(0.1)) \
             .set_reconnect_delay_max(ReconnectDelayMax(10))
 
-    @patch('py_modbus.modbus_rtu_client.AsyncModbusSerialClient')
-    @patch('py_modbus.modus_py_client.ModbusConnectionManager')
+        # Every test starts without any open serial port
+        self.buses = patch.dict(ModbusRTUBus._buses, clear=True)
+        self.buses.start()
+
+    def tearDown(self):
+        self.buses.stop()
+
+    @patch('py_modbus.modbus_rtu_bus.AsyncModbusSerialClient')
+    @patch('py_modbus.modbus_rtu_bus.ModbusConnectionManager')
     async def test_connect(self, mock_client_manager_cls, mock_client_cls):
         mock_client = AsyncMock()
         mock_client_cls.return_value = mock_client
@@ -53,6 +64,46 @@ class TestModbusRTU(unittest.IsolatedAsyncioTestCase):
             retries=3
         )
 
+    @patch('py_modbus.modbus_rtu_bus.AsyncModbusSerialClient')
+    def test_clients_on_one_port_share_the_bus(self, mock_client_cls):
+        first = ModbusRTUClient(self.builder)
+        second = ModbusRTUClient(self.builder.set_unit_id(UnitId(2)))
+
+        self.assertIs(first._bus, second._bus)
+        self.assertIs(first._client, second._client)
+        mock_client_cls.assert_called_once()
+
+    @patch('py_modbus.modbus_rtu_bus.AsyncModbusSerialClient')
+    def test_port_settings_must_match(self, _):
+        ModbusRTUClient(self.builder)
+        with self.assertRaises(AssertionError):
+            ModbusRTUClient(self.builder.set_baud_rate(BaudRate(19200)))
+
+    @patch('py_modbus.modbus_rtu_bus.AsyncModbusSerialClient')
+    async def test_reads_go_through_the_bus_to_the_unit(self, mock_client_cls):
+        mock_client = MagicMock()
+        mock_client.read_input_registers = AsyncMock(return_value=MagicMock(registers=[1, 2], isError=lambda: False))
+        mock_client_cls.return_value = mock_client
+        client = ModbusRTUClient(self.builder.set_unit_id(UnitId(7)).set_bus_priority(BusPriority.HIGH))
+
+        with patch.object(client._bus, 'execute', wraps=client._bus.execute) as execute:
+            await client._input_registers.read(0, 2)
+
+        mock_client.read_input_registers.assert_awaited_once_with(0, 2, slave=7)
+        self.assertEqual(execute.call_args.kwargs['priority'], BusPriority.HIGH)
+
+    @patch('py_modbus.modbus_rtu_bus.AsyncModbusSerialClient')
+    async def test_connect_and_disconnect_go_through_the_bus(self, _):
+        client = ModbusRTUClient(self.builder)
+        ok = OperationResponse(status=OperationStatus.OK, details="")
+        client._bus.connect = AsyncMock(return_value=ok)
+        client._bus.disconnect = MagicMock(return_value=ok)
+
+        self.assertEqual(await client.connect(), ok)
+        self.assertEqual(client.disconnect(), ok)
+        client._bus.connect.assert_awaited_once_with(client)
+        client._bus.disconnect.assert_called_once_with(client)
+
     def test_invalid_builder_type(self):
         with self.assertRaises(AssertionError):
             # Pass an invalid builder type to the ModbusTCP constructor
@@ -2,8 +2,8 @@ import unittest
 from unittest.mock import patch
 from modbus.modbus_builder_client import ModbusBuilderClient
 from modbus.modus_rtu_client_builder import ModbusRTUClientBuilder
-from modbus.rtu_values import BaudRate, StopBits, SerialPort, ParityType
-from modbus.modbus_values import Timeout, Retries, ReconnectDelay, ReconnectDelayMax, CoilSize, DiscreteInputSize, InputRegisterSize, HoldingRegisterSize
+from modbus.rtu_values import BaudRate, StopBits, SerialPort, ParityType, BusPriority
+from modbus.modbus_values import Timeout, Retries, ReconnectDelay, ReconnectDelayMax, CoilSize, DiscreteInputSize, InputRegisterSize, HoldingRegisterSize, UnitId
 from modbus.modbus import ModbusData
 from utils.operation_response import OperationResponse
 
@@ -37,6 +37,15 @@ class TestModbusRTUBuilder(unittest.TestCase):
         self.assertIsNone(builder.stop_bits)
         self.assertIsNone(builder.serial_port)
 
+    def test_set_bus_priority(self):
+        builder = ModbusRTUClientBuilder()
+        self.assertEqual(builder.bus_priority, BusPriority.NORMAL)
+        builder.set_bus_priority(BusPriority.HIGH)
+        self.assertEqual(builder.bus_priority, BusPriority.HIGH)
+        with self.assertRaises(AssertionError):
+            # noinspection PyTypeChecker
+            builder.set_bus_priority(0)
+
     def test_set_baud_rate(self):
         builder = ModbusRTUClientBuilder()
         baud_rate = BaudRate(9600)
@@ -81,6 +90,16 @@ class TestModbusRTUBuilder(unittest.TestCase):
             mock_init.assert_called_once_with(builder)
             self.assertIsInstance(modbus_rtu, MockModbusRTUClient)
 
+    def test_build_rejects_non_serial_unit_id(self):
+        builder = ModbusRTUClientBuilder()
+        builder.set_baud_rate(BaudRate(9600)) \
+            .set_parity(ParityType.EVEN) \
+            .set_stop_bits(StopBits(1)) \
+            .set_serial_port(SerialPort("COM1")) \
+            .set_unit_id(UnitId(255))
+        with self.assertRaises(AssertionError):  # 255 only addresses Modbus TCP units
+            builder.build()
+
     def test_build_without_baud_rate(self):
         builder = ModbusRTUClientBuilder()
         builder.set_parity(ParityType.EVEN).set_stop_bits(StopBits(1)).set_serial_port(SerialPort("COM1"))
@@ -0,0 +1,176 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from modbus.rtu_values import BusPriority, ParityType
+from py_modbus.modbus_rtu_bus import ModbusRTUBus, silent_interval, FIXED_SILENT_INTERVAL
+from utils.operation_response import OperationResponse, OperationStatus
+
+
+class TestSilentInterval(unittest.TestCase):
+
+    def test_scales_with_baud_rate(self):
+        # 11 bits per character with parity and one stop bit
+        self.assertAlmostEqual(silent_interval(9600, ParityType.EVEN, 1), 3.5 * 11 / 9600)
+        self.assertAlmostEqual(silent_interval(9600, ParityType.NONE, 2), 3.5 * 11 / 9600)
+        self.assertAlmostEqual(silent_interval(19200, ParityType.NONE, 1), 3.5 * 10 / 19200)
+
+    def test_fixed_above_19200_baud(self):
+        self.assertEqual(silent_interval(115200, ParityType.EVEN, 1), FIXED_SILENT_INTERVAL)
+
+
+class TestModbusRTUBus(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.connected = True
+        self.log = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def request(self, name: str, delay: float = 0.005):
+        async def send(client):
+            self.assertIs(client, self.client)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.log.append(name)
+            await asyncio.sleep(delay)
+            self.in_flight -= 1
+            return name
+        return send
+
+    async def test_requests_are_sent_one_at_a_time(self):
+        bus = ModbusRTUBus(self.client, interval=0)
+
+        results = await asyncio.gather(*[bus.execute(self.request(f"unit{unit}")) for unit in range(5)])
+
+        self.assertEqual(results, [f"unit{unit}" for unit in range(5)])
+        self.assertEqual(self.max_in_flight, 1)
+
+    async def test_higher_priority_requests_go_first(self):
+        bus = ModbusRTUBus(self.client, interval=0)
+
+        first = asyncio.create_task(bus.execute(self.request("first")))
+        await asyncio.sleep(0)  # first is on the line, the rest queue behind it
+        queued = [asyncio.create_task(bus.execute(self.request(name), priority))
+                  for name, priority in [("low", BusPriority.LOW), ("normal1", BusPriority.NORMAL),
+                                         ("high", BusPriority.HIGH), ("normal2", BusPriority.NORMAL)]]
+        await asyncio.sleep(0)
+        self.assertEqual(bus.waiting, 4)
+        await asyncio.gather(first, *queued)
+
+        self.assertEqual(self.log, ["first", "high", "normal1", "normal2", "low"])
+        self.assertEqual(bus.waiting, 0)
+
+    async def test_silent_interval_between_frames(self):
+        now = [0.0]
+        bus = ModbusRTUBus(self.client, interval=0.004, clock=lambda: now[0])
+
+        async def send(_):
+            return "sent"
+
+        await bus.execute(send)
+
+        with patch('py_modbus.modbus_rtu_bus.asyncio.sleep') as sleep:
+            now[0] = 0.001
+            await bus.execute(send)
+            sleep.assert_called_once()
+            self.assertAlmostEqual(sleep.call_args.args[0], 0.003)
+
+        with patch('py_modbus.modbus_rtu_bus.asyncio.sleep') as sleep:
+            now[0] = 1.0
+            await bus.execute(send)
+            sleep.assert_not_called()
+
+    async def test_failed_request_releases_the_line(self):
+        bus = ModbusRTUBus(self.client, interval=0)
+
+        async def fail(_):
+            raise ConnectionError("lost")
+
+        with self.assertRaises(ConnectionError):
+            await bus.execute(fail)
+        self.assertEqual(await bus.execute(self.request("next")), "next")
+
+    async def test_cancelled_waiter_is_skipped(self):
+        bus = ModbusRTUBus(self.client, interval=0)
+
+        first = asyncio.create_task(bus.execute(self.request("first")))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(bus.execute(self.request("cancelled")))
+        last = asyncio.create_task(bus.execute(self.request("last")))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(first, last)
+
+        self.assertEqual(self.log, ["first", "last"])
+
+    async def test_cancelled_exchange_holds_the_line_until_answered(self):
+        bus = ModbusRTUBus(self.client, interval=0)
+
+        sent = asyncio.create_task(bus.execute(self.request("sent", delay=0.02)))
+        await asyncio.sleep(0.005)  # sent is on the line
+        following = asyncio.create_task(bus.execute(self.request("following")))
+        await asyncio.sleep(0)
+        sent.cancel()
+        await asyncio.sleep(0.005)
+
+        self.assertEqual(self.log, ["sent"])  # following waits for the abandoned reply
+        self.assertEqual(await following, "following")
+        self.assertEqual(self.max_in_flight, 1)
+
+    async def test_framer_is_reset_before_the_line_is_released(self):
+        bus = ModbusRTUBus(self.client, interval=0)
+
+        async def check_reset(client):
+            client.ctx.framer.resetFrame.assert_called_once()
+
+        await bus.execute(self.request("first"))
+        await bus.execute(check_reset)
+
+    async def test_port_opened_once_and_closed_by_last_client(self):
+        bus = ModbusRTUBus(self.client, interval=0)
+        ok = OperationResponse(status=OperationStatus.OK, details="Connected successfully.")
+        closed = OperationResponse(status=OperationStatus.OK, details="Disconnected successfully.")
+        manager = bus._manager = MagicMock()
+        manager.connect = AsyncMock(return_value=ok)
+        manager.disconnect.return_value = closed
+
+        first, second = object(), object()
+        await bus.connect(first)
+        await bus.connect(second)
+        await bus.connect(second)
+        self.assertEqual(bus.connections, 2)
+        self.assertEqual(manager.connect.call_count, 1)
+
+        self.assertEqual(bus.disconnect(first).status, OperationStatus.OK)
+        manager.disconnect.assert_not_called()
+        self.assertEqual(bus.disconnect(second), closed)
+        self.assertEqual(bus.connections, 0)
+
+    async def test_repeated_disconnect_keeps_the_port_for_others(self):
+        bus = ModbusRTUBus(self.client, interval=0)
+        ok = OperationResponse(status=OperationStatus.OK, details="Connected successfully.")
+        manager = bus._manager = MagicMock()
+        manager.connect = AsyncMock(return_value=ok)
+
+        first, second = object(), object()
+        await bus.connect(first)
+        await bus.connect(second)
+        bus.disconnect(first)
+        self.assertEqual(bus.disconnect(first).status, OperationStatus.OK)
+        manager.disconnect.assert_not_called()
+        self.assertEqual(bus.connections, 1)
+
+    async def test_failed_connect_is_not_counted(self):
+        bus = ModbusRTUBus(self.client, interval=0)
+        failed = OperationResponse(status=OperationStatus.FAILED, details="Failed to connect to the server.")
+        bus._manager = MagicMock()
+        bus._manager.connect = AsyncMock(return_value=failed)
+
+        self.assertEqual(await bus.connect(self), failed)
+        self.assertEqual(bus.connections, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
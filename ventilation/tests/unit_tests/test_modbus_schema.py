@@ -0,0 +1,74 @@
+import unittest
+
+from modbus.modbus_arrays import RegisterArray
+from modbus.modbus_schema import RegisterField, RegisterSchema, RegisterType
+
+
+class TestRegisterSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = RegisterSchema('Snapshot', [
+            RegisterField('hours', 4, RegisterType.UINT32, unit="h"),
+            RegisterField('temperature', 0, RegisterType.INT16, scale=10, unit="°C", sentinels=frozenset({-32768})),
+            RegisterField('humidity', 1, unit="%", sentinels=frozenset({0})),
+            RegisterField('offset', 6, RegisterType.INT32),
+        ])
+
+    def test_layout(self):
+        self.assertEqual(self.schema._struct.format, '>hHxxxxIi')
+        self.assertEqual(self.schema.length, 8)
+        self.assertEqual([f.name for f in self.schema.fields], ['temperature', 'humidity', 'hours', 'offset'])
+        self.assertEqual(self.schema.unit('hours'), "h")
+        self.assertEqual(self.schema.field('temperature').scale, 10)
+
+    def test_decode(self):
+        record = self.schema.decode(RegisterArray.from_registers([0xFF9C, 45, 7, 7, 0x0001, 0x0002, 0xFFFF, 0xFFFE]))
+
+        self.assertEqual(record.temperature, -10.0)
+        self.assertEqual(record.humidity, 45)
+        self.assertEqual(record.hours, 0x00010002)
+        self.assertEqual(record.offset, -2)
+
+    def test_sentinels_are_none(self):
+        record = self.schema.decode([0x8000, 0, 0, 0, 0, 0, 0, 0])
+        self.assertIsNone(record.temperature)
+        self.assertIsNone(record.humidity)
+        self.assertEqual(record.hours, 0)
+
+    def test_short_snapshot(self):
+        record = self.schema.decode([250, 50, 0, 0, 0])
+        self.assertEqual(record.temperature, 25.0)
+        self.assertEqual(record.humidity, 50)
+        # Only half of the hours were read
+        self.assertIsNone(record.hours)
+        self.assertIsNone(record.offset)
+
+    def test_unread_registers(self):
+        registers = RegisterArray.assemble(8, [(0, [250]), (4, [0, 3])])
+        record = self.schema.decode(registers)
+        self.assertEqual(record.temperature, 25.0)
+        self.assertIsNone(record.humidity)
+        self.assertEqual(record.hours, 3)
+        self.assertIsNone(record.offset)
+
+    def test_list_with_gaps(self):
+        record = self.schema.decode([250, None, 0, 0, 0, 5, 0, 1])
+        self.assertIsNone(record.humidity)
+        self.assertEqual(record.hours, 5)
+        self.assertEqual(record.offset, 1)
+
+    def test_float(self):
+        schema = RegisterSchema('Float', [RegisterField('flow', 0, RegisterType.FLOAT32)])
+        self.assertEqual(schema.decode([0x3FC0, 0x0000]).flow, 1.5)
+
+    def test_invalid_fields(self):
+        with self.assertRaises(AssertionError):
+            RegisterSchema('Duplicate', [RegisterField('a', 0), RegisterField('a', 1)])
+        with self.assertRaises(AssertionError):
+            RegisterSchema('Overlap', [RegisterField('a', 0, RegisterType.UINT32), RegisterField('b', 1)])
+        with self.assertRaises(AssertionError):
+            RegisterField('a', 0, scale=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
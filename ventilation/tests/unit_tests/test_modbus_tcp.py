@@ -1,10 +1,14 @@
+import asyncio
 import unittest
 from unittest.mock import patch, AsyncMock, Mock
 
+from modbus.modbus_read_plan import ModbusReadPlan
 from modbus.modbus_tcp_client_builder import ModbusTCPClientBuilder
 from modbus.tcp_values import IPAddress, Port
 from modbus.modbus_values import Timeout, Retries, ReconnectDelay, ReconnectDelayMax
+from py_modbus.modbus_connection_pool import ModbusConnectionPool
 from py_modbus.modbus_tcp_client import ModbusTCPClient
+from utils.status import Status
 
 
 class TestModbusTCP(unittest.IsolatedAsyncioTestCase):
@@ -19,6 +23,13 @@ class TestModbusTCP(unittest.IsolatedAsyncioTestCase):
             .set_reconnect_delay(ReconnectDelay(0.1)) \
             .set_reconnect_delay_max(ReconnectDelayMax(10))
 
+        # Every test starts without any pooled connection
+        self.pool = patch.dict(ModbusConnectionPool._connections, clear=True)
+        self.pool.start()
+
+    def tearDown(self):
+        self.pool.stop()
+
     @patch('py_modbus.modbus_tcp_client.AsyncModbusTcpClient')
     async def test_modbus_tcp_initialization(self, mock_async_client):
         # Mock the async client to avoid actual network calls
@@ -33,7 +44,7 @@ class TestModbusTCP(unittest.IsolatedAsyncioTestCase):
             host='192.168.1.100',
             port=502,
             timeout=5,
-            reconnect_delay=0.1,
+            reconnect_delay=0,
             reconnect_delay_max=10,
             retries=3
         )
@@ -52,15 +63,80 @@ class TestModbusTCP(unittest.IsolatedAsyncioTestCase):
 
     @patch('py_modbus.modbus_tcp_client.AsyncModbusTcpClient')
     async def test_disconnect(self, mock_async_client):
-        mock_client_instance = Mock()
+        mock_client_instance = AsyncMock()
+        mock_client_instance.close = Mock()
         mock_async_client.return_value = mock_client_instance
 
         modbus_tcp = ModbusTCPClient(self.builder)
+        await modbus_tcp.connect()
+        modbus_tcp.disconnect()
         modbus_tcp.disconnect()
 
         # Ensure the disconnect method is called on the mock client
         mock_client_instance.close.assert_called_once()
 
+    @patch('py_modbus.modbus_tcp_client.AsyncModbusTcpClient')
+    def test_clients_of_one_endpoint_share_the_connection(self, mock_async_client):
+        first = ModbusTCPClient(self.builder)
+        second = ModbusTCPClient(self.builder)
+
+        self.assertIs(first._connection, second._connection)
+        mock_async_client.assert_called_once()
+
+    @patch('py_modbus.modbus_tcp_client.AsyncModbusTcpClient')
+    async def test_read_fails_fast_while_not_connected(self, mock_async_client):
+        mock_client_instance = AsyncMock()
+        mock_async_client.return_value = mock_client_instance
+        modbus_tcp = ModbusTCPClient(self.builder)
+
+        response = await modbus_tcp._input_registers.read(0, 2)
+
+        self.assertEqual(response.status, Status.EXCEPTION)
+        self.assertIn("not connected", response.details)
+        mock_client_instance.read_input_registers.assert_not_called()
+
+    @patch('py_modbus.modbus_tcp_client.AsyncModbusTcpClient')
+    async def test_snapshot_tables_overlap_across_connections(self, mock_async_client):
+        in_flight = []
+        overlapped = []
+
+        def lane_client():
+            client = AsyncMock()
+            client.close = Mock()
+
+            async def read(address, count, slave):
+                in_flight.append(address)
+                overlapped.append(len(in_flight))
+                await asyncio.sleep(0.01)
+                in_flight.remove(address)
+                return Mock(isError=Mock(return_value=False), registers=[7] * count)
+
+            client.read_input_registers.side_effect = read
+            client.read_holding_registers.side_effect = read
+            return client
+
+        mock_async_client.side_effect = lambda **_: lane_client()
+        with patch.object(ModbusTCPClient, 'snapshot_connections', 2):
+            modbus_tcp = ModbusTCPClient(self.builder)
+        self.assertEqual(mock_async_client.call_count, 2)
+        self.assertEqual(set(ModbusConnectionPool.metrics()), {"192.168.1.100:502", "192.168.1.100:502#1"})
+
+        await modbus_tcp.connect()
+        data = await modbus_tcp.read(ModbusReadPlan(input_register=((0, 2),), holding_register=((5, 1),)))
+        modbus_tcp.disconnect()
+
+        self.assertEqual(data.input_register.value, [7, 7])
+        self.assertEqual(data.holding_register.value[5], 7)
+        self.assertEqual(max(overlapped), 2)
+
+    @patch('py_modbus.modbus_tcp_client.AsyncModbusTcpClient')
+    def test_one_connection_reads_tables_in_order(self, mock_async_client):
+        self.assertFalse(ModbusTCPClient(self.builder).concurrent_tables)
+
+    @patch('py_modbus.modbus_tcp_client.AsyncModbusTcpClient')
+    def test_device_name(self, mock_async_client):
+        self.assertEqual(ModbusTCPClient(self.builder).device, "192.168.1.100:502/1")
+
     def test_invalid_builder_type(self):
         with self.assertRaises(AssertionError):
             # Pass an invalid builder type to the ModbusTCP constructor
@@ -3,7 +3,7 @@ import unittest
 from modbus.modbus_values import Retries, StrictRetries, ReconnectDelay, StrictReconnectDelay, ReconnectDelayMax, \
     StrictReconnectDelayMax, Timeout, StrictTimeout, ModbusSize, StrictModbusSize, CoilSize, StrictCoilSize, \
     DiscreteInputSize, StrictDiscreteInputSize, InputRegisterSize, StrictInputRegisterSize, HoldingRegisterSize, \
-    StrictHoldingRegisterSize
+    StrictHoldingRegisterSize, UnitId, StrictUnitId
 from utils.status import Status
 
 class TestModbusValues(unittest.TestCase):
@@ -142,3 +142,24 @@ class TestModbusValues(unittest.TestCase):
     def test_strict_holding_register_size_invalid(self):
         with self.assertRaises(ValueError):
             StrictHoldingRegisterSize(70000)
+
+    # Test for UnitId
+    def test_unit_id_valid(self):
+        self.assertEqual(UnitId(1).value, 1)
+        self.assertEqual(UnitId(247).value, 247)
+        self.assertEqual(UnitId(0).value, 0)
+        self.assertEqual(UnitId(255).value, 255)
+
+    def test_unit_id_invalid(self):
+        self.assertEqual(UnitId(-1).status, Status.EXCEPTION)
+        self.assertEqual(UnitId(256).status, Status.EXCEPTION)
+
+    def test_unit_id_is_serial(self):
+        self.assertTrue(UnitId(1).is_serial)
+        self.assertTrue(UnitId(247).is_serial)
+        self.assertFalse(UnitId(0).is_serial)
+        self.assertFalse(UnitId(255).is_serial)
+
+    def test_strict_unit_id_invalid(self):
+        with self.assertRaises(ValueError):
+            StrictUnitId(256)
@@ -0,0 +1,173 @@
+import unittest
+from unittest.mock import AsyncMock
+
+from modbus.modbus_write_queue import ModbusWriteQueue
+from utils.operation_response import OperationResponse, OperationStatus
+from utils.response import Response
+from utils.status import Status
+
+OK = OperationResponse(status=OperationStatus.OK, details="Write successful")
+
+
+class FakeDevice:
+    """Stores what is written, registers at or above clamp_above read back as clamp_above."""
+
+    def __init__(self, clamp_above: int = 0x10000):
+        self.registers = {}
+        self.coils = {}
+        self.clamp_above = clamp_above
+
+    async def write_registers(self, address, values):
+        for offset, value in enumerate(values):
+            self.registers[address + offset] = min(value, self.clamp_above)
+        return OK
+
+    async def write_coils(self, address, values):
+        for offset, value in enumerate(values):
+            self.coils[address + offset] = value
+        return OK
+
+    @staticmethod
+    def read_back(table: dict):
+        async def read(ranges):
+            values = [None] * (max(address + count for address, count in ranges))
+            for address, count in ranges:
+                for index in range(address, address + count):
+                    values[index] = table.get(index)
+            return Response(status=Status.OK, details="Read successful", value=values)
+        return read
+
+
+class TestModbusWriteQueue(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.device = FakeDevice()
+        self.write_registers = AsyncMock(side_effect=self.device.write_registers)
+        self.write_coils = AsyncMock(side_effect=self.device.write_coils)
+        self.queue = ModbusWriteQueue(self.write_registers, self.write_coils,
+                                      read_registers=FakeDevice.read_back(self.device.registers),
+                                      read_coils=FakeDevice.read_back(self.device.coils))
+
+    async def test_adjacent_registers_are_one_request(self):
+        for address, value in [(12, 3), (10, 1), (11, 2), (20, 9)]:
+            self.queue.set_register(address, value)
+
+        response = await self.queue.flush()
+
+        self.assertEqual(response.status, OperationStatus.OK)
+        self.assertEqual(response.details, "Wrote 4 values in 2 requests")
+        self.assertEqual([call.args for call in self.write_registers.call_args_list], [(10, [1, 2, 3]), (20, [9])])
+        self.assertEqual(self.queue.pending, 0)
+
+    async def test_adjacent_coils_are_one_request(self):
+        self.queue.set_coil(1, True)
+        self.queue.set_coil(0, False)
+        self.queue.set_coil(2, 1)
+
+        await self.queue.flush()
+
+        self.write_coils.assert_awaited_once_with(0, [False, True, True])
+        self.write_registers.assert_not_awaited()
+
+    async def test_repeated_writes_are_coalesced(self):
+        for speed in (1, 2, 3):
+            self.queue.set_register(5, speed)
+
+        await self.queue.flush()
+
+        self.write_registers.assert_awaited_once_with(5, [3])
+
+    async def test_runs_are_split_at_the_request_limit(self):
+        queue = ModbusWriteQueue(self.write_registers, self.write_coils, max_registers=2)
+        for address in range(5):
+            queue.set_register(address, address)
+
+        await queue.flush()
+
+        self.assertEqual([call.args for call in self.write_registers.call_args_list],
+                         [(0, [0, 1]), (2, [2, 3]), (4, [4])])
+
+    async def test_negative_register_values(self):
+        self.queue.set_register(0, -1)
+        await self.queue.flush()
+        self.write_registers.assert_awaited_once_with(0, [0xFFFF])
+
+    def test_invalid_values(self):
+        with self.assertRaises(AssertionError):
+            self.queue.set_register(0, 0x10000)
+        with self.assertRaises(AssertionError):
+            self.queue.set_register(-1, 0)
+
+    async def test_failed_write_is_reported(self):
+        self.write_registers.side_effect = None
+        self.write_registers.return_value = OperationResponse(status=OperationStatus.FAILED, details="timeout")
+        self.queue.set_register(3, 1)
+        self.queue.set_coil(0, True)
+
+        response = await self.queue.flush()
+
+        self.assertEqual(response.status, OperationStatus.FAILED)
+        self.assertEqual(response.details, "holding_register 3+1 not written: timeout")
+        self.write_coils.assert_awaited_once()
+
+    async def test_failed_write_is_queued_again(self):
+        self.write_registers.side_effect = [OperationResponse(status=OperationStatus.FAILED, details="timeout"),
+                                            OK]
+        self.queue.set_register(3, 1)
+        self.queue.set_coil(0, True)
+
+        await self.queue.flush()
+
+        self.assertEqual(self.queue.pending, 1)
+        self.assertEqual((await self.queue.flush()).status, OperationStatus.OK)
+        self.assertEqual([call.args for call in self.write_registers.call_args_list], [(3, [1]), (3, [1])])
+        self.assertEqual(self.queue.pending, 0)
+
+    async def test_failed_write_does_not_replace_a_newer_value(self):
+        async def fail_and_queue_newer(address, values):
+            self.queue.set_register(4, 7)
+            return OperationResponse(status=OperationStatus.FAILED, details="timeout")
+
+        self.write_registers.side_effect = fail_and_queue_newer
+        self.queue.set_register(3, 1)
+        self.queue.set_register(4, 2)
+
+        await self.queue.flush()
+
+        self.write_registers.side_effect = self.device.write_registers
+        await self.queue.flush()
+        self.assertEqual(self.device.registers, {3: 1, 4: 7})
+
+    async def test_verify(self):
+        self.queue.set_register(0, 10)
+        self.queue.set_coil(4, True)
+
+        response = await self.queue.flush(verify=True)
+
+        self.assertEqual(response.status, OperationStatus.OK)
+
+    async def test_verify_reports_values_the_device_did_not_take(self):
+        self.device.clamp_above = 100
+        self.queue.set_register(0, 50)
+        self.queue.set_register(1, 150)
+
+        response = await self.queue.flush(verify=True)
+
+        self.assertEqual(response.status, OperationStatus.FAILED)
+        self.assertEqual(response.details, "holding_register read back differs at 1")
+
+    async def test_verify_needs_read_back(self):
+        queue = ModbusWriteQueue(self.write_registers, self.write_coils)
+        with self.assertRaises(AssertionError):
+            await queue.flush(verify=True)
+
+    def test_clear(self):
+        self.queue.set_register(0, 1)
+        self.queue.set_coil(0, True)
+        self.assertEqual(self.queue.pending, 2)
+        self.queue.clear()
+        self.assertEqual(self.queue.pending, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import asyncio
+import random
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from modbus.modbus import ModbusData, ModbusInterface
+from modbus.modbus_change_detector import ModbusChangeDetector
+from modbus.modbus_read_plan import ModbusReadPlan
+from polling.poll_scheduler import PollGroup, PollScheduler
+from utils.response import Response
+from utils.status import Status
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPollScheduler(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.modbus = AsyncMock(spec=ModbusInterface)
+        self.results = []
+        # No phase offset and no jitter, so schedules are predictable
+        self.rng = MagicMock(spec=random.Random)
+        self.rng.uniform.side_effect = lambda low, high: low
+
+        self.temperatures = PollGroup("temperatures", 0.2, ModbusReadPlan(input_register=((1, 2),)))
+        self.alarms = PollGroup("alarms", 1.0, ModbusReadPlan(discrete_inputs=((10, 1),)))
+        self.config = PollGroup("config", 60.0, ModbusReadPlan(holding_register=((3, 1),)))
+
+    def create_scheduler(self, **kwargs):
+        return PollScheduler(self.modbus, [self.temperatures, self.alarms, self.config],
+                             self.results.append, tick=0.01, clock=self.clock, rng=self.rng, **kwargs)
+
+    async def test_first_poll_reads_all_groups_in_one_request(self):
+        scheduler = self.create_scheduler()
+
+        result = await scheduler.poll_once()
+
+        self.assertEqual(result.groups, ("temperatures", "alarms", "config"))
+        self.modbus.read.assert_called_once_with(ModbusReadPlan(
+            input_register=((1, 2),), discrete_inputs=((10, 1),), holding_register=((3, 1),)))
+        self.assertEqual(self.results, [result])
+
+    async def test_each_group_keeps_its_own_period(self):
+        scheduler = self.create_scheduler()
+        await scheduler.poll_once()
+
+        self.clock.now = 0.2
+        result = await scheduler.poll_once()
+        self.assertEqual(result.groups, ("temperatures",))
+        self.modbus.read.assert_called_with(ModbusReadPlan(input_register=((1, 2),)))
+
+        self.clock.now = 1.0
+        result = await scheduler.poll_once()
+        self.assertEqual(result.groups, ("temperatures", "alarms"))
+
+    async def test_changes_are_tracked(self):
+        def data(temperature):
+            ok = Response(status=Status.OK, details="Read successful", value=[None, temperature, 200])
+            return ModbusData(input_register=ok, holding_register=ok, discrete_inputs=ok, coils=ok)
+
+        self.modbus.read.side_effect = [data(215), data(216)]
+        scheduler = self.create_scheduler(change_detector=ModbusChangeDetector())
+
+        await scheduler.poll_once()
+        self.clock.now = 0.2
+        result = await scheduler.poll_once()
+
+        self.assertEqual(result.changes.input_register, {1: 216})
+        self.assertEqual(result.changes.version, 2)
+
+    async def test_nothing_due(self):
+        scheduler = self.create_scheduler()
+        await scheduler.poll_once()
+
+        self.clock.now = 0.1
+        self.assertIsNone(await scheduler.poll_once())
+        self.assertEqual(self.modbus.read.call_count, 1)
+        self.assertAlmostEqual(scheduler.next_due, 0.2)
+
+    async def test_missed_periods_are_not_caught_up(self):
+        scheduler = self.create_scheduler()
+        await scheduler.poll_once()
+
+        self.clock.now = 5.0
+        await scheduler.poll_once()
+        self.assertAlmostEqual(scheduler.next_due, 5.2)
+
+    def test_phase_spreads_first_poll(self):
+        self.rng.uniform.side_effect = lambda low, high: high / 2
+        scheduler = self.create_scheduler()
+        self.assertAlmostEqual(scheduler.next_due, 0.1)
+
+    async def test_jitter_added_to_reschedule(self):
+        scheduler = self.create_scheduler(jitter=0.5)
+        await scheduler.poll_once()
+        self.rng.uniform.side_effect = lambda low, high: high
+        self.clock.now = 0.2
+        await scheduler.poll_once()
+        # 0.2 + period 0.2 + jitter 0.5 * 0.2
+        self.assertAlmostEqual(scheduler.next_due, 0.5)
+
+    async def test_jitter_does_not_accumulate(self):
+        scheduler = PollScheduler(self.modbus, [self.temperatures], self.results.append, tick=0,
+                                  jitter=0.5, clock=self.clock, rng=self.rng)
+        await scheduler.poll_once()
+        self.rng.uniform.side_effect = lambda low, high: high
+        for _ in range(10):
+            self.clock.now = scheduler.next_due
+            await scheduler.poll_once()
+        # Every poll was delayed by the full jitter, the cadence is still one poll every 0.2s
+        self.assertAlmostEqual(scheduler.next_due, 11 * 0.2 + 0.1)
+
+    async def test_run_until_stopped(self):
+        scheduler = PollScheduler(self.modbus, [self.temperatures], self.results.append, tick=0.01)
+
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.5)
+        scheduler.stop()
+        await asyncio.wait_for(task, timeout=1)
+
+        self.assertGreaterEqual(len(self.results), 2)
+
+    def test_invalid_groups(self):
+        with self.assertRaises(AssertionError):
+            PollScheduler(self.modbus, [], self.results.append)
+        with self.assertRaises(AssertionError):
+            PollScheduler(self.modbus, [self.alarms, self.alarms], self.results.append)
+        with self.assertRaises(AssertionError):
+            PollGroup("bad", 0, ModbusReadPlan())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import glob
+import os
+import unittest
+from unittest.mock import patch
+
+from state.segmented_state_store import SegmentedStateStore, RetentionPolicy
+from state.state_manager import StateManager
+from state.system_state import SystemState
+
+
+def make_state(timestamp: float, temp1: float = None) -> SystemState:
+    return SystemState(sensor_data={'temp1': timestamp if temp1 is None else temp1}, timestamp=timestamp)
+
+
+class TestSegmentedStateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = 'test_segmented_state.jsonl'
+
+    def tearDown(self):
+        for path in glob.glob(self.file_path + '*'):
+            os.remove(path)
+
+    def make_store(self, **kwargs) -> SegmentedStateStore:
+        store = SegmentedStateStore(self.file_path, compact_in_background=False, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def timestamps(self, states):
+        return [state.timestamp for state in states]
+
+    def test_rotates_on_size(self):
+        store = self.make_store(max_segment_bytes=200)
+        for timestamp in range(10):
+            store.append(make_state(float(timestamp)))
+
+        self.assertGreater(len(store.segments()), 1)
+        self.assertTrue(all(path.endswith('.gz') for path in glob.glob(self.file_path + '.0*')))
+        self.assertEqual(self.timestamps(store.load()), [float(timestamp) for timestamp in range(10)])
+
+    def test_rotates_on_age(self):
+        store = self.make_store(max_segment_bytes=None, max_segment_age=10.0)
+        for timestamp in range(0, 30, 5):
+            store.append(make_state(float(timestamp)))
+
+        self.assertEqual(len(store.segments()), 2)
+        self.assertEqual(self.timestamps(store.load()), [0.0, 5.0, 10.0, 15.0, 20.0, 25.0])
+
+    def test_compaction_collapses_unchanged_states(self):
+        store = self.make_store(max_segment_bytes=None, compress=False)
+        for timestamp in range(5):
+            store.append(make_state(float(timestamp), temp1=1.0 if timestamp < 3 else 2.0))
+        store.rotate()
+
+        self.assertEqual(self.timestamps(store.load()), [0.0, 3.0])
+        self.assertTrue(os.path.exists(self.file_path + '.000001'))
+
+    def test_compacted_segment_is_synced_before_the_sealed_one_is_removed(self):
+        store = self.make_store(max_segment_bytes=None)
+        store.append(make_state(0.0))
+        calls = []
+        fsync, remove = os.fsync, os.remove
+        with patch('state.segmented_state_store.os.fsync', side_effect=lambda fd: calls.append('fsync') or fsync(fd)), \
+                patch('state.segmented_state_store.os.remove', side_effect=lambda path: calls.append('remove') or remove(path)):
+            store.rotate()
+
+        # The compacted file, then the directory, before the sealed file goes
+        self.assertEqual(calls, ['fsync', 'fsync', 'remove'])
+
+    def test_truncated_compressed_segment(self):
+        store = self.make_store(max_segment_bytes=None)
+        for timestamp in range(50):
+            store.append(make_state(float(timestamp)))
+        store.rotate()
+        store.append(make_state(50.0))
+        compressed, = glob.glob(self.file_path + '.000001.gz')
+        with open(compressed, 'rb+') as f:
+            f.truncate(os.path.getsize(compressed) // 2)
+
+        timestamps = self.timestamps(self.make_store(max_segment_bytes=None).load())
+
+        self.assertEqual(timestamps[-1], 50.0)
+        self.assertLess(len(timestamps), 51)
+
+    def test_retention_max_segments(self):
+        store = self.make_store(max_segment_age=1.0, retention=RetentionPolicy(max_segments=2))
+        for timestamp in range(5):
+            store.append(make_state(float(timestamp)))
+
+        self.assertEqual(len(store.segments()), 2)
+        self.assertEqual(self.timestamps(store.load()), [2.0, 3.0, 4.0])
+
+    def test_retention_max_age(self):
+        store = self.make_store(max_segment_age=10.0, retention=RetentionPolicy(max_age=15.0), clock=lambda: 30.0)
+        for timestamp in range(0, 30, 5):
+            store.append(make_state(float(timestamp)))
+
+        # The first segment ends before 10.0, so all of it is older than 15 seconds
+        self.assertEqual(self.timestamps(store.load()), [10.0, 15.0, 20.0, 25.0])
+
+    def test_retention_max_bytes(self):
+        store = self.make_store(max_segment_age=1.0, compress=False, retention=RetentionPolicy(max_bytes=1))
+        for timestamp in range(3):
+            store.append(make_state(float(timestamp)))
+
+        self.assertEqual(store.segments(), [])
+        self.assertEqual(self.timestamps(store.load()), [2.0])
+
+    def test_index_and_offsets(self):
+        store = self.make_store(max_segment_age=2.0)
+        for timestamp in range(5):
+            store.append(make_state(float(timestamp)))
+
+        index = store.index()
+        self.assertEqual([timestamp for timestamp, _ in index], [0.0, 2.0, 4.0])
+        self.assertEqual(self.timestamps(store.load(index[1][1])), [2.0, 3.0, 4.0])
+        self.assertEqual(self.timestamps(store.load(index[2][1])), [4.0])
+
+    def test_latest(self):
+        store = self.make_store(max_segment_age=2.0)
+        self.assertIsNone(store.latest())
+        for timestamp in range(4):
+            store.append(make_state(float(timestamp)))
+        store.rotate()
+
+        self.assertEqual(store.latest().timestamp, 3.0)
+
+    def test_reopen_continues_sequence(self):
+        store = self.make_store(max_segment_age=2.0)
+        for timestamp in range(4):
+            store.append(make_state(float(timestamp)))
+
+        reopened = self.make_store(max_segment_age=2.0)
+        reopened.append(make_state(4.0))
+        self.assertEqual(self.timestamps(reopened.load()), [0.0, 1.0, 2.0, 3.0, 4.0])
+
+    def test_background_compaction(self):
+        store = SegmentedStateStore(self.file_path, max_segment_age=1.0)
+        for timestamp in range(4):
+            store.append(make_state(float(timestamp)))
+        store.close()
+
+        self.assertEqual(glob.glob(self.file_path + '.*.sealed'), [])
+        self.assertEqual(self.timestamps(store.load()), [0.0, 1.0, 2.0, 3.0])
+
+    def test_clear(self):
+        store = self.make_store(max_segment_age=1.0)
+        for timestamp in range(3):
+            store.append(make_state(float(timestamp)))
+        store.clear()
+
+        self.assertEqual(store.segments(), [])
+        self.assertEqual(list(store.load()), [])
+
+    def test_with_state_manager(self):
+        store = self.make_store(max_segment_age=2.0)
+        state_manager = StateManager(file_path=self.file_path, store=store)
+        for timestamp in range(5):
+            state_manager.update_state(sensor_data={'temp1': float(timestamp)}, timestamp=float(timestamp))
+
+        restarted = StateManager(file_path=self.file_path, store=self.make_store(max_segment_age=2.0))
+        self.assertEqual(restarted.current_state.get_sensor_value('temp1'), 4.0)
+        self.assertEqual(self.timestamps(restarted.iter_full_history(since=3.0)), [3.0, 4.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
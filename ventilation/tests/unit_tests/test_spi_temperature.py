@@ -0,0 +1,33 @@
+import unittest
+from spi_devices.spi_temperature import SPITemperature
+from utils.response import Response
+from utils.status import Status
+
+
+class TestSPITemperature(unittest.TestCase):
+
+    def test_valid_reading(self):
+        temperature = SPITemperature(Response(status=Status.OK, details="Read", value=21))
+        self.assertEqual(temperature.status, Status.OK)
+        self.assertEqual(temperature.value, 21)
+
+    def test_each_instance_cascades_its_own_response(self):
+        failed = Response(status=Status.EXCEPTION, details="SPI read failed", value=None)
+        passed = Response(status=Status.OK, details="Read", value=21)
+
+        first = SPITemperature(failed)
+        second = SPITemperature(passed)
+
+        self.assertEqual(first.status, Status.EXCEPTION)
+        self.assertEqual(first.details, "SPI read failed")
+        self.assertEqual(second.status, Status.OK)
+        self.assertEqual(second.value, 21)
+
+    def test_range_validation_is_compiled_once(self):
+        first = SPITemperature(Response(status=Status.OK, details="Read", value=1))
+        second = SPITemperature(Response(status=Status.OK, details="Read", value=2))
+        self.assertIs(first.get__pipeline()._steps[-1], second.get__pipeline()._steps[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from utils.standard_name import StandardName
+from utils.standard_name import NAME_CACHE_SIZE, StandardName, StrictStandardName, sn, ssn
 from utils.status import Status
 
 
@@ -31,4 +31,39 @@ class TestStandardName(unittest.TestCase):
         validated_value = StandardName(value)
         self.assertEqual(validated_value.status, Status.EXCEPTION)
         self.assertIsNone(validated_value.value)
-        self.assertIn("Value must contain only lowercase letters", validated_value.details)
\ No newline at end of file
+        self.assertIn("Value must contain only lowercase letters", validated_value.details)
+
+
+class TestStandardNameCache(unittest.TestCase):
+    def test_sn_returns_the_same_instance(self):
+        self.assertIs(sn("abc_def"), sn("abc_def"))
+        self.assertIsNot(sn("abc_def"), sn("abc"))
+
+    def test_ssn_returns_the_same_instance(self):
+        self.assertIs(ssn("abc_def"), ssn("abc_def"))
+        self.assertIsInstance(ssn("abc_def"), StrictStandardName)
+
+    def test_ssn_still_raises(self):
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                ssn("Abc")
+
+    def test_invalid_names_are_cached_as_invalid(self):
+        self.assertEqual(sn("abc1").status, Status.EXCEPTION)
+        self.assertIs(sn("abc1"), sn("abc1"))
+
+    def test_hashable(self):
+        registry = {StandardName("abc_def"): 1}
+        self.assertEqual(registry[sn("abc_def")], 1)
+        self.assertEqual(hash(StandardName("abc")), hash(StandardName("abc")))
+
+    def test_mixed_keys(self):
+        registry = {"abc": "string", sn("abc"): "name", 1: "int"}
+        self.assertEqual(registry["abc"], "string")
+        self.assertEqual(registry[sn("abc")], "name")
+        self.assertNotIn(sn("def"), registry)
+        self.assertNotEqual(sn("abc"), "abc")
+        self.assertNotEqual(sn("abc"), None)
+
+    def test_cache_is_bounded(self):
+        self.assertEqual(sn.cache_info().maxsize, NAME_CACHE_SIZE)
@@ -0,0 +1,125 @@
+import unittest
+
+from state.state_history import StateHistory, EvictionPolicy, state_size
+from state.system_state import SystemState
+
+
+def make_state(timestamp: float) -> SystemState:
+    return SystemState(sensor_data={'temp1': timestamp}, timestamp=timestamp)
+
+
+class TestStateHistory(unittest.TestCase):
+
+    def fill(self, history: StateHistory, count: int):
+        for timestamp in range(count):
+            history.append(make_state(float(timestamp)))
+
+    def timestamps(self, history: StateHistory):
+        return [state.timestamp for state in history]
+
+    def test_unbounded_by_default(self):
+        history = StateHistory()
+        self.fill(history, 50)
+        self.assertEqual(len(history), 50)
+        self.assertEqual(history.evicted, 0)
+
+    def test_max_count_evicts_oldest(self):
+        history = StateHistory(max_count=3)
+        self.fill(history, 5)
+        self.assertEqual(self.timestamps(history), [2.0, 3.0, 4.0])
+        self.assertEqual(history.evicted, 2)
+        self.assertEqual(history.oldest_timestamp, 2.0)
+
+    def test_max_age_relative_to_newest(self):
+        history = StateHistory(max_age=2.0)
+        self.fill(history, 6)
+        self.assertEqual(self.timestamps(history), [3.0, 4.0, 5.0])
+
+    def test_max_bytes(self):
+        one_state = state_size(make_state(0.0))
+        history = StateHistory(max_bytes=one_state * 2)
+        self.fill(history, 10)
+        self.assertLessEqual(history.memory_bytes, one_state * 2)
+        self.assertEqual(self.timestamps(history)[-1], 9.0)
+
+    def test_memory_accounting(self):
+        history = StateHistory(max_bytes=10 ** 6)
+        self.fill(history, 3)
+        self.assertEqual(history.memory_bytes, sum(state_size(state) for state in history))
+        history.clear()
+        self.assertEqual(history.memory_bytes, 0)
+        self.assertEqual(len(history), 0)
+
+    def test_downsample_keeps_time_span(self):
+        history = StateHistory(max_count=8, policy=EvictionPolicy.DOWNSAMPLE)
+        self.fill(history, 9)
+        # The older half is thinned out, the oldest state and the recent half are kept
+        self.assertEqual(self.timestamps(history), [0.0, 2.0, 4.0, 5.0, 6.0, 7.0, 8.0])
+        self.assertEqual(history.evicted, 2)
+        # Only from 4.0 on does the window hold every state
+        self.assertEqual(history.contiguous_timestamp, 4.0)
+
+    def test_sizes_only_computed_with_byte_budget(self):
+        history = StateHistory(max_count=3)
+        self.fill(history, 3)
+        self.assertEqual(history.memory_bytes, 0)
+
+    def test_downsample_evicts_oldest_thinned_states(self):
+        history = StateHistory(max_count=8, policy=EvictionPolicy.DOWNSAMPLE)
+        self.fill(history, 30)
+        self.assertEqual(self.timestamps(history), [21.0, 22.0, 24.0, 25.0, 26.0, 27.0, 28.0, 29.0])
+        # The thinned states before 25.0 take up no more than half the window
+        self.assertEqual(history.contiguous_timestamp, 25.0)
+
+    def test_downsample_respects_max_age(self):
+        history = StateHistory(max_count=8, max_age=10.0, policy=EvictionPolicy.DOWNSAMPLE)
+        self.fill(history, 30)
+        self.assertGreaterEqual(history.oldest_timestamp, 19.0)
+
+    def test_downsample_small_window_falls_back_to_oldest(self):
+        history = StateHistory(max_count=2, policy=EvictionPolicy.DOWNSAMPLE)
+        self.fill(history, 4)
+        self.assertEqual(self.timestamps(history), [2.0, 3.0])
+        self.assertEqual(history.contiguous_timestamp, 2.0)
+
+    def test_range(self):
+        history = StateHistory()
+        self.fill(history, 10)
+        self.assertEqual([state.timestamp for state in history.range(2.0, 4.0)], [2.0, 3.0, 4.0])
+        self.assertEqual([state.timestamp for state in history.range(7.5)], [8.0, 9.0])
+        self.assertEqual([state.timestamp for state in history.range(end=1.0)], [0.0, 1.0])
+        self.assertEqual(history.range(20.0, 30.0), [])
+
+    def test_range_after_eviction(self):
+        history = StateHistory(max_count=4)
+        self.fill(history, 10)
+        self.assertEqual([state.timestamp for state in history.range(0.0, 7.0)], [6.0, 7.0])
+        self.assertEqual([state.timestamp for state in history.range()], [6.0, 7.0, 8.0, 9.0])
+
+    def test_series(self):
+        history = StateHistory()
+        self.fill(history, 5)
+        history.append(SystemState(sensor_data={'temp1': 'fault', 'temp2': 1.0}, timestamp=5.0))
+        history.append(SystemState(sensor_data={'temp2': 2.0}, timestamp=6.0))
+
+        series = history.series('temp1', 1.0, 6.0)
+        self.assertEqual(series.timestamps.typecode, 'd')
+        self.assertEqual(list(series.timestamps), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(list(series.values), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(list(history.series('temp2').values), [1.0, 2.0])
+
+    def test_series_other_section(self):
+        history = StateHistory()
+        history.append(SystemState(sensor_data={}, operational_states={'fan_speed': 3}, timestamp=1.0))
+        series = history.series('fan_speed', section='operational_states')
+        self.assertEqual(list(series.values), [3.0])
+
+    def test_invalid_limits(self):
+        with self.assertRaises(AssertionError):
+            StateHistory(max_count=0)
+        with self.assertRaises(AssertionError):
+            StateHistory(max_age=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
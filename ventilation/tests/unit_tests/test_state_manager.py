@@ -2,7 +2,9 @@ import json
 import unittest
 import os
 
+from state.state_history import EvictionPolicy, StateHistory
 from state.state_manager import StateManager
+from state.state_rollup import RollupEngine, MINUTE
 from state.system_state import SystemState
 
 
@@ -110,6 +112,116 @@ class TestStateManager(unittest.TestCase):
         self.assertEqual(history[0].get_triggered_rule('rule1'), 'Overheat')
         self.assertTrue(history[0].get_operational_state('mvhr_powered_on'))
         self.assertEqual(history[0].timestamp, 1656349263.0)
+    def test_bounded_history_serves_older_states_from_file(self):
+        """Test that a bounded window keeps recent states while the full history stays readable."""
+        state_manager = StateManager(file_path=self.file_path, history=StateHistory(max_count=2))
+        for timestamp in range(5):
+            state_manager.update_state(sensor_data={'temp1': float(timestamp)}, timestamp=float(timestamp))
+
+        self.assertEqual([state.timestamp for state in state_manager.get_state_history()], [3.0, 4.0])
+        self.assertEqual(state_manager.history_window.evicted, 3)
+        self.assertEqual([state.timestamp for state in state_manager.iter_full_history()],
+                         [0.0, 1.0, 2.0, 3.0, 4.0])
+
+    def test_store_index_follows_appends(self):
+        """Test that states appended after the store index was built are found through it."""
+        state_manager = StateManager(file_path=self.file_path, history=StateHistory(max_count=2))
+        for timestamp in range(3):
+            state_manager.update_state(sensor_data={'temp1': float(timestamp)}, timestamp=float(timestamp))
+        self.assertEqual([state.timestamp for state in state_manager.iter_full_history(since=0.5)], [1.0, 2.0])
+
+        for timestamp in range(3, 6):
+            state_manager.update_state(sensor_data={'temp1': float(timestamp)}, timestamp=float(timestamp))
+        self.assertEqual(state_manager._store_offset(3.0), dict(state_manager._store.index())[3.0])
+        self.assertEqual([state.timestamp for state in state_manager.iter_full_history(since=3.0)],
+                         [3.0, 4.0, 5.0])
+
+    def test_downsampled_states_are_read_from_file(self):
+        """Test that states thinned out of the window are still part of the full history."""
+        history = StateHistory(max_count=4, policy=EvictionPolicy.DOWNSAMPLE)
+        state_manager = StateManager(file_path=self.file_path, history=history)
+        for timestamp in range(6):
+            state_manager.update_state(sensor_data={'temp1': float(timestamp)}, timestamp=float(timestamp))
+
+        self.assertLess(len(state_manager.get_state_history()), 6)
+        self.assertEqual([state.timestamp for state in state_manager.iter_full_history()],
+                         [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual([state.timestamp for state in state_manager.iter_full_history(since=1.0)],
+                         [1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def test_restart_after_torn_write(self):
+        """Test that a batch cut short by a crash does not stop the manager from starting."""
+        self.state_manager.update_state(sensor_data={'temp1': 25.0}, timestamp=1.0)
+        with open(self.file_path, 'a') as f:
+            f.write('{"sensor_data": {"temp1": 2')
+
+        new_state_manager = StateManager(file_path=self.file_path)
+
+        self.assertEqual(new_state_manager.current_state.get_sensor_value('temp1'), 25.0)
+
+    def test_restart_restores_current_state(self):
+        """Test that a restarted manager continues merging from the last stored state."""
+        self.state_manager.update_state(sensor_data={'temp1': 25.0}, timestamp=1.0)
+
+        new_state_manager = StateManager(file_path=self.file_path)
+        new_state_manager.update_state(sensor_data={'temp2': 27.0}, timestamp=2.0)
+
+        self.assertEqual(new_state_manager.current_state.get_sensor_value('temp1'), 25.0)
+        self.assertEqual(new_state_manager.current_state.get_sensor_value('temp2'), 27.0)
+
+    def test_fast_start(self):
+        """Test that a fast start recovers only the latest state and streams older history on demand."""
+        for timestamp in range(5):
+            self.state_manager.update_state(sensor_data={'temp1': float(timestamp)}, timestamp=float(timestamp))
+
+        new_state_manager = StateManager(file_path=self.file_path, fast_start=True)
+
+        self.assertEqual(new_state_manager.current_state.get_sensor_value('temp1'), 4.0)
+        self.assertEqual(new_state_manager.get_state_history(), [])
+
+        new_state_manager.update_state(sensor_data={'temp2': 1.0}, timestamp=5.0)
+        self.assertEqual([state.timestamp for state in new_state_manager.iter_full_history()],
+                         [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual([state.timestamp for state in new_state_manager.iter_full_history(since=3.0)],
+                         [3.0, 4.0, 5.0])
+
+    def test_state_range_and_sensor_series(self):
+        """Test that the window can be queried by time range and projected onto one sensor."""
+        for timestamp in range(5):
+            self.state_manager.update_state(sensor_data={'temp1': float(timestamp) * 2}, timestamp=float(timestamp))
+
+        self.assertEqual([state.timestamp for state in self.state_manager.state_range(1.0, 3.0)], [1.0, 2.0, 3.0])
+        series = self.state_manager.sensor_series('temp1', 3.0)
+        self.assertEqual(list(series.timestamps), [3.0, 4.0])
+        self.assertEqual(list(series.values), [6.0, 8.0])
+
+    def test_rollups_follow_updates(self):
+        """Test that rollups are kept as states are updated and survive a restart once closed."""
+        rollup_path = 'test_state_rollup.jsonl'
+        self.addCleanup(lambda: os.path.exists(rollup_path) and os.remove(rollup_path))
+
+        state_manager = StateManager(file_path=self.file_path, rollups=RollupEngine(rollup_path))
+        for timestamp in range(0, 120, 20):
+            state_manager.update_state(sensor_data={'temp1': float(timestamp)}, timestamp=float(timestamp))
+        state_manager.close()
+
+        restarted = StateManager(file_path=self.file_path, rollups=RollupEngine(rollup_path), fast_start=True)
+        rollups = restarted.sensor_rollups('temp1', MINUTE)
+        self.assertEqual([rollup.start for rollup in rollups], [0.0, 60.0])
+        self.assertEqual(rollups[1].mean, 80.0)
+
+    def test_rollups_count_each_reading_once(self):
+        """Test that sensor readings carried forward by other updates are not rolled up again."""
+        state_manager = StateManager(file_path=self.file_path, rollups=RollupEngine())
+        state_manager.update_state(sensor_data={'temp1': 10.0}, timestamp=0.0)
+        state_manager.update_state(sensor_data={'temp1': 30.0}, timestamp=1.0)
+        for timestamp in range(2, 10):
+            state_manager.update_state(operational_states={'mvhr_powered_on': True}, timestamp=float(timestamp))
+
+        rollup, = state_manager.sensor_rollups('temp1', MINUTE)
+        self.assertEqual(rollup.count, 2)
+        self.assertEqual(rollup.mean, 20.0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,157 @@
+import os
+import unittest
+
+from state.state_rollup import Rollup, RollupEngine, MINUTE, HOUR
+from state.system_state import SystemState
+
+
+def make_state(timestamp: float, **sensor_data) -> SystemState:
+    return SystemState(sensor_data=sensor_data, timestamp=timestamp)
+
+
+class TestRollupEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = 'test_state_rollup.jsonl'
+
+    def tearDown(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def test_min_max_mean_last(self):
+        engine = RollupEngine()
+        for timestamp, value in [(0.0, 20.0), (10.0, 24.0), (20.0, 22.0)]:
+            engine.add(make_state(timestamp, temp1=value))
+
+        rollup, = engine.query('temp1', MINUTE)
+        self.assertEqual(rollup.start, 0.0)
+        self.assertEqual(rollup.count, 3)
+        self.assertEqual(rollup.minimum, 20.0)
+        self.assertEqual(rollup.maximum, 24.0)
+        self.assertEqual(rollup.mean, 22.0)
+        self.assertEqual(rollup.last, 22.0)
+
+    def test_buckets_per_resolution(self):
+        engine = RollupEngine()
+        for timestamp in range(0, 7200, 30):
+            engine.add(make_state(float(timestamp), temp1=float(timestamp)))
+
+        self.assertEqual(len(engine.query('temp1', MINUTE)), 120)
+        hours = engine.query('temp1', HOUR)
+        self.assertEqual([rollup.start for rollup in hours], [0.0, 3600.0])
+        self.assertEqual(hours[1].minimum, 3600.0)
+        self.assertEqual(hours[1].count, 120)
+
+    def test_query_range(self):
+        engine = RollupEngine()
+        for timestamp in range(0, 600, 60):
+            engine.add(make_state(float(timestamp), temp1=1.0))
+
+        self.assertEqual([rollup.start for rollup in engine.query('temp1', MINUTE, 120.0, 240.0)],
+                         [120.0, 180.0, 240.0])
+        self.assertEqual([rollup.start for rollup in engine.query('temp1', MINUTE, 500.0)], [540.0])
+        self.assertEqual(engine.query('unknown', MINUTE), [])
+
+    def test_non_numeric_and_late_readings_are_skipped(self):
+        engine = RollupEngine(resolutions=[MINUTE])
+        engine.add(make_state(60.0, temp1=1.0, status='ok', fault=True))
+        engine.add(make_state(0.0, temp1=100.0))
+
+        self.assertEqual(engine.keys(), ['temp1'])
+        self.assertEqual(engine.query('temp1', MINUTE)[0].maximum, 1.0)
+
+    def test_sealed_buckets_are_persisted(self):
+        engine = RollupEngine(self.file_path, resolutions=[MINUTE])
+        for timestamp in range(0, 180, 30):
+            engine.add(make_state(float(timestamp), temp1=float(timestamp)))
+
+        reloaded = RollupEngine(self.file_path, resolutions=[MINUTE])
+        # The open bucket was never written, so only the sealed ones survive
+        self.assertEqual([rollup.start for rollup in reloaded.query('temp1', MINUTE)], [0.0, 60.0])
+
+    def test_flushed_bucket_continues_after_restart(self):
+        engine = RollupEngine(self.file_path, resolutions=[MINUTE])
+        engine.add(make_state(0.0, temp1=1.0))
+        engine.flush()
+
+        reloaded = RollupEngine(self.file_path, resolutions=[MINUTE])
+        reloaded.add(make_state(30.0, temp1=3.0))
+        reloaded.add(make_state(60.0, temp1=5.0))
+
+        again = RollupEngine(self.file_path, resolutions=[MINUTE])
+        first, = again.query('temp1', MINUTE)
+        self.assertEqual(first.count, 2)
+        self.assertEqual(first.mean, 2.0)
+
+    def test_retention_drops_old_buckets(self):
+        engine = RollupEngine(resolutions=[MINUTE, HOUR], retention={MINUTE: 300.0})
+        for timestamp in range(0, 7200, 60):
+            engine.add(make_state(float(timestamp), temp1=1.0))
+
+        # The sealed buckets up to five minutes before the newest one, and the open bucket
+        self.assertEqual([rollup.start for rollup in engine.query('temp1', MINUTE)],
+                         [6780.0, 6840.0, 6900.0, 6960.0, 7020.0, 7080.0, 7140.0])
+        self.assertEqual(len(engine.query('temp1', HOUR)), 2)
+
+    def test_rollup_file_is_compacted(self):
+        engine = RollupEngine(self.file_path, resolutions=[MINUTE], retention={MINUTE: 600.0})
+        for timestamp in range(0, 3000 * 60, 60):
+            engine.add(make_state(float(timestamp), temp1=float(timestamp)))
+
+        with open(self.file_path) as f:
+            self.assertLess(sum(1 for _ in f), 2000)
+        # The sealed buckets survive the compactions, the open bucket was never written
+        reloaded = RollupEngine(self.file_path, resolutions=[MINUTE], retention={MINUTE: 600.0})
+        sealed = engine.query('temp1', MINUTE)[:-1]
+        self.assertEqual(reloaded.query('temp1', MINUTE)[-len(sealed):], sealed)
+
+    def test_torn_tail_is_trimmed_before_append(self):
+        engine = RollupEngine(self.file_path, resolutions=[MINUTE])
+        for timestamp in (0.0, 60.0, 120.0):
+            engine.add(make_state(timestamp, temp1=1.0))
+        with open(self.file_path, 'a') as f:
+            f.write('{"k": "temp1", "r": 60.0, "t": 120')
+
+        restarted = RollupEngine(self.file_path, resolutions=[MINUTE])
+        restarted.add(make_state(90.0, temp1=3.0))
+        restarted.add(make_state(180.0, temp1=1.0))
+        with open(self.file_path) as f:
+            self.assertEqual(len(f.readlines()), 3)
+        # The bucket resealed after the restart was not glued onto the torn line
+        self.assertEqual(RollupEngine(self.file_path, resolutions=[MINUTE]).query('temp1', MINUTE)[1].count, 2)
+
+    def test_writes_are_left_to_the_writer(self):
+        writes = []
+        engine = RollupEngine(self.file_path, resolutions=[MINUTE], writer=writes.append)
+        engine.add(make_state(0.0, temp1=1.0))
+        engine.add(make_state(60.0, temp1=2.0))
+        engine.flush()
+
+        self.assertFalse(os.path.exists(self.file_path))
+        for write in writes:
+            write()
+        self.assertEqual([rollup.start for rollup in RollupEngine(self.file_path, resolutions=[MINUTE])
+                         .query('temp1', MINUTE)], [0.0, 60.0])
+
+    def test_clear(self):
+        engine = RollupEngine(self.file_path)
+        engine.add(make_state(0.0, temp1=1.0))
+        engine.add(make_state(7200.0, temp1=1.0))
+        engine.clear()
+
+        self.assertEqual(engine.query('temp1', MINUTE), [])
+        self.assertEqual(RollupEngine(self.file_path).keys(), [])
+
+    def test_rollup_round_trip(self):
+        rollup = Rollup(start=60.0, resolution=MINUTE, count=2, minimum=1.0, maximum=2.0, total=3.0, last=2.0)
+        self.assertEqual(Rollup.from_dict(rollup.to_dict('temp1')), ('temp1', rollup))
+
+    def test_invalid_resolutions(self):
+        with self.assertRaises(AssertionError):
+            RollupEngine(resolutions=[])
+        with self.assertRaises(AssertionError):
+            RollupEngine(resolutions=[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
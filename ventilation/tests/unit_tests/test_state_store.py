@@ -0,0 +1,83 @@
+import os
+import unittest
+
+from state.state_store import JsonLinesStateStore
+from state.system_state import SystemState
+
+
+class TestJsonLinesStateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = 'test_state_store_history.json'
+        self.store = JsonLinesStateStore(self.file_path)
+
+    def tearDown(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def append(self, timestamp: float):
+        self.store.append(SystemState(sensor_data={'temp1': timestamp}, timestamp=timestamp))
+
+    def test_latest_reads_last_line(self):
+        for timestamp in range(500):
+            self.append(float(timestamp))
+        self.assertEqual(self.store.latest().timestamp, 499.0)
+
+    def test_latest_skips_torn_line(self):
+        self.append(1.0)
+        self.append(2.0)
+        with open(self.file_path, 'a') as f:
+            f.write('{"sensor_data": {"te')
+        self.assertEqual(self.store.latest().timestamp, 2.0)
+
+    def test_load_stops_at_torn_tail(self):
+        self.append(1.0)
+        self.append(2.0)
+        with open(self.file_path, 'a') as f:
+            f.write('{"sensor_data": {"te')
+        self.assertEqual([state.timestamp for state in self.store.load()], [1.0, 2.0])
+
+    def test_torn_line_in_the_middle_is_an_error(self):
+        self.append(1.0)
+        with open(self.file_path, 'a') as f:
+            f.write('{"sensor_data": {"te\n')
+        self.append(2.0)
+        with self.assertRaises(ValueError):
+            list(JsonLinesStateStore(self.file_path).load())
+
+    def test_torn_tail_removed_before_next_write(self):
+        self.append(1.0)
+        with open(self.file_path, 'a') as f:
+            f.write('{"sensor_data": {"te')
+
+        store = JsonLinesStateStore(self.file_path)
+        store.append(SystemState(sensor_data={'temp1': 2.0}, timestamp=2.0))
+
+        self.assertEqual([state.timestamp for state in store.load()], [1.0, 2.0])
+
+    def test_latest_missing_file(self):
+        self.assertIsNone(self.store.latest())
+
+    def test_latest_empty_file(self):
+        self.store.clear()
+        self.assertIsNone(self.store.latest())
+
+    def test_index_and_load_from_offset(self):
+        for timestamp in range(3):
+            self.append(float(timestamp))
+
+        index = self.store.index()
+
+        self.assertEqual([timestamp for timestamp, _ in index], [0.0, 1.0, 2.0])
+        self.assertEqual([state.timestamp for state in self.store.load(index[1][1])], [1.0, 2.0])
+
+    def test_index_reads_only_the_top_level_timestamp(self):
+        self.store.append(SystemState(sensor_data={'timestamp': 99.0}, operational_states={'note': '"timestamp": 5'},
+                                      timestamp=1.5))
+        with open(self.file_path, 'a') as f:
+            f.write('{"sensor_data": {}, "timestamp": 2')
+        self.assertEqual([timestamp for timestamp, _ in self.store.index()], [1.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,9 @@ import unittest
 from typing import List
 
 from utils.response import Response
+from utils.strategies import ExceptionCascadeStrategy
 from utils.value import Value, EnumValidatedValue, RangeValidatedValue, EnumValidationStrategy, TypeValidationStrategy, \
-    RangeValidationStrategy, ValidatedValue, ValidationStrategy
+    RangeValidationStrategy, ValidatedValue, ValidationStrategy, ValidationPipeline
 from utils.status import Status
 
 class TestValue(unittest.TestCase):
@@ -184,6 +185,97 @@ class TestTypeValidationStrategy(unittest.TestCase):
         self.assertEqual(response.details, "Value must be one of (<class 'int'>,), got str")
         self.assertIsNone(response.value)
 
+class TestValidationPipeline(unittest.TestCase):
+
+    def test_matches_running_the_strategies(self):
+        strategies = [RangeValidationStrategy(10, 20), TypeValidationStrategy(int)]
+        pipeline = ValidationPipeline(strategies)
+
+        for value in (15, 5, 25, 15.0):
+            expected = strategies[0].validate(value)
+            if expected.status == Status.OK:
+                expected = strategies[1].validate(value)
+            self.assertEqual(pipeline(value).status, expected.status)
+            self.assertEqual(pipeline(value).details, expected.details)
+
+        self.assertEqual(pipeline(15, "In range"), Response(status=Status.OK, details="In range", value=15))
+
+    def test_strategies_with_only_validate(self):
+        class Halve:
+            @staticmethod
+            def validate(value):
+                return Response(status=Status.OK, details="Halved", value=value / 2)
+
+        pipeline = ValidationPipeline([Halve(), RangeValidationStrategy(0, 10)])
+
+        self.assertEqual(pipeline(8).value, 4)
+        self.assertEqual(pipeline(30).details, "Value must be less than or equal to 10, got 15.0")
+
+    def test_pipelines_combine(self):
+        head = ValidationPipeline([TypeValidationStrategy(int)])
+        pipeline = ValidationPipeline([head, RangeValidationStrategy(0, 1)])
+        self.assertEqual(len(pipeline), 2)
+        self.assertEqual(pipeline("1").status, Status.EXCEPTION)
+
+    def test_exception_cascade(self):
+        failed = Response(status=Status.EXCEPTION, details="Read failed", value=None)
+        passed = Response(status=Status.OK, details="Read", value=[1])
+
+        self.assertIs(ValidationPipeline([ExceptionCascadeStrategy(failed)])(3), failed)
+        self.assertEqual(ValidationPipeline([ExceptionCascadeStrategy(passed)])(3).value, 3)
+
+    def test_compiled_once_for_each_class_and_configuration(self):
+        class Percent(RangeValidatedValue[int]):
+            def __init__(self, value):
+                super().__init__(value, int, 0, 100)
+
+        self.assertIs(Percent(1).get__pipeline(), Percent(2).get__pipeline())
+        self.assertIsNot(RangeValidatedValue(1, int, 0, 10).get__pipeline(),
+                         RangeValidatedValue(1, int, 0, 20).get__pipeline())
+        self.assertIsNot(Percent(1).get__pipeline(), RangeValidatedValue(1, int, 0, 100).get__pipeline())
+
+    def test_subclass_adding_strategies_is_not_shared(self):
+        class Cascaded(RangeValidatedValue[int]):
+            def __init__(self, value, response):
+                self._cascade = ExceptionCascadeStrategy(response)
+                super().__init__(value, int, 0, 100)
+
+            def get__strategies(self):
+                return [self._cascade] + super().get__strategies()
+
+        failed = Response(status=Status.EXCEPTION, details="Read failed", value=None)
+        passed = Response(status=Status.OK, details="Read", value=1)
+
+        self.assertIsNone(Cascaded(1, passed).pipeline_key())
+        self.assertEqual(Cascaded(1, failed).status, Status.EXCEPTION)
+        self.assertEqual(Cascaded(1, passed).status, Status.OK)
+
+    def test_unhashable_configuration_is_compiled_every_time(self):
+        value = EnumValidatedValue(1, int, [1, 2])
+        self.assertEqual(value.pipeline_key(), (int, (1, 2)))
+        unhashable = EnumValidatedValue(1, int, {1: [], 2: []})
+        self.assertIsNone(unhashable.pipeline_key())
+        self.assertEqual(unhashable.status, Status.OK)
+
+    def test_strategies_holding_instance_data_are_not_shared(self):
+        class Offset(ValidatedValue[int]):
+            def __init__(self, value, offset):
+                self._offset = offset
+                super().__init__(value)
+
+            def get__strategies(self):
+                return [Offset.Add(self._offset)]
+
+            class Add:
+                def __init__(self, offset):
+                    self.offset = offset
+
+                def validate(self, value):
+                    return Response(status=Status.OK, details="Added", value=value + self.offset)
+
+        self.assertEqual(Offset(1, 1).value, 2)
+        self.assertEqual(Offset(1, 5).value, 6)
+
 
 if __name__ == '__main__':
     unittest.main()